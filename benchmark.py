@@ -0,0 +1,922 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Samani analysis backend.
+Usage: python benchmark.py <benchmark> [options]
+"""
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+def _synthetic_report(n_sentences=400, seed=7):
+    """Builds annual-report-like text with a wide spread of sentence lengths."""
+    rng = random.Random(seed)
+    words = ["revenue", "growth", "margin", "the", "group", "performance", "improved",
+             "declined", "market", "conditions", "costs", "increased", "shareholders",
+             "dividend", "outlook", "remains", "challenging", "strong", "demand", "Kenya"]
+    sentences = []
+    for _ in range(n_sentences):
+        # Mostly short statements with an occasional near-limit paragraph
+        length = rng.choice([4, 6, 8, 12, 20]) if rng.random() < 0.85 else rng.randint(60, 90)
+        sentences.append(" ".join(rng.choice(words) for _ in range(length)).capitalize())
+    return ". ".join(sentences) + "."
+
+
+def bench_sentiment_batching(args):
+    """Padding share and chunks/sec: naive document-order batches vs length buckets."""
+    from src.backend.mcp import sentiment
+
+    text = Path(args.text).read_text() if args.text else _synthetic_report()
+    chunks = [c for c in sentiment.split_into_chunks(text, max_chars=args.max_chars) if len(c.strip()) > 5]
+    lengths = sentiment.token_lengths(chunks, sentiment.nlp)
+
+    naive = [list(range(i, min(i + args.batch_size, len(chunks)))) for i in range(0, len(chunks), args.batch_size)]
+    bucketed = sentiment.bucket_batches(lengths, args.batch_size)
+
+    print(f"Chunks: {len(chunks)} | batch size: {args.batch_size}")
+    print(f"Padding share (naive batches):    {sentiment.padding_share(lengths, naive):.1%}")
+    print(f"Padding share (length-bucketed):  {sentiment.padding_share(lengths, bucketed):.1%}")
+
+    if sentiment.nlp is None:
+        print("FinBERT unavailable - skipping throughput measurement.")
+        return
+
+    def run(batches):
+        start = time.perf_counter()
+        for batch in batches:
+            sentiment.nlp([chunks[i] for i in batch], truncation=True, max_length=512, batch_size=len(batch))
+        return len(chunks) / (time.perf_counter() - start)
+
+    run(naive[:1])  # Warm-up
+    print(f"Throughput (naive batches):       {run(naive):.1f} chunks/sec")
+    print(f"Throughput (length-bucketed):     {run(bucketed):.1f} chunks/sec")
+
+
+def _financials_frame():
+    """Consolidated Samani DataFrame parsed from the bundled financials/ folder"""
+    from src.backend.mcp.parsing import parse_file
+
+    class _File:
+        def __init__(self, path):
+            self.name = str(path)
+
+    paths = sorted((Path(__file__).parent / "financials").glob("*/*.xlsx"))
+    data, _, _ = parse_file([_File(p) for p in paths])
+    return data
+
+
+def bench_holt_batch(args):
+    """Vectorized damped Holt vs one statsmodels fit per series (numerics and speed)."""
+    import warnings
+    import numpy as np
+    import pandas as pd
+    from statsmodels.tsa.holtwinters import ExponentialSmoothing
+    from src.backend.mcp.batch_forecasting import BatchHoltFit, filter_damped_holt, fit_damped_holt
+    from src.backend.mcp.extraction import extract_financial_data
+    warnings.filterwarnings("ignore")
+
+    def check(y):
+        """(recursion error at statsmodels' params, SSE ratio batch/statsmodels, forecast rel. diff)"""
+        sm = ExponentialSmoothing(pd.Series(y), trend='add', damped_trend=True, seasonal=None).fit()
+        p = sm.params
+        a, b, phi = (np.array([p[k]]) for k in ('smoothing_level', 'smoothing_trend', 'damping_trend'))
+        resid, level, trend = filter_damped_holt(y[None, :], a, b, phi, [p['initial_level']], [p['initial_trend']])
+        replay = BatchHoltFit(a, b, phi, None, None, level, trend, resid).forecast(args.steps)[0]
+        recursion_err = np.max(np.abs(replay - sm.forecast(args.steps).values) / np.abs(sm.forecast(args.steps).values))
+
+        fit = fit_damped_holt(y[None, :])
+        forecast_diff = np.max(np.abs(fit.forecast(args.steps)[0] - sm.forecast(args.steps).values) / np.abs(sm.forecast(args.steps).values))
+        sse_ratio = fit.sse[0] / sm.sse if sm.sse > 0 else 0.0
+        return recursion_err, sse_ratio, forecast_diff
+
+    # 1. The existing single-series path (process_request -> generate_forecast)
+    series, _ = extract_financial_data(_financials_frame(), "Revenue")
+    err, ratio, diff = check(series.astype(float).values)
+    print("Samani Revenue (generate_forecast path):")
+    print(f"  Recursions at statsmodels' params - max rel. forecast error: {err:.2e}")
+    print(f"  Batch fit SSE / statsmodels SSE: {ratio:.4f} | forecast rel. diff: {diff:.2e}")
+
+    # 2. Random growth series
+    rng = np.random.default_rng(0)
+    Y = 100 * np.cumprod(1 + 0.05 + 0.05 * rng.standard_normal((args.n_series, args.length)), axis=1)
+    checks = np.array([check(y) for y in Y[:args.n_check]])
+    print(f"Random series (n={args.n_check}, length {args.length}):")
+    print(f"  Recursions at statsmodels' params - max rel. forecast error: {checks[:, 0].max():.2e}")
+    print(f"  Batch SSE <= statsmodels SSE (+1e-6): {np.mean(checks[:, 1] <= 1 + 1e-6):.0%} "
+          f"| worst SSE ratio {checks[:, 1].max():.6f}")
+    print(f"  Forecast agreement where SSEs match: median rel. diff "
+          f"{np.median(checks[np.abs(checks[:, 1] - 1) < 1e-6, 2]) if np.any(np.abs(checks[:, 1] - 1) < 1e-6) else float('nan'):.2e}")
+
+    # 3. Throughput
+    start = time.perf_counter()
+    for y in Y[:args.n_check]:
+        ExponentialSmoothing(pd.Series(y), trend='add', damped_trend=True, seasonal=None).fit().forecast(args.steps)
+    per_series = (time.perf_counter() - start) / args.n_check
+
+    start = time.perf_counter()
+    fit = fit_damped_holt(Y)
+    fit.forecast(args.steps)
+    batch_time = time.perf_counter() - start
+
+    print(f"Throughput ({args.n_series} series x {args.length} periods):")
+    print(f"  statsmodels loop (extrapolated): {per_series * args.n_series:.1f}s")
+    print(f"  Vectorized batch fit:            {batch_time:.2f}s")
+
+
+def bench_forecast_cache(args):
+    """generate_forecast cold vs cached fit, and a horizon change served from the cache."""
+    import numpy as np
+    from src.backend.mcp import forecasting
+    from src.backend.mcp.extraction import extract_financial_data
+
+    series, _ = extract_financial_data(_financials_frame(), "Revenue")
+    forecasting.FIT_CACHE.clear()
+
+    def timed(steps):
+        start = time.perf_counter()
+        forecast, msg = forecasting.generate_forecast(series, steps=steps)
+        return forecast, msg, time.perf_counter() - start
+
+    cold, _, cold_time = timed(args.steps)
+    warm, msg, warm_time = timed(args.steps)
+    longer, _, horizon_time = timed(args.steps + 2)
+    refit = forecasting._fit_holt_winters(series).forecast(args.steps + 2).values
+
+    print(f"Cold fit:          {cold_time * 1000:.1f} ms")
+    print(f"Cached fit:        {warm_time * 1000:.2f} ms ({msg})")
+    print(f"Horizon {args.steps} -> {args.steps + 2}:    {horizon_time * 1000:.2f} ms, "
+          f"max rel. diff vs refit {np.max(np.abs(longer.values - refit) / np.abs(refit)):.1e}")
+    print(f"Cached == cold: {np.allclose(cold.values, warm.values)} | {forecasting.FIT_CACHE.stats()}")
+
+
+def bench_backtest(args):
+    """Rolling-origin backtest of every candidate model: in-process vs process pool, then cached."""
+    import numpy as np
+    from src.backend.mcp import backtesting
+
+    rng = np.random.default_rng(0)
+    Y = 100 * np.cumprod(1 + 0.05 + 0.05 * rng.standard_normal((args.n_series, args.length)), axis=1)
+
+    start = time.perf_counter()
+    _, serial_mase, n_origins = backtesting.rolling_origin_backtest(Y, horizon=args.steps, max_workers=1)
+    serial_time = time.perf_counter() - start
+    start = time.perf_counter()
+    _, pool_mase, _ = backtesting.rolling_origin_backtest(Y, horizon=args.steps)
+    pool_time = time.perf_counter() - start
+
+    print(f"{args.n_series} series x {args.length} periods, {n_origins} origins, horizon {args.steps}")
+    print(f"  In-process:   {serial_time:.2f}s")
+    print(f"  Process pool: {pool_time:.2f}s (identical: {np.allclose(serial_mase, pool_mase, equal_nan=True)})")
+    for j, model in enumerate(backtesting.MODELS):
+        print(f"  {model:<13} median MASE {np.nanmedian(serial_mase[:, j]):.3f}")
+
+    series = {i: y for i, y in enumerate(Y[:args.n_check])}
+    backtesting.BACKTEST_CACHE.clear()
+    backtesting.backtest_series(series, horizon=args.steps)
+    start = time.perf_counter()
+    _, n_cached = backtesting.backtest_series(series, horizon=args.steps)
+    print(f"Re-run on {len(series)} unchanged series: {time.perf_counter() - start:.3f}s ({n_cached} from cache)")
+
+
+def bench_forecast_intervals(args):
+    """Simulated prediction intervals: hold-out coverage and throughput for many series."""
+    import numpy as np
+    from src.backend.mcp.batch_forecasting import BatchHoltFit, filter_damped_holt, fit_damped_holt
+    from src.backend.mcp.simulation import forecast_intervals
+
+    # Series drawn from the model itself (damped Holt, alpha 0.5, beta 0.2, phi 0.95)
+    rng = np.random.default_rng(0)
+    level, trend = np.full(args.n_series, 100.0), np.full(args.n_series, 5.0)
+    Y = np.empty((args.n_series, args.length + args.steps))
+    for t in range(Y.shape[1]):
+        e = 5 * rng.standard_normal(args.n_series)
+        Y[:, t] = level + 0.95 * trend + e
+        level, trend = level + 0.95 * trend + 0.5 * e, 0.95 * trend + 0.1 * e
+    train, actual = Y[:, :args.length], Y[:, args.length:]
+
+    # Known parameters isolate the simulation engine; fitted ones add estimation error
+    n = args.n_series
+    residuals, last_level, last_trend = filter_damped_holt(train, np.full(n, 0.5), np.full(n, 0.2), np.full(n, 0.95),
+                                                           np.full(n, 100.0), np.full(n, 5.0))
+    fits = {"true params": BatchHoltFit(np.full(n, 0.5), np.full(n, 0.2), np.full(n, 0.95), None, None,
+                                        last_level, last_trend, residuals),
+            "fitted": fit_damped_holt(train)}
+
+    # Fitted bands without the history are conditional on the estimates; with it they are
+    # widened to rolling-origin backtest errors, which carry the estimation error
+    runs = [("true params", fits["true params"], None), ("fitted", fits["fitted"], None),
+            ("calibrated", fits["fitted"], train)]
+    for label, fit, history in runs:
+        for method in ("bootstrap", "parametric"):
+            start = time.perf_counter()
+            bands = forecast_intervals(fit, args.steps, method=method, history=history)
+            elapsed = time.perf_counter() - start
+            coverage = {pct: np.mean((actual >= bands[f"lower_{pct}"]) & (actual <= bands[f"upper_{pct}"]))
+                        for pct in (80, 95)}
+            print(f"{label:<11} {method:<10} {n} series x 2000 paths x {args.steps} steps: {elapsed:.2f}s | "
+                  f"hold-out coverage 80%: {coverage[80]:.1%}, 95%: {coverage[95]:.1%}")
+            if label == "calibrated" and method == "parametric" and args.length >= 10:
+                assert coverage[80] >= 0.75 and coverage[95] >= 0.90, f"calibrated bands undercover: {coverage}"
+
+
+def bench_projection(args):
+    """Three-statement projection for many companies x scenarios: balance check and speed."""
+    import numpy as np
+    from src.backend.mcp import projection
+
+    engine = projection.ProjectionEngine(_financials_frame())
+    hist = engine.history()
+    drivers, opening = engine.estimate_drivers(hist), engine.opening_balances(hist)
+
+    # Perturb the Samani drivers into args.n_series companies, each with 50 random scenarios
+    rng = np.random.default_rng(0)
+    n_companies, n_scenarios = args.n_series, 50
+    company_drivers = {k: v * (1 + 0.2 * rng.standard_normal((n_companies, 1))) for k, v in drivers.items()}
+    scenario_drivers = {k: v + 0.02 * rng.standard_normal((n_companies, n_scenarios)) for k, v in company_drivers.items()}
+    company_opening = {k: v * np.exp(0.5 * rng.standard_normal((n_companies, 1))) for k, v in opening.items()}
+
+    start = time.perf_counter()
+    projected = projection.project_statements(scenario_drivers, company_opening, args.steps)
+    elapsed = time.perf_counter() - start
+
+    scale = np.abs(projected['total_assets']).max()
+    print(f"{n_companies} companies x {n_scenarios} scenarios x {args.steps} years: {elapsed:.2f}s")
+    print(f"Max |assets - liabilities - equity| (incl. unmodelled items): {np.abs(projected['balance_check']).max():.2e} "
+          f"(largest total assets {scale:,.0f})")
+    cash_roll = projected['cash'][..., 1:] - projected['cash'][..., :-1] - projected['net_cash_flow'][..., 1:]
+    print(f"Max |cash roll-forward difference|: {np.abs(cash_roll).max():.2e}")
+
+
+def bench_reconciliation(args):
+    """Reconciled balance sheet forecasts for many entities: coherence, accuracy and speed."""
+    import numpy as np
+    from src.backend.mcp import reconciliation
+    from src.backend.mcp.batch_forecasting import fit_damped_holt
+
+    # Bottom-level items grow with noise; subtotals are exact sums (C x = 0 in history)
+    items = ['Cash', 'Receivables', 'Inventory', 'PPE', 'Intangible Assets',
+             'Current Assets', 'Non-Current Assets', 'Total Assets']
+    rng = np.random.default_rng(0)
+    n, length, steps = args.n_series, args.length + args.steps, args.steps
+    growth = 1 + 0.05 + 0.03 * rng.standard_normal((n, 5, 1))
+    bottom = (rng.uniform(1e3, 1e5, (n, 5, 1)) * growth ** np.arange(length)
+              * np.exp(0.05 * rng.standard_normal((n, 5, length))))
+    current, non_current = bottom[:, :3].sum(axis=1), bottom[:, 3:].sum(axis=1)
+    X = np.concatenate([bottom, current[:, None], non_current[:, None], (current + non_current)[:, None]], axis=1)
+    train, actual = X[..., :-steps], X[..., -steps:]
+
+    C, identities = reconciliation.constraint_matrix(items, train)
+    start = time.perf_counter()
+    fit = fit_damped_holt(train.reshape(-1, args.length))
+    base = fit.forecast(steps).reshape(n, len(items), steps)
+    fit_time = time.perf_counter() - start
+    variances = np.mean(fit.residuals ** 2, axis=1).reshape(n, len(items))
+
+    print(f"{n} entities x {len(items)} items, {len(identities)} identities; batch fit {fit_time:.2f}s")
+    print(f"  {'method':<10} {'time':>8} {'max |C y|':>10} {'MAPE %':>7}")
+    print(f"  {'base':<10} {'':>8} {np.abs(np.einsum('rk,ekh->erh', C, base)).max():>10.2e} "
+          f"{100 * np.mean(np.abs(base / actual - 1)):>7.2f}")
+    for method in reconciliation.METHODS:
+        weights = reconciliation._weights(method, items, C, variances)
+        start = time.perf_counter()
+        reconciled = reconciliation.reconcile(base, C, weights)
+        elapsed = time.perf_counter() - start
+        print(f"  {method:<10} {elapsed:>7.3f}s {np.abs(np.einsum('rk,ekh->erh', C, reconciled)).max():>10.2e} "
+              f"{100 * np.mean(np.abs(reconciled / actual - 1)):>7.2f}")
+
+    # Same projection one entity at a time
+    weights = reconciliation._weights('mint_diag', items, C, variances)
+    n_loop = min(args.n_check, n)
+    start = time.perf_counter()
+    for e in range(n_loop):
+        W = np.diag(weights[e])
+        base[e] - W @ C.T @ np.linalg.solve(C @ W @ C.T, C @ base[e])
+    print(f"  Per-entity loop (extrap.):  {(time.perf_counter() - start) / n_loop * n:.3f}s")
+
+
+def bench_trend_stats(args):
+    """Batched trend statistics vs scipy.stats.linregress per series (numerics and speed)."""
+    import numpy as np
+    from scipy import stats
+    from src.backend.mcp.trend_analysis import trend_statistics
+
+    rng = np.random.default_rng(0)
+    Y = 1e4 * np.cumprod(1 + 0.05 + 0.1 * rng.standard_normal((args.n_series, args.length)), axis=1)
+    Y[rng.random(Y.shape) < 0.05] = np.nan  # Scattered missing periods
+
+    start = time.perf_counter()
+    result = trend_statistics(Y)
+    batch_time = time.perf_counter() - start
+
+    n_loop = min(args.n_check, args.n_series)
+    x = np.arange(args.length)
+    max_err = 0.0
+    start = time.perf_counter()
+    for i in range(n_loop):
+        valid = ~np.isnan(Y[i])
+        fit = stats.linregress(x[valid], Y[i, valid])
+        np.nanstd(Y[i], ddof=1) / abs(np.nanmean(Y[i]))
+        max_err = max(max_err, abs(fit.slope - result['slope'][i]) / abs(fit.slope),
+                      abs(fit.rvalue ** 2 - result['r_squared'][i]))
+    loop_time = (time.perf_counter() - start) / n_loop * args.n_series
+
+    print(f"{args.n_series} series x {args.length} periods (5% missing)")
+    print(f"  Max rel. slope / abs. R² difference vs linregress: {max_err:.1e}")
+    print(f"  Batched statistics:            {batch_time:.3f}s")
+    print(f"  linregress per series (extrap.): {loop_time:.2f}s")
+
+
+def bench_anomalies(args):
+    """Robust anomaly scores over a synthetic portfolio: detection of injected shocks and speed."""
+    import numpy as np
+    import pandas as pd
+    from src.backend.mcp import anomalies
+    from src.backend.mcp.trend_analysis import TrendAnalyzer
+
+    rng = np.random.default_rng(0)
+    n_entities, n_items = max(args.n_series // 50, anomalies.MIN_OBS), 50
+    growth = 1 + 0.06 + 0.04 * rng.standard_normal((n_entities, n_items, 1))
+    values = (rng.uniform(1e3, 1e6, (n_entities, n_items, 1)) * growth ** np.arange(args.length)
+              * (1 + 0.02 * rng.standard_normal((n_entities, n_items, args.length))))
+    shocked = rng.random(values.shape) < 0.002
+    shocked[..., 0] = False
+    values[shocked] *= rng.choice([0.5, 1.6], size=shocked.sum())
+
+    start = time.perf_counter()
+    scores = anomalies.score_anomalies(values)
+    elapsed = time.perf_counter() - start
+    z = np.nanmax(np.abs(np.stack([np.nan_to_num(v) for v in scores.values()])), axis=0)
+    flagged = z > anomalies.DEFAULT_THRESHOLD
+
+    # The previous rule: plain z-score of levels > 2 per series
+    level_z = np.abs((values - values.mean(axis=-1, keepdims=True)) / values.std(axis=-1, ddof=1, keepdims=True))
+    old = level_z > 2.0
+
+    print(f"{n_entities} entities x {n_items} items x {args.length} periods, {shocked.sum()} injected shocks")
+    print(f"  Robust scores (level, yoy, peer): {elapsed:.3f}s")
+    for name, hits in (("robust |z| > 3.5", flagged), ("plain z > 2 (old)", old)):
+        print(f"  {name:<18} recall {hits[shocked].mean():.1%} | false flags {hits[~shocked].mean():.2%}")
+
+    # The same scores one series at a time, through TrendAnalyzer.detect_anomalies
+    n_loop = min(args.n_check, n_entities * n_items)
+    analyzer = TrendAnalyzer(pd.DataFrame({'Line Item': ['x']}))
+    flat = values.reshape(-1, args.length)
+    start = time.perf_counter()
+    for row in flat[:n_loop]:
+        analyzer.detect_anomalies(pd.Series(row), 'x')
+    print(f"  detect_anomalies per series (extrap.): {(time.perf_counter() - start) / n_loop * len(flat):.2f}s")
+
+
+def bench_changepoints(args):
+    """PELT over many long series: exactness vs optimal partitioning, detection and speed."""
+    import numpy as np
+    from src.backend.mcp import changepoints
+
+    rng = np.random.default_rng(0)
+    length = max(args.length, 20)
+    signals, truth = [], []
+    for _ in range(args.n_series):
+        starts = sorted(rng.choice(np.arange(4, length - 3), size=rng.integers(0, 3), replace=False))
+        starts = [b for i, b in enumerate(starts) if i == 0 or b - starts[i - 1] >= 4]
+        means = np.cumsum(rng.choice([-1, 1], len(starts) + 1) * rng.uniform(3, 6, len(starts) + 1))
+        x = np.repeat(means, np.diff([0] + starts + [length])) + rng.standard_normal(length)
+        signals.append(x)
+        truth.append(starts)
+
+    def optimal(x, penalty, m=changepoints.MIN_SIZE):
+        """Exhaustive O(n^2) optimal partitioning"""
+        n = len(x)
+        best, last = np.full(n + 1, np.inf), np.zeros(n + 1, dtype=int)
+        best[0] = -penalty
+        for t in range(m, n + 1):
+            for s in [0] + list(range(m, t - m + 1)):
+                seg = x[s:t]
+                v = best[s] + ((seg - seg.mean()) ** 2).sum() + penalty
+                if v < best[t] - 1e-9:
+                    best[t], last[t] = v, s
+        out, t = [], n
+        while last[t] > 0:
+            t = last[t]
+            out.append(t)
+        return sorted(out)
+
+    n_check = min(args.n_check, args.n_series)
+    mismatches = 0
+    for x in signals[:n_check]:
+        penalty = changepoints.PENALTY_FACTOR * changepoints.noise_variance(x) * np.log(len(x))
+        mismatches += changepoints.pelt(x, penalty) != optimal(x, penalty)
+    print(f"PELT vs exhaustive optimal partitioning: {mismatches}/{n_check} differ")
+
+    for workers in (1, None):
+        start = time.perf_counter()
+        found = changepoints.detect_changepoints(signals, max_workers=workers)
+        print(f"  {args.n_series} series x {length} periods, max_workers={workers}: {time.perf_counter() - start:.2f}s")
+
+    hits = sum(any(abs(f - b) <= 1 for f in fnd) for tru, fnd in zip(truth, found) for b in tru)
+    n_true, n_found = sum(map(len, truth)), sum(map(len, found))
+    print(f"  Breaks recovered within 1 period: {hits}/{n_true} | reported {n_found}")
+
+
+def bench_periods(args):
+    """Quarterly data: seasonal adjustment around damped Holt (accuracy) and to_annual (speed)."""
+    import numpy as np
+    import pandas as pd
+    from src.backend.mcp.batch_forecasting import fit_damped_holt
+    from src.backend.mcp.periods import seasonal_adjustment, to_annual
+
+    rng = np.random.default_rng(0)
+    length = max(args.length, 12)
+    labels = [str(pd.Period('2015Q1') + i) for i in range(length + args.steps)]
+    t = np.arange(length + args.steps)
+    season = rng.uniform(5, 15, (args.n_series, 1)) * np.array([-1.0, 0.5, -0.5, 1.0])[t % 4]
+    Y = 100 + rng.uniform(0.5, 2, (args.n_series, 1)) * t + season + rng.standard_normal((args.n_series, len(t)))
+    history, actual = Y[:, :length], Y[:, length:]
+
+    def mape(forecast):
+        return np.mean(np.abs(forecast - actual) / np.abs(actual)) * 100
+
+    plain = fit_damped_holt(history).forecast(args.steps)
+    adjusted, seasonal = seasonal_adjustment(history, labels[:length], args.steps)
+    seasonal_fc = fit_damped_holt(adjusted).forecast(args.steps) + seasonal
+    print(f"{args.n_series} quarterly series x {length} periods, {args.steps}-step MAPE")
+    print(f"  Damped Holt on raw data:            {mape(plain):.2f}%")
+    print(f"  Seasonally adjusted + pattern back: {mape(seasonal_fc):.2f}%")
+
+    frame = pd.DataFrame(history, columns=labels[:length])
+    frame.insert(0, 'Line Item', [f"Revenue {i}" for i in range(args.n_series)])
+    start = time.perf_counter()
+    annual = to_annual(frame)
+    print(f"  to_annual: {args.n_series} x {length} -> {annual.shape[1] - 1} years in {time.perf_counter() - start:.3f}s")
+
+
+def bench_frames(args):
+    """Typed consolidated frame: memory and row access vs the untyped (object) layout."""
+    import numpy as np
+    import pandas as pd
+    from src.backend.mcp.frames import compact_frame
+
+    rng = np.random.default_rng(0)
+    periods = [str(2024 - args.length + i) for i in range(1, args.length + 1)]
+    values = rng.normal(1e6, 2e5, (args.n_series, args.length)).astype(object)
+    values[rng.random(values.shape) < 0.05] = None
+    raw = pd.DataFrame(values, columns=periods)
+    raw.insert(0, 'Line Item', [f"Item {i % (args.n_series // 4 or 1)}" for i in range(args.n_series)])
+
+    start = time.perf_counter()
+    typed = compact_frame(raw)
+    build_time = time.perf_counter() - start
+    mb = lambda df: df.memory_usage(deep=True).sum() / 1e6
+    print(f"{args.n_series} rows x {args.length} periods")
+    print(f"  Memory: object {mb(raw):.2f} MB | float64 {mb(typed):.2f} MB | "
+          f"float32 {mb(compact_frame(raw, 'float32')):.2f} MB (compaction {build_time:.3f}s)")
+
+    n_rows = min(args.n_check, args.n_series)
+    start = time.perf_counter()
+    for i in range(n_rows):
+        raw.iloc[i, 1:].apply(pd.to_numeric, errors='coerce')
+    coerce_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(n_rows):
+        typed.iloc[i, 1:]
+    typed_time = time.perf_counter() - start
+    print(f"  {n_rows} row reads: per-row to_numeric {coerce_time:.3f}s | typed {typed_time:.3f}s")
+
+
+def bench_line_items(args):
+    """Alias folding on the bundled data, and LineItemIndex vs str.contains row scans."""
+    import numpy as np
+    import pandas as pd
+    from src.backend.mcp.frames import LineItemIndex, compact_frame
+
+    data = _financials_frame()
+    aliases = data.attrs.get('aliases', {})
+    print(f"Samani: {len(data)} rows + {len(aliases)} aliases (previously {len(data) + len(aliases)} rows)")
+
+    # MCP tools exchange JSON: every raw label must still resolve after the round trip
+    from src.backend.mcp.extraction import extract_financial_data
+    from src.backend.mcp.parsing import frame_from_json, frame_to_json
+    restored = frame_from_json(frame_to_json(data))
+    assert restored.equals(data) and dict(restored.attrs['aliases']) == dict(aliases), "JSON round trip changed the frame"
+    for label in aliases:
+        found, _ = extract_financial_data(restored, label)
+        expected, _ = extract_financial_data(data, label)
+        assert found is not None and found.equals(expected), f"'{label}' does not resolve after the JSON round trip"
+    print(f"  JSON round trip: all {len(aliases)} raw labels resolve to the same series")
+
+    rng = np.random.default_rng(0)
+    words = np.array(['total', 'current', 'net', 'operating', 'cash', 'assets', 'profit', 'income',
+                      'expenses', 'trade', 'other', 'deferred', 'tax', 'lease', 'revenue', 'equity'])
+    labels = list(dict.fromkeys(" ".join(rng.choice(words, rng.integers(1, 5))).title() + f" {i}"
+                                for i in range(args.n_series)))
+    frame = compact_frame(pd.DataFrame({'Line Item': labels, '2024': rng.normal(size=len(labels))}))
+    keywords = [" ".join(rng.choice(words, rng.integers(1, 3))) for _ in range(args.n_check)]
+
+    start = time.perf_counter()
+    lower = frame['Line Item'].astype(str).str.lower()
+    scanned = []
+    for key in keywords:
+        hits = np.flatnonzero(lower.str.contains(key, regex=False).to_numpy())
+        scanned.append(int(hits[0]) if len(hits) else None)
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = LineItemIndex(frame)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    indexed = [index.first(key) for key in keywords]
+    lookup_time = time.perf_counter() - start
+
+    print(f"{len(labels)} labels, {len(keywords)} keyword lookups (same first row: {scanned == indexed})")
+    print(f"  str.contains scans: {scan_time:.3f}s")
+    print(f"  LineItemIndex:      {lookup_time:.3f}s (+{build_time:.3f}s build)")
+
+
+def bench_analyzer_cache(args):
+    """Memoized analyzer reports: cold vs warm calls on the bundled data, and hit rates."""
+    import tempfile
+    from src.backend.mcp import cache
+    from src.backend.mcp.advanced_ratios import analyze_financial_ratios
+    from src.backend.mcp.balance_sheet_analysis import analyze_balance_sheet
+    from src.backend.mcp.cashflow_analysis import analyze_cash_flow
+    from src.backend.mcp.income_statement_analysis import analyze_income_statement
+    from src.backend.mcp.trend_analysis import analyze_trends_and_anomalies
+
+    data = _financials_frame()
+    analyzers = [analyze_financial_ratios, analyze_cash_flow, analyze_balance_sheet,
+                 analyze_income_statement, analyze_trends_and_anomalies]
+    for analyzer in analyzers:
+        analyzer.cache.clear()
+        start = time.perf_counter()
+        cold = analyzer(data)
+        cold_time = time.perf_counter() - start
+        start = time.perf_counter()
+        warm = [analyzer(data) for _ in range(args.n_check)]
+        warm_time = (time.perf_counter() - start) / args.n_check
+        print(f"{analyzer.__name__:<30} cold {cold_time * 1000:7.1f} ms | warm {warm_time * 1000:6.3f} ms | "
+              f"identical: {all(w == cold for w in warm)} | {analyzer.cache.stats()}")
+
+    changed = data.copy()
+    changed.iloc[0, -1] += 1
+    analyze_cash_flow(changed)
+    print(f"Edited frame recomputed: {analyze_cash_flow.cache.stats()}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        memoized = cache.memoize_analyzer(1, persist_dir=tmp)(analyze_cash_flow.__wrapped__)
+        memoized(data)
+        restarted = cache.memoize_analyzer(1, persist_dir=tmp)(analyze_cash_flow.__wrapped__)
+        restarted(data)
+        print(f"After restart (disk): {restarted.stats()}")
+
+        # The disk copy is bounded like the memory one, across restarts too
+        bounded = cache.memoize_analyzer(1, maxsize=4, persist_dir=tmp)(analyze_cash_flow.__wrapped__)
+        for i in range(10):
+            edited = data.copy()
+            edited.iloc[0, -1] += i + 1
+            bounded(edited)
+        files = [f for f in Path(bounded.cache.persist_dir).iterdir() if f.suffix == ".pkl"]
+        assert len(files) <= 4, f"{len(files)} cache files for maxsize 4"
+        print(f"10 distinct frames, maxsize 4: {len(files)} files on disk | {bounded.stats()}")
+
+
+def bench_incremental(args):
+    """Appending a period incrementally vs parsing and analysing everything again (equivalence + speed)."""
+    import numpy as np
+    import pandas as pd
+    from src.backend.mcp.advanced_ratios import AdvancedRatioAnalyzer
+    from src.backend.mcp.anomalies import anomaly_table
+    from src.backend.mcp.frames import LineItemIndex
+    from src.backend.mcp.incremental import IncrementalAnalysis, TrendState, ratio_table
+    from src.backend.mcp.parsing import merge_parsed, parse_file
+    from src.backend.mcp.trend_analysis import TrendAnalyzer, trend_statistics
+
+    class _File:
+        def __init__(self, path):
+            self.name = str(path)
+
+    def same(a, b):
+        return np.allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float), rtol=1e-9, equal_nan=True)
+
+    def verify(name, state, full):
+        """Asserts that every incrementally maintained result equals a full recompute over `full`"""
+        trends = TrendAnalyzer(full)
+        trend_table, yoy = trends.trend_table(), trends.yoy_growth()
+        anomalies = anomaly_table(full, methods=('level', 'yoy'))
+        latest = full.columns[-1]
+        checks = {
+            'consolidated data': state.data.equals(full) and state.data.attrs == full.attrs,
+            'trend statistics': list(state.trend_table().columns) == list(trend_table.columns) and all(
+                same(state.trend_table()[c], trend_table[c]) for c in trend_table.columns[1:]),
+            'YoY growth': list(state.yoy_growth().columns) == list(yoy.columns)
+                          and same(state.yoy_growth().iloc[:, 1:], yoy.iloc[:, 1:]),
+            'ratios': state.ratios.equals(ratio_table(AdvancedRatioAnalyzer(full).extract_items())),
+            'anomaly flags': state.anomalies.equals(anomalies[anomalies['period'] == latest].reset_index(drop=True)),
+        }
+        index = LineItemIndex(full)
+        labels = [str(label) for label in full['Line Item']] + list(full.attrs.get('aliases', {}))
+        keywords = sorted({word.lower() for label in labels for word in label.split() if len(word) > 2})
+        checks['line-item index'] = (all(state.line_items.exact(l) == index.exact(l) for l in labels)
+                                     and all(state.line_items.find(k) == index.find(k) for k in keywords))
+        failed = [check for check, ok in checks.items() if not ok]
+        assert not failed, f"{name}: incremental result differs from a full recompute: {', '.join(failed)}"
+        print(f"  {name}: {', '.join(checks)} equal a full recompute")
+
+    # 1. Bundled annual statements: 2020-2023 parsed, then 2024 appended
+    paths = sorted((Path(__file__).parent / "financials").glob("*/*.xlsx"))
+    latest = paths[-1].parent.name
+    start = time.perf_counter()
+    full, _, _ = parse_file([_File(p) for p in paths])
+    TrendAnalyzer(full).trend_table()
+    ratio_table(AdvancedRatioAnalyzer(full).extract_items())
+    anomaly_table(full, methods=('level', 'yoy'))
+    full_time = time.perf_counter() - start
+
+    history, _, _ = parse_file([_File(p) for p in paths if p.parent.name != latest])
+    state = IncrementalAnalysis(history)
+    start = time.perf_counter()
+    new, _, _ = parse_file([_File(p) for p in paths if p.parent.name == latest])
+    state.append(new)
+    inc_time = time.perf_counter() - start
+
+    print(f"Bundled statements, {latest} appended to {len(history.columns) - 1} periods:")
+    verify('annual', state, full)
+    print(f"  Full re-parse + analysis: {full_time:.3f}s | incremental: {inc_time:.3f}s")
+
+    # 2. Quarterly figures for the same items (and aliases), 2024Q4 appended to 2020Q1-2024Q3
+    rng = np.random.default_rng(0)
+    quarters = [f"{year}Q{q}" for year in range(2020, 2025) for q in range(1, 5)]
+    values = rng.lognormal(10, 0.2, (len(full), 1)) * (1 + 0.02 * np.arange(len(quarters)))
+    values *= rng.normal(1, 0.05, values.shape) * np.tile([0.9, 1.0, 1.05, 1.1], len(quarters) // 4)
+    values[rng.random(len(full)) < 0.2, :3] = np.nan   # Some items start later
+    quarterly = pd.DataFrame(values, columns=quarters)
+    quarterly.insert(0, 'Line Item', full['Line Item'].astype(str).to_numpy())
+    quarterly.attrs['aliases'] = full.attrs['aliases']
+    full_q, _ = merge_parsed([quarterly])
+    history_q, _ = merge_parsed([quarterly.drop(columns=quarters[-1])])
+    new_q, _ = merge_parsed([quarterly[['Line Item', quarters[-1]]]])
+    state = IncrementalAnalysis(history_q)
+    state.append(new_q)
+    print(f"Quarterly figures, {quarters[-1]} appended to {len(quarters) - 1} periods:")
+    verify('quarterly', state, full_q)
+
+    # 3. Trend statistics: online update vs recomputing over the full history
+    length = max(args.length, 3)
+    Y = rng.normal(100, 10, (args.n_series, length + 1)).cumsum(axis=1)
+    Y[rng.random(Y.shape) < 0.05] = np.nan
+    online = TrendState(Y[:, :length])
+    start = time.perf_counter()
+    online.append(Y[:, length])
+    update_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = trend_statistics(Y)
+    batch_time = time.perf_counter() - start
+    stats = online.statistics()
+    differ = [k for k in batch if not same(stats[k], batch[k])]
+    assert not differ, f"Online trend statistics differ from a full recompute: {differ}"
+    print(f"{args.n_series} series, period {length + 1} appended: statistics equal a full recompute")
+    print(f"  Online update: {update_time * 1000:.2f} ms | full recompute: {batch_time * 1000:.2f} ms")
+
+
+def bench_store(args):
+    """FinancialStore: portfolio write, indexed cross-company screens vs re-parsing the statements."""
+    import numpy as np
+    from src.backend.mcp.store import FinancialStore
+
+    base = _financials_frame()
+    rng = np.random.default_rng(0)
+    n_companies = min(args.n_series, 2000)
+    frames = {}
+    for i in range(n_companies):
+        df = base.copy()
+        df.iloc[:, 1:] = df.iloc[:, 1:].to_numpy() * rng.lognormal(0, 0.3, (len(df), 1))
+        frames[f"Company {i:04d}"] = df
+
+    start = time.perf_counter()
+    _financials_frame()
+    parse_time = time.perf_counter() - start
+
+    with FinancialStore(':memory:') as store:
+        start = time.perf_counter()
+        store.write_portfolio(frames)
+        write_time = time.perf_counter() - start
+        start = time.perf_counter()
+        unchanged = store.write_portfolio(frames)
+        rewrite_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(args.n_check):
+            hits = store.screen('Current Ratio', '<', 1, '2023')
+        screen_time = (time.perf_counter() - start) / args.n_check
+        start = time.perf_counter()
+        history = store.item_history('Total current assets')
+        item_time = time.perf_counter() - start
+        restored = store.frame("Company 0000")
+
+    print(f"{n_companies} companies: write {write_time:.2f}s | unchanged rewrite {rewrite_time:.2f}s "
+          f"({unchanged} rewritten) | round trip equal: {restored.equals(frames['Company 0000'])}")
+    print(f"  'Current Ratio < 1 in 2023': {len(hits)} companies in {screen_time * 1000:.2f} ms")
+    print(f"  'Total current assets' (alias) across companies: {history.shape} in {item_time * 1000:.1f} ms")
+    print(f"  Re-parsing one company's statements: {parse_time * 1000:.0f} ms")
+
+
+def bench_sql(args):
+    """Ad hoc SQL: portfolio aggregate on DuckDB and SQLite vs the same pandas groupby, and a store join."""
+    import numpy as np
+    from src.backend.mcp import sql_query
+    from src.backend.mcp.store import FinancialStore
+
+    base = _financials_frame()
+    rng = np.random.default_rng(0)
+    frames = {}
+    for i in range(min(args.n_series, 2000)):
+        df = base.copy()
+        df.iloc[:, 1:] = df.iloc[:, 1:].to_numpy() * rng.lognormal(0, 0.3, (len(df), 1))
+        frames[f"Company {i:04d}"] = df
+
+    sql = ("SELECT year, COUNT(DISTINCT entity) AS companies, SUM(value) AS total FROM financials "
+           "WHERE lower(line_item) LIKE '%revenue%' GROUP BY year ORDER BY year")
+    long = sql_query.long_table(frames)
+    start = time.perf_counter()
+    rows = long[long['line_item'].str.lower().str.contains('revenue')]
+    expected = rows.groupby('year').agg(companies=('entity', 'nunique'), total=('value', 'sum')).reset_index()
+    pandas_time = time.perf_counter() - start
+
+    duckdb = sql_query.duckdb
+    results = {}
+    for engine in (['DuckDB'] if duckdb is not None else []) + ['SQLite']:
+        sql_query.duckdb = duckdb if engine == 'DuckDB' else None
+        table, msg = sql_query.run_query(sql, frames)
+        same = np.allclose(table['total'], expected['total']) and list(table['companies']) == list(expected['companies'])
+        results[engine] = f"{msg} (matches pandas: {same})"
+    sql_query.duckdb = duckdb
+
+    print(f"{len(frames)} companies, {len(long)} values | pandas groupby {pandas_time * 1000:.1f} ms")
+    for engine, msg in results.items():
+        print(f"  {engine}: {msg}")
+
+    with FinancialStore(':memory:') as store:
+        store.write_portfolio(dict(list(frames.items())[:50]))
+        table, msg = sql_query.run_query(
+            "SELECT r.entity, r.value AS current_ratio, t.cagr_pct AS revenue_cagr FROM ratios r "
+            "JOIN trends t ON t.entity = r.entity AND t.item = 'Revenue' "
+            "WHERE r.ratio = 'Current Ratio' AND r.period = '2024' ORDER BY r.value LIMIT 5", store=store)
+        print(f"  Store join (50 companies): {msg}")
+
+
+def bench_ingestion(args):
+    """Watch-folder ingestion: syncing a new year's files vs re-parsing and re-storing the whole folder."""
+    import shutil
+    import tempfile
+    from pathlib import Path
+    from src.backend.ingestion import FolderIngestor
+    from src.backend.mcp.incremental import IncrementalAnalysis
+    from src.backend.mcp.parsing import parse_file
+    from src.backend.mcp.store import FinancialStore
+
+    class _File:
+        def __init__(self, path):
+            self.name = str(path)
+
+    source = Path(__file__).parent / 'financials'
+    years = sorted(p.name for p in source.iterdir() if p.is_dir())
+    with tempfile.TemporaryDirectory() as tmp, FinancialStore(':memory:') as store:
+        root = Path(tmp) / 'Samani'
+        for year in years[:-1]:
+            shutil.copytree(source / year, root / year)
+        ingestor = FolderIngestor(str(root), store=store)
+        ingestor.sync()
+
+        shutil.copytree(source / years[-1], root / years[-1])
+        start = time.perf_counter()
+        ingestor.sync()
+        sync_time = time.perf_counter() - start
+
+        changed = next((root / years[1]).iterdir())
+        changed.touch()
+        start = time.perf_counter()
+        ingestor.sync()
+        change_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        files = [_File(p) for p in sorted(root.glob('*/*.xlsx'))]
+        full = parse_file(files)[0]
+        IncrementalAnalysis(full)
+        store.write('full', full)
+        full_time = time.perf_counter() - start
+
+        print(f"{len(files)} files, {len(years)} years | stored data equals a full parse: "
+              f"{store.frame('Samani').equals(full)}")
+        print(f"  New year synced: {sync_time:.3f}s | one file changed: {change_time:.3f}s | "
+              f"full re-parse + analysis + store: {full_time:.3f}s")
+
+
+def bench_batch(args):
+    """Portfolio batch runner: serial vs process pool, then a resumed rerun after one company changes."""
+    import os
+    import shutil
+    import tempfile
+    from src.backend.batch import read_records, run_batch
+
+    source = Path(__file__).parent / 'financials'
+    analyses = ['ratios', 'trends', 'anomalies', 'forecast']
+    n_companies = min(args.n_series, 40)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / 'portfolio'
+        for i in range(n_companies):
+            shutil.copytree(source, root / f"Company {i:03d}")
+
+        timings = {}
+        for label, workers in (('1 worker', 1), (f'{os.cpu_count()} workers', None)):
+            output = Path(tmp) / f"{workers}.jsonl"
+            start = time.perf_counter()
+            run_batch(str(root), analyses, str(output), workers=workers, restart=True)
+            timings[label] = time.perf_counter() - start
+
+        for path in (root / "Company 000").glob('*/*'):
+            path.touch()
+        start = time.perf_counter()
+        counts = run_batch(str(root), analyses, str(output), workers=None)
+        resume_time = time.perf_counter() - start
+        statuses = {r['status'] for r in read_records(str(output)).values()}
+
+    print(f"{n_companies} companies x {', '.join(analyses)}: "
+          + " | ".join(f"{label} {t:.2f}s" for label, t in timings.items()))
+    print(f"  Resumed rerun after one company changed: {resume_time:.2f}s ({counts}) | statuses {sorted(statuses)}")
+
+
+def bench_scenarios(args):
+    """Ratio scenarios: vectorized pass vs re-running AdvancedRatioAnalyzer per scenario."""
+    import numpy as np
+    import pandas as pd
+    from src.backend.mcp import scenarios
+    from src.backend.mcp.advanced_ratios import AdvancedRatioAnalyzer, compute_ratios
+
+    data = _financials_frame()
+    base = scenarios.base_items(data)
+    shocks = scenarios.sample_scenarios({}, scenarios.DEFAULT_VOLATILITY, args.n_series)
+
+    start = time.perf_counter()
+    ratios = scenarios.scenario_ratios(base, shocks)
+    vector_time = time.perf_counter() - start
+
+    # Unshocked scenario must reproduce the analyzer's latest-year ratios
+    reported = AdvancedRatioAnalyzer(data).calculate_all_ratios()[0].iloc[:, -1]
+    base_ratios = scenarios.scenario_ratios(base, {}).iloc[0]
+    print(f"Base ratios vs AdvancedRatioAnalyzer: max |diff| {(reported - base_ratios).abs().max():.1e}")
+
+    # Loop: one compute_ratios call per scenario on scalar items
+    items = scenarios.apply_shocks(base, shocks)
+    n_loop = min(args.n_check, args.n_series)
+    start = time.perf_counter()
+    for i in range(n_loop):
+        pd.Series(compute_ratios({k: v[i] for k, v in items.items()}))
+    loop_time = (time.perf_counter() - start) / n_loop * args.n_series
+
+    print(f"{args.n_series} scenarios x {ratios.shape[1]} ratios")
+    print(f"  Vectorized pass:              {vector_time:.3f}s")
+    print(f"  Per-scenario loop (extrap.):  {loop_time:.2f}s")
+
+
+BENCHMARKS = {
+    "sentiment-batching": bench_sentiment_batching,
+    "holt-batch": bench_holt_batch,
+    "forecast-cache": bench_forecast_cache,
+    "backtest": bench_backtest,
+    "forecast-intervals": bench_forecast_intervals,
+    "projection": bench_projection,
+    "scenarios": bench_scenarios,
+    "reconciliation": bench_reconciliation,
+    "trend-stats": bench_trend_stats,
+    "anomalies": bench_anomalies,
+    "changepoints": bench_changepoints,
+    "periods": bench_periods,
+    "frames": bench_frames,
+    "line-items": bench_line_items,
+    "analyzer-cache": bench_analyzer_cache,
+    "incremental": bench_incremental,
+    "store": bench_store,
+    "sql": bench_sql,
+    "ingestion": bench_ingestion,
+    "batch": bench_batch,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--text", help="Text file to use instead of the synthetic report")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--max-chars", type=int, default=500)
+    parser.add_argument("--n-series", type=int, default=10000)
+    parser.add_argument("--length", type=int, default=10)
+    parser.add_argument("--n-check", type=int, default=200, help="Series also fitted with statsmodels")
+    parser.add_argument("--steps", type=int, default=3)
+    args = parser.parse_args()
+    BENCHMARKS[args.benchmark](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,51 @@
 from src.backend.mcp.parsing import parse_file
+from src.backend.mcp.periods import to_annual
 from src.backend.mcp.extraction import extract_financial_data
-from src.backend.mcp.forecasting import generate_forecast
+from src.backend.mcp.forecasting import forecast_with_intervals, forecast_all_line_items, format_forecast_table, format_interval_forecast
+from src.backend.mcp.backtesting import backtest_line_items, format_backtest_table
 from src.backend.mcp.ratios import calculate_ratios
 from src.backend.mcp.sentiment import analyze_sentiment
+from src.backend.mcp.sections import analyze_section_sentiment, match_section, KNOWN_SECTIONS
 from src.backend.mcp.advanced_ratios import analyze_financial_ratios
 from src.backend.mcp.cashflow_analysis import analyze_cash_flow
 from src.backend.mcp.balance_sheet_analysis import analyze_balance_sheet
 from src.backend.mcp.income_statement_analysis import analyze_income_statement
 from src.backend.mcp.trend_analysis import analyze_trends_and_anomalies
+from src.backend.mcp.anomalies import screen_anomalies, format_anomaly_table
+from src.backend.mcp.projection import project_financial_statements
+from src.backend.mcp.reconciliation import reconciled_forecast, format_reconciled_table
+from src.backend.mcp.scenarios import analyze_scenarios, parse_shocks
 from src.backend.cloud_config.config import ModalConfig
 
-def process_request(file_objs, query):
+# Intents whose analyses work on yearly figures (the others use every period)
+ANNUAL_INTENTS = {"advanced_ratios", "cashflow", "balance_sheet", "income_statement", "ratios",
+                  "backtest", "reconciled_forecast", "projection", "scenarios"}
+
+def _statement_from_query(query_lower):
+    """Statement named in the query ('income_statement', 'balance_sheet', 'cash_flow') or None"""
+    statement = None
+    for k, v in {"income statement": "income_statement", "profit or loss": "income_statement",
+                 "balance sheet": "balance_sheet", "financial position": "balance_sheet",
+                 "cash flow": "cash_flow"}.items():
+        if k in query_lower:
+            statement = v
+    return statement
+
+def process_request(file_objs, query, models=None):
+    """
+    Parses the uploaded files and routes the query to the matching analysis.
+
+    Args:
+        file_objs: Uploaded file objects (anything with a .name path)
+        query: Free-text analysis request
+        models: Optional ModelRegistry with models loaded by the caller (e.g. a
+            GPU container); falls back to the module-level defaults
+
+    Returns:
+        tuple: (result_text, logs)
+    """
     logs = []
+    sentiment_model = models.get('sentiment') if models is not None else None
     
     # 1. Parsing (Returns Data AND Text)
     logs.append("--- Step 1: Ingesting Files ---")
@@ -27,6 +61,16 @@ def process_request(file_objs, query):
     
     if any(x in query_lower for x in ["sentiment", "tone", "feeling", "opinion", "qualitative", "summary", "tone of management"]):
         intent = "sentiment"
+    elif any(x in query_lower for x in ["backtest", "forecast accuracy", "forecast error", "best model"]):
+        intent = "backtest"
+    elif any(x in query_lower for x in ["reconcile", "coherent", "add up", "hierarchical forecast"]):
+        intent = "reconciled_forecast"
+    elif any(x in query_lower for x in ["three statement", "3 statement", "three-statement", "financial model", "driver"]):
+        intent = "projection"
+    elif any(x in query_lower for x in ["what if", "what happens", "scenario", "sensitivity", "stress test", "monte carlo", "tornado"]):
+        intent = "scenarios"
+    elif any(x in query_lower for x in ["forecast all", "forecast every", "all line items", "full forecast"]):
+        intent = "forecast_all"
     elif any(x in query_lower for x in ["advanced ratio", "dupont", "efficiency", "solvency", "coverage", "liquidity ratio", "profitability ratio"]):
         intent = "advanced_ratios"
     elif any(x in query_lower for x in ["cash flow", "cfo", "fcf", "free cash", "operating cash", "cash from operations"]):
@@ -35,13 +79,23 @@ def process_request(file_objs, query):
         intent = "balance_sheet"
     elif any(x in query_lower for x in ["income statement", "revenue", "expenses", "profitability", "margin", "ebit", "ebitda"]):
         intent = "income_statement"
-    elif any(x in query_lower for x in ["trend", "anomaly", "volatility", "consistency", "forecast next", "projection"]):
+    elif any(x in query_lower for x in ["anomalies", "outlier", "unusual", "red flag", "screen"]):
+        intent = "anomalies"
+    elif any(x in query_lower for x in ["trend", "anomaly", "volatility", "consistency", "forecast next", "projection", "structural break", "regime", "change point"]):
         intent = "trends"
     elif any(x in query_lower for x in ["ratio", "margin", "profitability", "liquidity"]):
         intent = "ratios"
     elif any(x in query_lower for x in ["forecast", "predict", "future"]):
         intent = "forecast"
     
+    # Ratio, statement and projection analyses work on yearly figures: quarterly or monthly
+    # data is annualized here, only for those intents
+    annual_data = None
+    if data is not None and intent in ANNUAL_INTENTS:
+        annual_data = to_annual(data)
+        if annual_data is not data:
+            logs.append(f"🗓️ Annualized {data.shape[1] - 1} periods into {annual_data.shape[1] - 1} years for annual analyses.")
+    
     # 3. Execution
     result_text = ""
     
@@ -51,7 +105,11 @@ def process_request(file_objs, query):
             return "⚠️ Sentiment Analysis requires text. Please upload a PDF (Annual Report) or .txt file containing management commentary.", "\n".join(logs)
         
         logs.append("--- Step 3: Running FinBERT Sentiment Model ---")
-        sentiment_report, s_msg = analyze_sentiment(text_content)
+        # Section-specific questions ("tone of the chairman's statement") score only that section
+        if "section" in query_lower or match_section(query_lower, list(KNOWN_SECTIONS)):
+            sentiment_report, s_msg = analyze_section_sentiment(text_content, query, model=sentiment_model)
+        else:
+            sentiment_report, s_msg = analyze_sentiment(text_content, model=sentiment_model)
         logs.append(s_msg)
         result_text = sentiment_report
 
@@ -60,7 +118,7 @@ def process_request(file_objs, query):
         if data is None: 
             return "No numeric data found for advanced ratio analysis.", "\n".join(logs)
         logs.append("--- Step 3: Calculating Advanced Financial Ratios ---")
-        result_text, msg = analyze_financial_ratios(data)
+        result_text, msg = analyze_financial_ratios(annual_data)
         logs.append(msg)
 
     # --- PATH C: CASH FLOW ANALYSIS ---
@@ -68,7 +126,7 @@ def process_request(file_objs, query):
         if data is None: 
             return "No numeric data found for cash flow analysis.", "\n".join(logs)
         logs.append("--- Step 3: Analyzing Cash Flows ---")
-        result_text, msg = analyze_cash_flow(data)
+        result_text, msg = analyze_cash_flow(annual_data)
         logs.append(msg)
 
     # --- PATH D: BALANCE SHEET ANALYSIS ---
@@ -76,7 +134,7 @@ def process_request(file_objs, query):
         if data is None: 
             return "No numeric data found for balance sheet analysis.", "\n".join(logs)
         logs.append("--- Step 3: Analyzing Balance Sheet ---")
-        result_text, msg = analyze_balance_sheet(data)
+        result_text, msg = analyze_balance_sheet(annual_data)
         logs.append(msg)
 
     # --- PATH E: INCOME STATEMENT ANALYSIS ---
@@ -84,9 +142,18 @@ def process_request(file_objs, query):
         if data is None: 
             return "No numeric data found for income statement analysis.", "\n".join(logs)
         logs.append("--- Step 3: Analyzing Income Statement ---")
-        result_text, msg = analyze_income_statement(data)
+        result_text, msg = analyze_income_statement(annual_data)
         logs.append(msg)
 
+    # --- PATH F2: ANOMALY SCREEN (ALL ITEMS & RATIOS) ---
+    elif intent == "anomalies":
+        if data is None: 
+            return "No numeric data found for anomaly screening.", "\n".join(logs)
+        logs.append("--- Step 3: Screening All Line Items & Ratios for Anomalies ---")
+        table, a_msg = screen_anomalies(data)
+        logs.append(a_msg)
+        result_text = ("### 🚨 Anomaly Screen\n\n" + format_anomaly_table(table, limit=25)) if table is not None else a_msg
+
     # --- PATH F: TREND & ANOMALY ANALYSIS ---
     elif intent == "trends":
         if data is None: 
@@ -100,7 +167,7 @@ def process_request(file_objs, query):
         if data is None: 
             return "No numeric data found for ratios.", "\n".join(logs)
         logs.append("--- Step 3: Calculating Basic Financial Ratios ---")
-        result_text, _ = calculate_ratios(data)
+        result_text, _ = calculate_ratios(annual_data)
 
     # --- PATH H: FORECASTING ---
     elif intent == "forecast":
@@ -116,13 +183,59 @@ def process_request(file_objs, query):
         series, _ = extract_financial_data(data, target_keyword)
         
         if series is not None:
-            pred, f_msg = generate_forecast(series, steps=3)
+            pred, f_msg = forecast_with_intervals(series, steps=3)
             logs.append(f_msg)
             if pred is not None:
-                result_text = f"### 🔮 Forecast: {target_keyword}\nNext 3 Years: {[round(x,0) for x in pred.values]}"
+                result_text = format_interval_forecast(pred, target_keyword)
         else:
              result_text = f"Could not find data for '{target_keyword}'."
 
+    # --- PATH H2: FORECAST EVERY LINE ITEM ---
+    elif intent == "forecast_all":
+        if data is None: 
+            return "No numeric data found for forecasting.", "\n".join(logs)
+        statement = _statement_from_query(query_lower)
+        logs.append(f"--- Step 3: Forecasting All Line Items ({statement or 'all statements'}) ---")
+        table, f_msg = forecast_all_line_items(data, steps=3, statement=statement)
+        logs.append(f_msg)
+        result_text = format_forecast_table(table) if table is not None else f_msg
+
+    # --- PATH H3: FORECAST BACKTEST / MODEL SELECTION ---
+    elif intent == "backtest":
+        if data is None: 
+            return "No numeric data found for backtesting.", "\n".join(logs)
+        statement = _statement_from_query(query_lower)
+        logs.append(f"--- Step 3: Backtesting Forecast Models ({statement or 'all statements'}) ---")
+        table, b_msg = backtest_line_items(annual_data, horizon=3, statement=statement)
+        logs.append(b_msg)
+        result_text = format_backtest_table(table) if table is not None else b_msg
+
+    # --- PATH H3b: RECONCILED (COHERENT) FORECAST ---
+    elif intent == "reconciled_forecast":
+        if data is None: 
+            return "No numeric data found for reconciled forecasting.", "\n".join(logs)
+        logs.append("--- Step 3: Forecasting and Reconciling Statement Subtotals ---")
+        table, r_msg = reconciled_forecast(annual_data, steps=3)
+        logs.append(r_msg)
+        result_text = format_reconciled_table(table) if table is not None else r_msg
+
+    # --- PATH H4: DRIVER-BASED THREE-STATEMENT PROJECTION ---
+    elif intent == "projection":
+        if data is None: 
+            return "No numeric data found for projection.", "\n".join(logs)
+        logs.append("--- Step 3: Projecting Three Statements ---")
+        result_text, p_msg = project_financial_statements(annual_data, years=3)
+        logs.append(p_msg)
+
+    # --- PATH H5: SCENARIO & SENSITIVITY ANALYSIS ---
+    elif intent == "scenarios":
+        if data is None: 
+            return "No numeric data found for scenario analysis.", "\n".join(logs)
+        shocks = parse_shocks(query)
+        logs.append(f"--- Step 3: Running Ratio Scenarios (stated shocks: {shocks or 'none'}) ---")
+        result_text, s_msg = analyze_scenarios(annual_data, shocks)
+        logs.append(s_msg)
+
     # --- PATH I: EXTRACTION (DEFAULT) ---
     else:
         if data is None: 
@@ -135,9 +248,15 @@ Try asking for:
 • **Cash Flow Analysis**: Operating, investing, financing flows
 • **Balance Sheet Analysis**: Asset composition, leverage, equity strength
 • **Income Statement Analysis**: Revenue trends, margin analysis, expense structure
-• **Trend Analysis**: Anomaly detection, volatility, forecasts
+• **Trend Analysis**: Anomaly detection, structural breaks, volatility, forecasts
+• **Anomaly Screen**: Robust outlier ranking across every line item and ratio
 • **Sentiment Analysis**: Upload a PDF annual report for tone analysis
 • **Forecast**: Predict future revenue or earnings
+• **Forecast All Line Items**: Project every line item (or one statement) with fit diagnostics
+• **Three-Statement Projection**: Driver-based, balanced P&L, balance sheet and cash flow by scenario
+• **Scenarios**: "What if revenue falls 10% and finance costs rise 20%?" (Monte Carlo + tornado)
+• **Reconciled Forecast**: Subtotal forecasts that add up to their components ("reconcile forecasts")
+• **Forecast Backtest**: Rolling-origin accuracy (MAPE/MASE) and best model per line item
 """
 
     return result_text, "\n".join(logs)
\ No newline at end of file
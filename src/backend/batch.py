@@ -0,0 +1,260 @@
+"""
+Portfolio Batch Runner
+Headless runs of the analyses over a portfolio: a root folder with one sub-tree per
+company, each laid out like financials/<year>/.
+    - companies run in a process pool, one task per company
+    - each finished company is appended to a JSON Lines file straight away (and the
+      file can be converted to Parquet at the end when a Parquet engine is installed)
+    - a company whose files fail to parse is retried with backoff
+    - runs are resumable: a company already recorded as 'ok' for the same files and
+      analyses is skipped, so a nightly rerun only redoes companies that changed
+
+Each record: company, status ('ok', 'partial' or 'error'), attempts, inputs (fingerprint
+of the files and analyses), periods, parse_seconds, seconds, analyses (name -> result,
+message, seconds), and parse_errors / error where relevant.
+
+Usage:
+    python src/backend/batch.py portfolio/ --analyses ratios,trends,anomalies --output results.jsonl
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from types import SimpleNamespace
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import pandas as pd
+
+# Add the project root to the python path to allow imports from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.backend.cloud_config.config import ModalConfig
+from src.backend.ingestion import scan
+from src.backend.mcp.advanced_ratios import analyze_financial_ratios
+from src.backend.mcp.anomalies import screen_anomalies
+from src.backend.mcp.backtesting import backtest_line_items
+from src.backend.mcp.balance_sheet_analysis import analyze_balance_sheet
+from src.backend.mcp.cache import fingerprint
+from src.backend.mcp.cashflow_analysis import analyze_cash_flow
+from src.backend.mcp.forecasting import forecast_all_line_items
+from src.backend.mcp.income_statement_analysis import analyze_income_statement
+from src.backend.mcp.parsing import parse_file
+from src.backend.mcp.periods import to_annual
+from src.backend.mcp.projection import project_financial_statements
+from src.backend.mcp.store import FinancialStore
+from src.backend.mcp.trend_analysis import analyze_trends_and_anomalies
+
+logger = logging.getLogger(__name__)
+
+# Name -> fn(data, annual data) returning an MCP (report or table, message) tuple. Ratio,
+# statement and projection analyses use yearly figures, as in agent_logic.process_request.
+# Forecasts run serially inside a worker: the companies are already spread over the pool.
+ANALYSES: Dict[str, Callable[[pd.DataFrame, pd.DataFrame], Tuple]] = {
+    'ratios': lambda data, annual: analyze_financial_ratios(annual),
+    'cashflow': lambda data, annual: analyze_cash_flow(annual),
+    'balance_sheet': lambda data, annual: analyze_balance_sheet(annual),
+    'income_statement': lambda data, annual: analyze_income_statement(annual),
+    'trends': lambda data, annual: analyze_trends_and_anomalies(data),
+    'anomalies': lambda data, annual: screen_anomalies(data),
+    'forecast': lambda data, annual: forecast_all_line_items(data, ModalConfig.FORECAST_STEPS, max_workers=1),
+    'backtest': lambda data, annual: backtest_line_items(data, max_workers=1),
+    'projection': lambda data, annual: project_financial_statements(annual),
+}
+
+
+def find_companies(root: str) -> Dict[str, str]:
+    """Company name -> folder, for each subfolder of root that holds statement files"""
+    companies = {}
+    for name in sorted(os.listdir(root)):
+        folder = os.path.join(root, name)
+        if os.path.isdir(folder) and not name.startswith('.') and scan(folder):
+            companies[name] = folder
+    return companies
+
+
+def inputs_key(folder: str, analyses: Sequence[str]) -> str:
+    """Fingerprint of a company's files (paths, times, sizes) and the requested analyses"""
+    return fingerprint(sorted((os.path.relpath(p, folder), sig) for p, sig in scan(folder).items()), list(analyses))
+
+
+def _jsonable(result):
+    """Analysis output for JSON: reports as text, tables as records"""
+    if isinstance(result, pd.DataFrame):
+        table = result.reset_index() if result.index.name is not None else result
+        return json.loads(table.to_json(orient='records'))
+    return result
+
+
+def run_company(company: str, folder: str, analyses: Sequence[str], retries: int = 2,
+                retry_delay: float = 1.0, keep_data: bool = False) -> dict:
+    """
+    Parses one company's files (retrying failures) and runs the analyses
+
+    Returns:
+        dict: The company's record ('data' holds the parsed DataFrame when keep_data)
+    """
+    start = time.perf_counter()
+    record = {'company': company, 'status': 'ok', 'attempts': 0, 'inputs': inputs_key(folder, analyses)}
+    files = [SimpleNamespace(name=path) for path in sorted(scan(folder))]
+
+    data, errors = None, []
+    for attempt in range(1, retries + 2):
+        record['attempts'] = attempt
+        try:
+            data, _, msg = parse_file(files)
+            errors = [line for line in msg.split("\n") if line.startswith("❌")]
+        except Exception as e:
+            data, errors = None, [f"❌ {str(e)}"]
+        if data is not None and not errors:
+            break
+        if attempt <= retries:
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+    record['parse_seconds'] = round(time.perf_counter() - start, 4)
+
+    if data is None:
+        record.update(status='error', error=errors[-1] if errors else "No numeric data found.",
+                      seconds=record['parse_seconds'])
+        return record
+    if errors:
+        record.update(status='partial', parse_errors=errors)
+
+    annual = to_annual(data)
+    record['periods'] = list(data.columns[1:])
+    record['analyses'] = {}
+    for name in analyses:
+        began = time.perf_counter()
+        try:
+            result, msg = ANALYSES[name](data, annual)
+            outcome = {'result': _jsonable(result), 'message': msg}
+        except Exception as e:
+            outcome = {'error': str(e)}
+            record['status'] = 'partial'
+        outcome['seconds'] = round(time.perf_counter() - began, 4)
+        record['analyses'][name] = outcome
+
+    record['seconds'] = round(time.perf_counter() - start, 4)
+    if keep_data:
+        record['data'] = data
+    return record
+
+
+def read_records(path: str) -> Dict[str, dict]:
+    """Latest record per company in a JSON Lines results file (a truncated last line is ignored)"""
+    records = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                records[record['company']] = record
+    return records
+
+
+def _ends_with_newline(path: str) -> bool:
+    with open(path, 'rb') as f:
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def to_parquet(jsonl_path: str, parquet_path: str) -> str:
+    """Writes the latest record per company to Parquet (analyses as JSON text); returns a status message"""
+    records = list(read_records(jsonl_path).values())
+    table = pd.DataFrame(records)
+    for column in ('analyses', 'parse_errors', 'periods'):
+        if column in table:
+            table[column] = table[column].map(lambda v: None if not isinstance(v, (dict, list)) else json.dumps(v))
+    try:
+        table.to_parquet(parquet_path, index=False)
+    except ImportError:
+        return "⚠️ Parquet not written: install pyarrow (or fastparquet)."
+    return f"Wrote {len(table)} companies to {parquet_path}."
+
+
+def run_batch(root: str, analyses: Sequence[str], output: str, workers: Optional[int] = None,
+              retries: int = 2, retry_delay: float = 1.0, store_path: Optional[str] = None,
+              restart: bool = False) -> Dict[str, int]:
+    """
+    Runs the analyses for every company under root, appending records to `output`
+
+    Args:
+        root: Folder with one statements sub-tree per company
+        analyses: Names from ANALYSES
+        output: JSON Lines results file (also the progress record for resuming)
+        workers: Process pool size (default: one per CPU)
+        retries: Extra parse attempts per company
+        retry_delay: Seconds before the first retry (doubling for each later one)
+        store_path: Also write each parsed company to this FinancialStore
+        restart: Ignore and overwrite earlier results instead of resuming
+
+    Returns:
+        dict: Counts of companies per status, plus 'skipped'
+    """
+    unknown = [a for a in analyses if a not in ANALYSES]
+    if unknown:
+        raise ValueError(f"Unknown analyses {unknown} (use {sorted(ANALYSES)}).")
+
+    companies = find_companies(root)
+    done = {} if restart else read_records(output)
+    todo = {name: folder for name, folder in companies.items()
+            if not (done.get(name, {}).get('status') == 'ok'
+                    and done[name].get('inputs') == inputs_key(folder, analyses))}
+    counts = {'skipped': len(companies) - len(todo)}
+    logger.info("%d companies: %d to run, %d up to date.", len(companies), len(todo), counts['skipped'])
+
+    store = FinancialStore(store_path) if store_path else None
+    try:
+        with open(output, 'w' if restart else 'a') as out, ProcessPoolExecutor(max_workers=workers) as pool:
+            if out.tell() and not _ends_with_newline(output):
+                out.write("\n")  # An interrupted run left a partial line
+            futures = {pool.submit(run_company, name, folder, list(analyses), retries, retry_delay,
+                                   store is not None): name for name, folder in todo.items()}
+            for n, future in enumerate(as_completed(futures), 1):
+                name = futures[future]
+                try:
+                    record = future.result()
+                except Exception as e:  # Worker crashed
+                    record = {'company': name, 'status': 'error', 'attempts': 0, 'error': str(e)}
+                data = record.pop('data', None)
+                if store is not None and data is not None:
+                    store.write(name, data)
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+                counts[record['status']] = counts.get(record['status'], 0) + 1
+                logger.info("[%d/%d] %s: %s in %.2fs (%d attempt%s)", n, len(todo), name, record['status'],
+                            record.get('seconds', 0.0), record['attempts'], '' if record['attempts'] == 1 else 's')
+    finally:
+        if store is not None:
+            store.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run analyses over a portfolio of companies.")
+    parser.add_argument("root", help="Folder with one sub-tree per company, each laid out like financials/")
+    parser.add_argument("--analyses", default="ratios,trends,anomalies",
+                        help=f"Comma-separated: {', '.join(ANALYSES)}")
+    parser.add_argument("--output", default="portfolio_results.jsonl", help="JSON Lines results file")
+    parser.add_argument("--parquet", help="Also write the latest results to this Parquet file")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--retries", type=int, default=2, help="Extra parse attempts per company")
+    parser.add_argument("--store", help="Also write parsed companies to this store database")
+    parser.add_argument("--restart", action="store_true", help="Rerun every company instead of resuming")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    start = time.perf_counter()
+    counts = run_batch(args.root, [a.strip() for a in args.analyses.split(',') if a.strip()], args.output,
+                       workers=args.workers, retries=args.retries, store_path=args.store, restart=args.restart)
+    logger.info("Done in %.1fs: %s", time.perf_counter() - start,
+                ", ".join(f"{count} {status}" for status, count in counts.items()))
+    if args.parquet:
+        logger.info(to_parquet(args.output, args.parquet))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,8 @@
+import os
+
+# Runtime data (store database) lives under the project root, not the working directory
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../../'))
+
 # Configuration for serverless execution or environment setup
 class ModalConfig:
     TIMEOUT_SECONDS = 300
@@ -8,4 +13,26 @@ class ModalConfig:
     SUPPORTED_EXTENSIONS = {'.csv', '.xlsx', '.pdf'}
 
     # Default forecasting parameters
-    FORECAST_STEPS = 4
\ No newline at end of file
+    FORECAST_STEPS = 4
+
+    # Below this many tasks (series or blocks) a process pool costs more to start than it saves
+    PARALLEL_MIN_ITEMS = 8
+
+    # Fitted-model cache (set SAMANI_CACHE_DIR to persist fits across restarts)
+    FORECAST_CACHE_SIZE = 512
+    CACHE_DIR = os.environ.get("SAMANI_CACHE_DIR")
+
+    # Memoized analyzer reports (per analyzer; persisted under CACHE_DIR when set)
+    ANALYZER_CACHE_SIZE = 128
+
+    # Embedded database of parsed statements, ratios and trends (store.FinancialStore)
+    DATA_DIR = os.environ.get("SAMANI_DATA_DIR", os.path.join(PROJECT_ROOT, "data"))
+    STORE_PATH = os.environ.get("SAMANI_STORE_PATH", os.path.join(DATA_DIR, "samani_financials.db"))
+
+    # Ad hoc SQL queries (sql_query.run_query): rows returned at most, seconds before interruption
+    SQL_MAX_ROWS = 1000
+    SQL_TIMEOUT_SECONDS = 10.0
+
+    # Watch-folder ingestion (ingestion.py): rescan interval without file events, quiet period before parsing
+    INGEST_POLL_SECONDS = 5.0
+    INGEST_DEBOUNCE_SECONDS = 2.0
@@ -0,0 +1,216 @@
+"""
+Watch-Folder Ingestion
+Long-running service that keeps one company's stored dataset current with a folder of
+statements laid out like financials/<year>/:
+    - file events (watchdog, when installed) or a periodic rescan trigger a scan of the tree
+    - a burst of writes is debounced: files are parsed once the tree has been quiet for
+      INGEST_DEBOUNCE_SECONDS
+    - only new or changed files go through parse_file; every file's parsed frame is kept,
+      so a change or deletion re-merges the frames without re-parsing the others
+    - new files extend the IncrementalAnalysis (new periods are appended, revisions
+      recompute in full), and the result is written to the FinancialStore with the
+      already computed ratios and trends
+
+Usage:
+    python src/backend/ingestion.py financials --entity "Samani Limited"
+"""
+import argparse
+import logging
+import os
+import sys
+import threading
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+# Add the project root to the python path to allow imports from src
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
+
+from src.backend.cloud_config.config import ModalConfig
+from src.backend.mcp.incremental import IncrementalAnalysis
+from src.backend.mcp.parsing import merge_parsed, parse_file
+from src.backend.mcp.store import FinancialStore
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+TABULAR_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+
+
+def scan(root: str) -> Dict[str, Tuple[int, int]]:
+    """Statement files under root -> (modification time in ns, size); editor lock files skipped"""
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            if name.startswith(('~$', '.')) or os.path.splitext(name)[1].lower() not in TABULAR_EXTENSIONS:
+                continue
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:  # Removed while scanning
+                continue
+            files[path] = (stat.st_mtime_ns, stat.st_size)
+    return files
+
+
+class FolderIngestor:
+    """Parsed frames, analysis and stored data of one watched folder"""
+
+    def __init__(self, root: str, entity: Optional[str] = None, store: Optional[FinancialStore] = None,
+                 debounce: float = ModalConfig.INGEST_DEBOUNCE_SECONDS, dtype: str = 'float64'):
+        """
+        Args:
+            root: Folder to watch (subfolders included)
+            entity: Name the data is stored under (default: the folder name)
+            store: Target store (default: FinancialStore at ModalConfig.STORE_PATH)
+            debounce: Seconds without changes before a burst of writes is parsed
+            dtype: Value dtype of the parsed frames ('float64' or 'float32')
+        """
+        self.root = os.path.abspath(root)
+        self.entity = entity or os.path.basename(self.root.rstrip(os.sep))
+        self.store = store if store is not None else FinancialStore()
+        self.debounce = debounce
+        self.dtype = dtype
+        self.analysis: Optional[IncrementalAnalysis] = None
+        self._seen: Dict[str, Tuple[int, int]] = {}
+        self._frames: Dict[str, Optional[pd.DataFrame]] = {}  # None: no tabular data (or a parse error)
+
+    def sync(self, snapshot: Optional[Dict[str, Tuple[int, int]]] = None) -> List[str]:
+        """
+        Parses new and changed files and updates the analysis and the store
+
+        Args:
+            snapshot: scan() result to sync to (default: scan now)
+
+        Returns:
+            list: Log lines (empty when nothing changed)
+        """
+        snapshot = scan(self.root) if snapshot is None else snapshot
+        added = sorted(p for p in snapshot if p not in self._seen)
+        changed = sorted(p for p in snapshot if p in self._seen and self._seen[p] != snapshot[p])
+        removed = sorted(p for p in self._seen if p not in snapshot)
+        if not (added or changed or removed):
+            return []
+
+        logs = [f"📂 {self.entity}: {len(added)} new, {len(changed)} changed, {len(removed)} removed file(s)."]
+        for path in added + changed:
+            df, _, parse_logs = parse_file([SimpleNamespace(name=path)], self.dtype)
+            logs.extend(line for line in parse_logs.split("\n") if line)
+            self._frames[path] = df
+            self._seen[path] = snapshot[path]
+        for path in removed:
+            del self._frames[path], self._seen[path]
+
+        frames = [df for _, df in sorted(self._frames.items()) if df is not None]
+        if not frames:
+            self.analysis = None
+            self.store.delete(self.entity)
+            logs.append(f"🗑️ No statements left: {self.entity} removed from the store.")
+            return logs
+
+        new = [self._frames[p] for p in added if self._frames[p] is not None]
+        if self.analysis is not None and not changed and not removed:
+            if not new:
+                return logs
+            new_data, merge_logs = merge_parsed(new)
+            logs.extend(self.analysis.append(new_data))
+        else:
+            data, merge_logs = merge_parsed(frames)
+            logs.extend(merge_logs)
+            self.analysis = IncrementalAnalysis(data)
+            logs.append(f"♻️ Analysis rebuilt from {len(frames)} parsed file(s).")
+
+        data = self.analysis.data
+        annual = data.attrs.get('frequency') == 'A'
+        if self.store.write(self.entity, data, ratios=self.analysis.ratios if annual else None,
+                            trends=self.analysis.trend_table()):
+            logs.append(f"💾 Stored {self.entity}: {len(data)} line items, periods {', '.join(self.analysis.periods)}.")
+        return logs
+
+    def _settle(self, snapshot: Dict[str, Tuple[int, int]], changed: threading.Event,
+                stop: threading.Event) -> Optional[Dict[str, Tuple[int, int]]]:
+        """Rescans until the tree is unchanged for `debounce` seconds; None if stopped"""
+        while True:
+            changed.clear()
+            if stop.wait(self.debounce):
+                return None
+            latest = scan(self.root)
+            if latest == snapshot and not changed.is_set():
+                return snapshot
+            snapshot = latest
+
+    def run(self, poll_interval: float = ModalConfig.INGEST_POLL_SECONDS,
+            stop: Optional[threading.Event] = None) -> None:
+        """
+        Syncs, then watches the folder until `stop` is set (or the process is interrupted).
+        With watchdog, file events wake the loop and poll_interval is only a safety
+        rescan; without it the folder is rescanned every poll_interval seconds.
+        """
+        stop = stop or threading.Event()
+        changed = threading.Event()
+        observer = None
+        if Observer is not None:
+            handler = FileSystemEventHandler()
+            handler.on_any_event = lambda event: changed.set()
+            observer = Observer()
+            observer.schedule(handler, self.root, recursive=True)
+            observer.start()
+        logger.info("Watching %s for %s (%s).", self.root, self.entity,
+                    "file events" if observer is not None else f"polling every {poll_interval:g}s")
+
+        try:
+            for line in self.sync():
+                logger.info(line)
+            while not stop.is_set():
+                if observer is not None:
+                    changed.wait(poll_interval)
+                elif stop.wait(poll_interval):
+                    break
+                snapshot = scan(self.root)
+                if snapshot == self._seen:
+                    changed.clear()
+                    continue
+                snapshot = self._settle(snapshot, changed, stop)
+                if snapshot is None:
+                    break
+                for line in self.sync(snapshot):
+                    logger.info(line)
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a statements folder and keep the financial store current.")
+    parser.add_argument("root", help="Folder laid out like financials/<year>/")
+    parser.add_argument("--entity", help="Company name in the store (default: the folder name)")
+    parser.add_argument("--store", default=ModalConfig.STORE_PATH, help="Store database file")
+    parser.add_argument("--poll", type=float, default=ModalConfig.INGEST_POLL_SECONDS,
+                        help="Seconds between rescans (safety rescan with watchdog)")
+    parser.add_argument("--debounce", type=float, default=ModalConfig.INGEST_DEBOUNCE_SECONDS,
+                        help="Quiet seconds before a burst of writes is parsed")
+    parser.add_argument("--once", action="store_true", help="Sync once and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    with FinancialStore(args.store) as store:
+        ingestor = FolderIngestor(args.root, args.entity, store, debounce=args.debounce)
+        if args.once:
+            for line in ingestor.sync():
+                logger.info(line)
+            return
+        try:
+            ingestor.run(args.poll)
+        except KeyboardInterrupt:
+            logger.info("Stopped.")
+
+
+if __name__ == "__main__":
+    main()
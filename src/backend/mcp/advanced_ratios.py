@@ -4,123 +4,75 @@ Calculates comprehensive profitability, liquidity, solvency, and efficiency rati
 """
 import pandas as pd
 import numpy as np
-from typing import Dict, Tuple, Optional
+from typing import Any, Dict, Tuple, Optional
+
+from src.backend.mcp.cache import memoize_analyzer
+from src.backend.mcp.frames import LineItemIndex, compact_frame
+
+REPORT_VERSION = 1  # Bump when the report changes (invalidates memoized reports)
 
 class AdvancedRatioAnalyzer:
     """Comprehensive financial ratio calculator with trend analysis"""
     
-    def __init__(self, df: pd.DataFrame):
+    def __init__(self, df: pd.DataFrame, line_items: Optional[LineItemIndex] = None):
         """
         Initialize with consolidated financial data
         Args:
             df: DataFrame with 'Line Item' as first column, then years as columns
+            line_items: Existing index of df's line items (built if not given)
         """
-        self.df = df
+        self.df = compact_frame(df)
+        self.line_items = line_items if line_items is not None else LineItemIndex(self.df)
         self.ratios = {}
         self.warnings = []
     
     def _get_series(self, keywords: list) -> Optional[pd.Series]:
         """Safely retrieve financial line item by keywords"""
         for key in keywords:
-            match = self.df[self.df['Line Item'].astype(str).str.lower().str.contains(key.lower(), na=False)]
-            if not match.empty:
-                numeric_data = match.iloc[0, 1:].apply(pd.to_numeric, errors='coerce')
+            pos = self.line_items.first(key)
+            if pos is not None:
+                numeric_data = self.df.iloc[pos, 1:]
                 if numeric_data.notna().sum() > 0:  # Has at least one numeric value
                     return numeric_data
         return None
     
+    def extract_items(self) -> Dict[str, Optional[pd.Series]]:
+        """Key line items used by the ratio set (None where not found)"""
+        return {
+            # Income Statement Items
+            'revenue': self._get_series(['Revenue', 'Total Revenue', 'Sales', 'Total Sales']),
+            'cogs': self._get_series(['Cost of Goods Sold', 'COGS', 'Cost of sales']),
+            'gross_profit': self._get_series(['Gross Profit']),
+            'operating_profit': self._get_series(['Operating Profit', 'EBIT', 'Operating Income']),
+            'ebitda': self._get_series(['EBITDA', 'Earnings Before Tax', 'EBT']),
+            'net_income': self._get_series(['Net Income', 'Profit for the Year', 'Net Profit', 'PAT', 'Profit After Tax']),
+
+            # Balance Sheet Items
+            'current_assets': self._get_series(['Total Current Assets', 'Current Assets']),
+            'current_liabilities': self._get_series(['Total Current Liabilities', 'Current Liabilities']),
+            'inventory': self._get_series(['Inventory', 'Inventories', 'Stock']),
+            'receivables': self._get_series(['Accounts Receivable', 'Trade Receivables', 'Receivables']),
+            'cash': self._get_series(['Cash', 'Cash and Cash Equivalents', 'Bank Balances']),
+
+            'total_assets': self._get_series(['Total Assets', 'TOTAL ASSETS']),
+            'total_liabilities': self._get_series(['Total Liabilities', 'Total Debt']),
+            'total_equity': self._get_series(['Total Equity', 'Shareholders Equity', 'Share Capital']),
+
+            # Liabilities breakdown
+            'short_term_debt': self._get_series(['Short-term Debt', 'Current Portion of Long-term Debt']),
+            'long_term_debt': self._get_series(['Long-term Debt', 'Non-Current Liabilities']),
+
+            # Operating expenses
+            'operating_expenses': self._get_series(['Operating Expenses', 'Selling General and Admin']),
+            'depreciation': self._get_series(['Depreciation', 'Depreciation and Amortization']),
+            'interest_expense': self._get_series(['Interest Expense', 'Finance Costs']),
+            'tax_expense': self._get_series(['Income Tax Expense', 'Tax Expense']),
+        }
+
     def calculate_all_ratios(self) -> Tuple[pd.DataFrame, str]:
         """Calculate all ratio categories and return report"""
-        
-        # Extract key line items
-        revenue = self._get_series(['Revenue', 'Total Revenue', 'Sales', 'Total Sales'])
-        cogs = self._get_series(['Cost of Goods Sold', 'COGS', 'Cost of sales'])
-        gross_profit = self._get_series(['Gross Profit'])
-        operating_profit = self._get_series(['Operating Profit', 'EBIT', 'Operating Income'])
-        ebitda = self._get_series(['EBITDA', 'Earnings Before Tax', 'EBT'])
-        net_income = self._get_series(['Net Income', 'Profit for the Year', 'Net Profit', 'PAT', 'Profit After Tax'])
-        
-        # Balance Sheet Items
-        current_assets = self._get_series(['Total Current Assets', 'Current Assets'])
-        current_liabilities = self._get_series(['Total Current Liabilities', 'Current Liabilities'])
-        inventory = self._get_series(['Inventory', 'Inventories', 'Stock'])
-        receivables = self._get_series(['Accounts Receivable', 'Trade Receivables', 'Receivables'])
-        cash = self._get_series(['Cash', 'Cash and Cash Equivalents', 'Bank Balances'])
-        
-        total_assets = self._get_series(['Total Assets', 'TOTAL ASSETS'])
-        total_liabilities = self._get_series(['Total Liabilities', 'Total Debt'])
-        total_equity = self._get_series(['Total Equity', 'Shareholders Equity', 'Share Capital'])
-        
-        # Liabilities breakdown
-        short_term_debt = self._get_series(['Short-term Debt', 'Current Portion of Long-term Debt'])
-        long_term_debt = self._get_series(['Long-term Debt', 'Non-Current Liabilities'])
-        
-        # Operating expenses
-        operating_expenses = self._get_series(['Operating Expenses', 'Selling General and Admin'])
-        depreciation = self._get_series(['Depreciation', 'Depreciation and Amortization'])
-        interest_expense = self._get_series(['Interest Expense', 'Finance Costs'])
-        tax_expense = self._get_series(['Income Tax Expense', 'Tax Expense'])
-        
-        # ============ PROFITABILITY RATIOS ============
-        if revenue is not None:
-            if gross_profit is not None:
-                self.ratios['Gross Profit Margin (%)'] = (gross_profit / revenue) * 100
-            if operating_profit is not None:
-                self.ratios['Operating Profit Margin (%)'] = (operating_profit / revenue) * 100
-            if ebitda is not None:
-                self.ratios['EBITDA Margin (%)'] = (ebitda / revenue) * 100
-            if net_income is not None:
-                self.ratios['Net Profit Margin (%)'] = (net_income / revenue) * 100
-        
-        # ============ RETURN RATIOS ============
-        if net_income is not None:
-            if total_assets is not None:
-                self.ratios['Return on Assets (%)'] = (net_income / total_assets) * 100
-            if total_equity is not None:
-                self.ratios['Return on Equity (%)'] = (net_income / total_equity) * 100
-        
-        # ============ LIQUIDITY RATIOS ============
-        if current_assets is not None and current_liabilities is not None:
-            self.ratios['Current Ratio'] = current_assets / current_liabilities
-            
-            if inventory is not None:
-                self.ratios['Quick Ratio'] = (current_assets - inventory) / current_liabilities
-            
-            if cash is not None:
-                self.ratios['Cash Ratio'] = cash / current_liabilities
-        
-        # ============ EFFICIENCY/ACTIVITY RATIOS ============
-        if revenue is not None and total_assets is not None:
-            self.ratios['Asset Turnover'] = revenue / total_assets
-        
-        if revenue is not None and receivables is not None:
-            self.ratios['Receivables Turnover'] = revenue / receivables
-            self.ratios['Days Sales Outstanding (DSO)'] = 365 / (revenue / receivables)
-        
-        if cogs is not None and inventory is not None:
-            self.ratios['Inventory Turnover'] = cogs / inventory
-            self.ratios['Days Inventory Outstanding (DIO)'] = 365 / (cogs / inventory)
-        
-        # ============ SOLVENCY/LEVERAGE RATIOS ============
-        if total_liabilities is not None and total_equity is not None:
-            self.ratios['Debt-to-Equity Ratio'] = total_liabilities / total_equity
-        
-        if total_liabilities is not None and total_assets is not None:
-            self.ratios['Debt-to-Assets Ratio'] = total_liabilities / total_assets
-        
-        if total_equity is not None and total_assets is not None:
-            self.ratios['Equity Multiplier'] = total_assets / total_equity
-        
-        if operating_profit is not None and interest_expense is not None:
-            self.ratios['Interest Coverage Ratio'] = operating_profit / interest_expense
-        
-        # ============ DUPONT ANALYSIS ============
-        if net_income is not None and revenue is not None and total_assets is not None and total_equity is not None:
-            net_margin = net_income / revenue
-            asset_turnover = revenue / total_assets
-            equity_multiplier = total_assets / total_equity
-            self.ratios['DuPont ROE'] = net_margin * asset_turnover * equity_multiplier
-        
+        self.ratios = compute_ratios(self.extract_items())
+
         # Convert to DataFrame
         ratio_df = pd.DataFrame(self.ratios).T
         report = self._generate_report(ratio_df)
@@ -180,6 +132,94 @@ class AdvancedRatioAnalyzer:
             return f"→ ±{pct_change:.1f}%"
 
 
+def compute_ratios(items: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The ratio set from key line items (see AdvancedRatioAnalyzer.extract_items).
+    Items may be pandas Series (one value per year) or NumPy arrays (e.g. one value
+    per scenario); missing items (None) skip the ratios that need them.
+    """
+    revenue = items.get('revenue')
+    cogs = items.get('cogs')
+    gross_profit = items.get('gross_profit')
+    operating_profit = items.get('operating_profit')
+    ebitda = items.get('ebitda')
+    net_income = items.get('net_income')
+    current_assets = items.get('current_assets')
+    current_liabilities = items.get('current_liabilities')
+    inventory = items.get('inventory')
+    receivables = items.get('receivables')
+    cash = items.get('cash')
+    total_assets = items.get('total_assets')
+    total_liabilities = items.get('total_liabilities')
+    total_equity = items.get('total_equity')
+    interest_expense = items.get('interest_expense')
+
+    ratios = {}
+
+    # ============ PROFITABILITY RATIOS ============
+    if revenue is not None:
+        if gross_profit is not None:
+            ratios['Gross Profit Margin (%)'] = (gross_profit / revenue) * 100
+        if operating_profit is not None:
+            ratios['Operating Profit Margin (%)'] = (operating_profit / revenue) * 100
+        if ebitda is not None:
+            ratios['EBITDA Margin (%)'] = (ebitda / revenue) * 100
+        if net_income is not None:
+            ratios['Net Profit Margin (%)'] = (net_income / revenue) * 100
+    
+    # ============ RETURN RATIOS ============
+    if net_income is not None:
+        if total_assets is not None:
+            ratios['Return on Assets (%)'] = (net_income / total_assets) * 100
+        if total_equity is not None:
+            ratios['Return on Equity (%)'] = (net_income / total_equity) * 100
+    
+    # ============ LIQUIDITY RATIOS ============
+    if current_assets is not None and current_liabilities is not None:
+        ratios['Current Ratio'] = current_assets / current_liabilities
+        
+        if inventory is not None:
+            ratios['Quick Ratio'] = (current_assets - inventory) / current_liabilities
+        
+        if cash is not None:
+            ratios['Cash Ratio'] = cash / current_liabilities
+    
+    # ============ EFFICIENCY/ACTIVITY RATIOS ============
+    if revenue is not None and total_assets is not None:
+        ratios['Asset Turnover'] = revenue / total_assets
+    
+    if revenue is not None and receivables is not None:
+        ratios['Receivables Turnover'] = revenue / receivables
+        ratios['Days Sales Outstanding (DSO)'] = 365 / (revenue / receivables)
+    
+    if cogs is not None and inventory is not None:
+        ratios['Inventory Turnover'] = cogs / inventory
+        ratios['Days Inventory Outstanding (DIO)'] = 365 / (cogs / inventory)
+    
+    # ============ SOLVENCY/LEVERAGE RATIOS ============
+    if total_liabilities is not None and total_equity is not None:
+        ratios['Debt-to-Equity Ratio'] = total_liabilities / total_equity
+    
+    if total_liabilities is not None and total_assets is not None:
+        ratios['Debt-to-Assets Ratio'] = total_liabilities / total_assets
+    
+    if total_equity is not None and total_assets is not None:
+        ratios['Equity Multiplier'] = total_assets / total_equity
+    
+    if operating_profit is not None and interest_expense is not None:
+        ratios['Interest Coverage Ratio'] = operating_profit / interest_expense
+    
+    # ============ DUPONT ANALYSIS ============
+    if net_income is not None and revenue is not None and total_assets is not None and total_equity is not None:
+        net_margin = net_income / revenue
+        asset_turnover = revenue / total_assets
+        equity_multiplier = total_assets / total_equity
+        ratios['DuPont ROE'] = net_margin * asset_turnover * equity_multiplier
+
+    return ratios
+
+
+@memoize_analyzer(REPORT_VERSION)
 def analyze_financial_ratios(data: pd.DataFrame) -> Tuple[str, str]:
     """
     Main MCP Tool: Advanced Ratio Analysis
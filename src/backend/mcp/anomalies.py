@@ -0,0 +1,201 @@
+"""
+Anomaly Screening Module
+Scores every line item and ratio of every entity for unusual values in one vectorized
+pass over an (entities, items, periods) array, using robust statistics that work on
+short histories:
+    level - robust z of the deviation from a Theil-Sen trend line (median/MAD), so
+            steady growth is not flagged but a one-year spike is
+    yoy   - robust z of a period's growth against the item's other growth rates
+    peer  - robust z of a period's growth against the same item at the other entities
+Quarterly and monthly data are compared year on year (same quarter or month a year
+earlier) and the level method removes a robust seasonal pattern first.
+Each z uses the median absolute deviation (scaled by 1.4826) with a floor, so flat or
+perfectly regular series do not turn rounding noise into anomalies.
+"""
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from src.backend.mcp.advanced_ratios import AdvancedRatioAnalyzer, compute_ratios
+from src.backend.mcp.frames import compact_frame
+from src.backend.mcp.periods import periods_per_year, season_positions, sort_labels
+
+METHODS = ('level', 'yoy', 'peer')
+DEFAULT_THRESHOLD = 3.5  # Iglewicz-Hoaglin cut-off for modified z-scores
+MAD_SCALE = 1.4826       # MAD -> standard deviation for normal data
+MIN_OBS = 4              # Observations per series (or peers per period) before scoring
+MIN_GROWTH_SCALE = 3.0   # Floor on the growth spread, percentage points
+MIN_LEVEL_SCALE = 0.03   # Floor on the level spread, share of the median absolute level
+
+
+def _robust_z(values: np.ndarray, axis: int, floor: np.ndarray) -> np.ndarray:
+    """(x - median) / max(1.4826 * MAD, floor) along `axis`; NaN where too few observations"""
+    with np.errstate(invalid='ignore'):
+        count = np.sum(~np.isnan(values), axis=axis, keepdims=True)
+        median = np.nanmedian(values, axis=axis, keepdims=True)
+        mad = MAD_SCALE * np.nanmedian(np.abs(values - median), axis=axis, keepdims=True)
+        z = (values - median) / np.maximum(mad, floor)
+    return np.where(count >= MIN_OBS, z, np.nan)
+
+
+def _growth(values: np.ndarray, lag: int = 1) -> np.ndarray:
+    """Growth on the value `lag` periods earlier in %, the first `lag` periods NaN"""
+    prev, curr = values[..., :-lag], values[..., lag:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.where(prev != 0, (curr - prev) / np.abs(prev) * 100, np.nan)
+    return np.concatenate([np.full(values.shape[:-1] + (lag,), np.nan), growth], axis=-1)
+
+
+def theil_sen(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Theil-Sen slope and intercept along the last axis (median of pairwise slopes), NaN-aware"""
+    x = np.arange(values.shape[-1], dtype=float)
+    i, j = np.triu_indices(len(x), k=1)
+    with np.errstate(invalid='ignore'), warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN slices
+        slope = np.nanmedian((values[..., j] - values[..., i]) / (x[j] - x[i]), axis=-1)
+        intercept = np.nanmedian(values - slope[..., None] * x, axis=-1)
+    return slope, intercept
+
+
+def score_anomalies(values: np.ndarray, methods: Sequence[str] = METHODS,
+                    positions: Optional[np.ndarray] = None, per_year: int = 1) -> Dict[str, np.ndarray]:
+    """
+    Robust z-scores for every value
+
+    Args:
+        values: (E, K, T) entities x items x periods, NaN where missing
+        methods: Subset of METHODS
+        positions: (T,) season position of each period for quarterly/monthly data
+                   (periods.season_positions); None for annual data
+        per_year: Periods per year; growth compares with the same period a year earlier
+
+    Returns:
+        dict: method -> (E, K, T) z-scores (NaN where not scorable)
+    """
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        raise ValueError(f"Unknown anomaly methods {sorted(unknown)} (use {METHODS}).")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN slices
+        scores = {}
+        if 'level' in methods:
+            slope, intercept = theil_sen(values)
+            residual = values - (intercept[..., None] + slope[..., None] * np.arange(values.shape[-1]))
+            if positions is not None:
+                for p in np.unique(positions):
+                    residual[..., positions == p] -= np.nanmedian(residual[..., positions == p], axis=-1, keepdims=True)
+            floor = MIN_LEVEL_SCALE * np.nanmedian(np.abs(values), axis=-1, keepdims=True)
+            scores['level'] = _robust_z(residual, axis=-1, floor=np.nan_to_num(floor, nan=np.inf))
+        if 'yoy' in methods or 'peer' in methods:
+            growth = _growth(values, per_year)
+            if 'yoy' in methods:
+                scores['yoy'] = _robust_z(growth, axis=-1, floor=MIN_GROWTH_SCALE)
+            if 'peer' in methods:
+                scores['peer'] = _robust_z(growth, axis=0, floor=MIN_GROWTH_SCALE)
+    return scores
+
+
+def _stack(frames: Dict[str, pd.DataFrame], include_ratios: bool) -> Tuple[np.ndarray, List[str], List[str], List[str]]:
+    """(E, K, T) array over the union of items and periods, with the kind of each item"""
+    tables = {}
+    for entity, df in frames.items():
+        values = compact_frame(df).drop_duplicates('Line Item').set_index('Line Item')
+        values.index = values.index.astype(str)
+        if include_ratios:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratios = pd.DataFrame(compute_ratios(AdvancedRatioAnalyzer(df).extract_items())).T
+            values = pd.concat([values, ratios.replace([np.inf, -np.inf], np.nan)])
+        tables[entity] = values.dropna(how='all')
+
+    items = list(dict.fromkeys(item for t in tables.values() for item in t.index))
+    periods = sort_labels(set(str(p) for t in tables.values() for p in t.columns))
+    stacked = np.stack([t.rename(columns=str).reindex(index=items, columns=periods).to_numpy(dtype=float)
+                        for t in tables.values()])
+    ratio_names = set()
+    if include_ratios:
+        for t in tables.values():
+            ratio_names.update(t.index[t.index.str.contains(r'Ratio|\(%\)|Turnover|Multiplier|DuPont|Days ')])
+    kinds = ['ratio' if item in ratio_names else 'line item' for item in items]
+    return stacked, items, periods, kinds
+
+
+def anomaly_table(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]], methods: Sequence[str] = METHODS,
+                  threshold: float = DEFAULT_THRESHOLD, include_ratios: bool = True) -> pd.DataFrame:
+    """
+    Ranked anomalies across every entity, line item, ratio and period
+
+    Args:
+        data: One consolidated DataFrame, or entity name -> DataFrame for a portfolio
+        methods: Scoring methods (peer needs at least MIN_OBS entities)
+        threshold: Minimum |z| to report
+        include_ratios: Also score the advanced ratio set
+
+    Returns:
+        DataFrame: entity, item, kind, period, value, growth_pct, method, z, sorted by |z|
+        (one row per flagged value, its strongest method)
+    """
+    frames = data if isinstance(data, dict) else {'': data}
+    values, items, periods, kinds = _stack(frames, include_ratios)
+    positions = season_positions(periods)
+    scores = score_anomalies(values, methods, positions, periods_per_year(periods))
+
+    names = list(scores)
+    stacked = np.stack([scores[m] for m in names])                  # (M, E, K, T)
+    strength = np.nan_to_num(np.abs(stacked), nan=0.0)
+    best = strength.argmax(axis=0)
+    z = np.take_along_axis(stacked, best[None], axis=0)[0]
+    e, k, t = np.nonzero(np.nan_to_num(np.abs(z), nan=0.0) > threshold)
+
+    table = pd.DataFrame({
+        'entity': np.array(list(frames), dtype=object)[e],
+        'item': np.array(items, dtype=object)[k],
+        'kind': np.array(kinds, dtype=object)[k],
+        'period': np.array(periods, dtype=object)[t],
+        'value': values[e, k, t],
+        'growth_pct': _growth(values, periods_per_year(periods))[e, k, t],
+        'method': np.array(names, dtype=object)[best[e, k, t]],
+        'z': z[e, k, t],
+    })
+    order = np.argsort(-np.abs(table['z'].to_numpy()), kind='stable')
+    return table.iloc[order].reset_index(drop=True)
+
+
+def format_anomaly_table(table: pd.DataFrame, limit: int = 15) -> str:
+    """Markdown list of the top anomalies"""
+    descriptions = {'level': 'off its trend', 'yoy': 'unusual growth', 'peer': 'growth out of line with peers'}
+    if table.empty:
+        return "✅ No significant anomalies detected\n"
+
+    report = ""
+    for _, row in table.head(limit).iterrows():
+        who = f"{row['entity']} – " if row['entity'] else ""
+        growth = f", {row['growth_pct']:+.1f}% YoY" if pd.notna(row['growth_pct']) else ""
+        report += (f"⚠️ {row['period']}: {who}{row['item']} {row['value']:,.2f}{growth} "
+                   f"— {descriptions[row['method']]} (robust z={row['z']:+.1f})\n")
+    if len(table) > limit:
+        report += f"… and {len(table) - limit} more\n"
+    return report
+
+
+def screen_anomalies(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]], threshold: float = DEFAULT_THRESHOLD,
+                     methods: Optional[Sequence[str]] = None) -> Tuple[Optional[pd.DataFrame], str]:
+    """
+    MCP Tool: Robust anomaly screen of one company or a portfolio
+
+    Returns:
+        tuple: (ranked anomaly DataFrame, status message)
+    """
+    frames = data if isinstance(data, dict) else {'': data}
+    if not frames or any(df is None or df.empty for df in frames.values()):
+        return None, "No data available for anomaly screening."
+
+    try:
+        if methods is None:
+            methods = METHODS if len(frames) >= MIN_OBS else ('level', 'yoy')
+        table = anomaly_table(frames, methods=methods, threshold=threshold)
+        return table, (f"Screened {len(frames)} entit{'y' if len(frames) == 1 else 'ies'} "
+                       f"({', '.join(methods)}): {len(table)} anomalies at |z| > {threshold}.")
+    except Exception as e:
+        return None, f"❌ Error in anomaly screening: {str(e)}"
@@ -0,0 +1,247 @@
+"""
+Forecast Backtesting Module
+Rolling-origin evaluation of candidate forecasting models over many series at once.
+At every origin each model is fitted on the history up to that point and scored on
+the following periods; errors are summarized per series as MAPE and MASE (errors
+scaled by the in-sample naive one-step MAE of the training window).
+
+Candidate models (all vectorized across series):
+    damped_holt  - damped additive Holt, the generate_forecast model (batch engine)
+    linear_trend - OLS line through the training window (TrendAnalyzer's forecast)
+    naive        - last observed value
+    drift        - last value plus the average historical change per period
+"""
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.backend.mcp.batch_forecasting import fit_damped_holt
+from src.backend.mcp.cache import LRUCache, fingerprint
+from src.backend.mcp.frames import compact_frame
+from src.backend.mcp.parsing import statement_of
+from src.backend.cloud_config.config import ModalConfig
+
+MODELS = ('damped_holt', 'linear_trend', 'naive', 'drift')
+MIN_TRAIN = 3  # Smallest window damped Holt can be fitted on
+BLOCK_SIZE = 512  # Series per pool task
+
+# Bump when a model or metric definition changes so cached results are not reused
+BACKTEST_VERSION = 1
+
+# Per-series backtest rows keyed by series fingerprint and backtest settings
+BACKTEST_CACHE = LRUCache('backtests', maxsize=4 * ModalConfig.FORECAST_CACHE_SIZE, persist_dir=ModalConfig.CACHE_DIR)
+
+
+def _forecast_damped_holt(train: np.ndarray, steps: int) -> np.ndarray:
+    return fit_damped_holt(train).forecast(steps)
+
+
+def _forecast_linear_trend(train: np.ndarray, steps: int) -> np.ndarray:
+    n_obs = train.shape[1]
+    x = np.arange(n_obs) - (n_obs - 1) / 2
+    slope = (train * x).sum(axis=1) / (x * x).sum()
+    intercept = train.mean(axis=1)
+    return intercept[:, None] + slope[:, None] * (x[-1] + np.arange(1, steps + 1))[None, :]
+
+
+def _forecast_naive(train: np.ndarray, steps: int) -> np.ndarray:
+    return np.repeat(train[:, -1:], steps, axis=1)
+
+
+def _forecast_drift(train: np.ndarray, steps: int) -> np.ndarray:
+    slope = (train[:, -1] - train[:, 0]) / (train.shape[1] - 1)
+    return train[:, -1:] + slope[:, None] * np.arange(1, steps + 1)[None, :]
+
+
+FORECASTERS = {
+    'damped_holt': _forecast_damped_holt,
+    'linear_trend': _forecast_linear_trend,
+    'naive': _forecast_naive,
+    'drift': _forecast_drift,
+}
+
+
+def _evaluate_origin(task) -> Dict[str, np.ndarray]:
+    """
+    Process-pool worker: forecasts a block of equal-length series from one origin.
+    Returns per model a (4, N) array of [APE sum, APE count, scaled error sum, scaled error count]
+    """
+    Y, origin, horizon, models = task
+    train, actual = Y[:, :origin], Y[:, origin:origin + horizon]
+
+    # MASE scale: in-sample MAE of the one-step naive forecast
+    scale = np.mean(np.abs(np.diff(train, axis=1)), axis=1, keepdims=True)
+
+    sums = {}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for model in models:
+            error = np.abs(FORECASTERS[model](train, actual.shape[1]) - actual)
+            ape = np.where(actual != 0, 100 * error / np.abs(actual), np.nan)
+            scaled = np.where(scale > 0, error / scale, np.nan)
+            sums[model] = np.stack([np.nansum(ape, axis=1), np.isfinite(ape).sum(axis=1),
+                                    np.nansum(scaled, axis=1), np.isfinite(scaled).sum(axis=1)])
+    return sums
+
+
+def rolling_origin_backtest(Y, horizon: int = 3, min_train: int = MIN_TRAIN, models: Sequence[str] = MODELS,
+                            max_workers: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Rolling-origin evaluation of every model on every row of Y
+
+    Args:
+        Y: (N, T) array-like of equal-length series without missing values
+        horizon: Maximum forecast horizon scored from each origin
+        min_train: Periods in the first training window (origins run min_train .. T-1)
+        models: Model names from FORECASTERS
+        max_workers: Process pool size (default: one per CPU; 1 = run in-process)
+
+    Returns:
+        tuple: (MAPE (N, M), MASE (N, M), number of origins); NaN where undefined
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    n_obs = Y.shape[1]
+    if n_obs <= min_train:
+        raise ValueError(f"Series need more than {min_train} data points to backtest.")
+    if not np.isfinite(Y).all():
+        raise ValueError("Series must not contain missing or infinite values.")
+
+    blocks = range(0, len(Y), BLOCK_SIZE)
+    origins = range(min_train, n_obs)
+    tasks = [(Y[b:b + BLOCK_SIZE], origin, horizon, tuple(models)) for b in blocks for origin in origins]
+
+    if len(tasks) >= ModalConfig.PARALLEL_MIN_ITEMS and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_evaluate_origin, tasks))
+    else:
+        results = [_evaluate_origin(task) for task in tasks]
+
+    # Sum each block's origins, then stack blocks back into series order
+    totals = {model: [] for model in models}
+    for i, _ in enumerate(blocks):
+        block = results[i * len(origins):(i + 1) * len(origins)]
+        for model in models:
+            totals[model].append(sum(r[model] for r in block))
+    totals = {model: np.concatenate(parts, axis=1) for model, parts in totals.items()}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mape = np.column_stack([totals[m][0] / totals[m][1] for m in models])
+        mase = np.column_stack([totals[m][2] / totals[m][3] for m in models])
+    return mape, mase, len(origins)
+
+
+def select_models(table: pd.DataFrame, models: Sequence[str] = MODELS) -> pd.Series:
+    """Best model per series: lowest MASE, or lowest MAPE where MASE is undefined"""
+    mase = table[[f"mase_{m}" for m in models]].to_numpy(dtype=float)
+    mape = table[[f"mape_{m}" for m in models]].to_numpy(dtype=float)
+    scores = np.where(np.isfinite(mase).any(axis=1, keepdims=True), mase, mape)
+    defined = np.isfinite(scores).any(axis=1)
+    best = np.array(models, dtype=object)[np.argmin(np.where(np.isfinite(scores), scores, np.inf), axis=1)]
+    return pd.Series(np.where(defined, best, None), index=table.index, name='best')
+
+
+def backtest_series(series: Dict[str, np.ndarray], horizon: int = 3, min_train: int = MIN_TRAIN,
+                    models: Sequence[str] = MODELS, max_workers: Optional[int] = None) -> Tuple[pd.DataFrame, int]:
+    """
+    Backtests named series of any lengths (grouped by length for vectorization).
+    Series already evaluated with the same settings come from BACKTEST_CACHE, and
+    names with identical values share one evaluation.
+
+    Returns:
+        tuple: (DataFrame indexed by series name with mape_<model>, mase_<model>,
+                origins and best columns, number of series served from cache)
+    """
+    settings = (horizon, min_train, tuple(models), BACKTEST_VERSION)
+    keys, scores, pending, queued = {}, {}, {}, set()
+    for name, values in series.items():
+        values = np.asarray(values, dtype=float)
+        key = keys[name] = fingerprint(values, settings)
+        if key in scores or key in queued:
+            continue
+        cached = BACKTEST_CACHE.get(key)
+        if cached is not None:
+            scores[key] = cached
+        else:
+            queued.add(key)
+            pending.setdefault(len(values), []).append((key, values))
+
+    n_cached = sum(key in scores for key in keys.values())
+    for _, group in sorted(pending.items()):
+        mape, mase, n_origins = rolling_origin_backtest(np.vstack([v for _, v in group]), horizon, min_train,
+                                                        models, max_workers)
+        for i, (key, _) in enumerate(group):
+            row = {**{f"mape_{m}": mape[i, j] for j, m in enumerate(models)},
+                   **{f"mase_{m}": mase[i, j] for j, m in enumerate(models)},
+                   'origins': n_origins}
+            BACKTEST_CACHE.put(key, row)
+            scores[key] = row
+
+    table = pd.DataFrame.from_dict({name: scores[key] for name, key in keys.items()}, orient='index')
+    table['best'] = select_models(table, models)
+    return table, n_cached
+
+
+def backtest_line_items(data: pd.DataFrame, horizon: int = 3, statement: Optional[str] = None,
+                        min_train: int = MIN_TRAIN, max_workers: Optional[int] = None) -> Tuple[Optional[pd.DataFrame], str]:
+    """
+    MCP Tool: Forecast accuracy of every candidate model on every line item
+
+    Args:
+        data: Consolidated financial DataFrame ('Line Item' + period columns)
+        horizon: Maximum forecast horizon scored from each origin
+        statement: 'income_statement', 'balance_sheet', 'cash_flow' or None for all items
+        min_train: Periods in the first training window
+        max_workers: Process pool size
+
+    Returns:
+        tuple: (DataFrame indexed by line item, status message)
+    """
+    if data is None or data.empty:
+        return None, "No data available for backtesting."
+
+    data = compact_frame(data)
+    periods = list(data.columns[1:])
+    values = data[periods]
+
+    series = {}
+    skipped = 0
+    for item, row in zip(data['Line Item'], values.itertuples(index=False)):
+        if statement is not None and statement_of(item) != statement:
+            continue
+        history = np.array([v for v in row if pd.notna(v)], dtype=float)
+        if len(history) <= min_train or item in series:
+            skipped += 1
+            continue
+        series[item] = history
+
+    if not series:
+        return None, f"No line items with more than {min_train} data points to backtest."
+
+    table, n_cached = backtest_series(series, horizon, min_train, max_workers=max_workers)
+    table.index.name = 'Line Item'
+
+    msg = (f"Backtested {len(table)} line items over {int(table['origins'].max())} origins "
+           f"({skipped} skipped: repeated label or too short; {n_cached} served from cache).")
+    return table, msg
+
+
+def format_backtest_table(table: pd.DataFrame, models: Sequence[str] = MODELS,
+                          title: str = "Forecast Backtest (rolling origin)") -> str:
+    """Markdown report for a backtest_line_items table"""
+    def fmt(value):
+        return f"{value:.2f}" if np.isfinite(value) else "n/a"
+
+    report = f"### 🎯 {title}\n\n"
+    report += "| Line Item | " + " | ".join(f"MASE {m}" for m in models) + " | Best |\n"
+    report += "|---|" + "---|" * (len(models) + 1) + "\n"
+    for item, row in table.iterrows():
+        report += f"| {item} | " + " | ".join(fmt(row[f'mase_{m}']) for m in models) + f" | {row['best'] or 'n/a'} |\n"
+
+    report += "\n**Summary across line items**\n"
+    wins = table['best'].value_counts()
+    for m in models:
+        report += (f"• {m}: median MASE {fmt(table[f'mase_{m}'].median())}, "
+                   f"median MAPE {fmt(table[f'mape_{m}'].median())}%, best for {wins.get(m, 0)} items\n")
+    report += "\nMASE < 1 beats a naive one-step forecast made with hindsight on the training window.\n"
+
+    return report
@@ -0,0 +1,201 @@
+"""
+Batch Forecasting Module
+Vectorized damped additive Holt (exponential smoothing) for a whole matrix of series.
+Same model and parameterization as statsmodels ExponentialSmoothing(trend='add',
+damped_trend=True) used by generate_forecast, but every series and every candidate
+parameter set is filtered in one set of NumPy recursions instead of one optimizer run
+per series.
+
+Model (error-correction form):
+    e_t = y_t - (l_{t-1} + phi * b_{t-1})
+    l_t = l_{t-1} + phi * b_{t-1} + alpha * e_t
+    b_t = phi * b_{t-1} + alpha * beta * e_t
+    y_hat_{T+h} = l_T + (phi + phi^2 + ... + phi^h) * b_T
+
+The errors are linear in the initial level/trend, so for each candidate
+(alpha, beta, phi) the SSE-optimal initial states have a closed form; only the three
+smoothing parameters are searched (global grid, then per-series local refinement).
+"""
+import numpy as np
+from typing import Tuple
+
+# statsmodels bounds: 0 <= beta <= alpha <= 1 and 0.8 <= phi <= 0.995
+PHI_BOUNDS = (0.8, 0.995)
+ALPHA_GRID = np.linspace(0.0, 1.0, 11)
+RATIO_GRID = np.linspace(0.0, 1.0, 6)  # beta = ratio * alpha keeps beta <= alpha
+PHI_GRID = np.linspace(PHI_BOUNDS[0], PHI_BOUNDS[1], 5)
+REFINE_ROUNDS = 10
+BLOCK_SIZE = 1024  # Series filtered together; bounds memory to ~BLOCK_SIZE x grid size
+
+
+def _profile_sse(Y: np.ndarray, alpha: np.ndarray, beta: np.ndarray, phi: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    SSE of every candidate, minimized over the initial level and trend
+
+    Args:
+        Y: (N, T) series
+        alpha, beta, phi: candidate parameters broadcastable to (N, K)
+
+    Returns:
+        (sse, l0, b0), each (N, K)
+    """
+    n_obs = Y.shape[1]
+    alpha_beta = alpha * beta
+
+    # Part of the state driven by the data (zero initial states) ...
+    level_y = np.zeros(np.broadcast(Y[:, :1], alpha).shape)
+    trend_y = np.zeros_like(level_y)
+    # ... and responses to a unit initial level / trend (data independent, so these
+    # stay (1, K) when the candidates are shared by all series)
+    level_u, trend_u = np.ones_like(alpha * phi), np.zeros_like(alpha * phi)
+    level_v, trend_v = np.zeros_like(alpha * phi), np.ones_like(alpha * phi)
+
+    ee = eu = ev = uu = uv = vv = 0.0
+    for t in range(n_obs):
+        e_y = Y[:, t:t + 1] - (level_y + phi * trend_y)
+        e_u = -(level_u + phi * trend_u)
+        e_v = -(level_v + phi * trend_v)
+
+        ee = ee + e_y * e_y
+        eu = eu + e_y * e_u
+        ev = ev + e_y * e_v
+        uu = uu + e_u * e_u
+        uv = uv + e_u * e_v
+        vv = vv + e_v * e_v
+
+        level_y, trend_y = level_y + phi * trend_y + alpha * e_y, phi * trend_y + alpha_beta * e_y
+        level_u, trend_u = level_u + phi * trend_u + alpha * e_u, phi * trend_u + alpha_beta * e_u
+        level_v, trend_v = level_v + phi * trend_v + alpha * e_v, phi * trend_v + alpha_beta * e_v
+
+    # Errors are e_y + l0 * e_u + b0 * e_v: solve the 2x2 normal equations
+    det = uu * vv - uv * uv
+    with np.errstate(divide='ignore', invalid='ignore'):
+        l0 = -(vv * eu - uv * ev) / det
+        b0 = -(uu * ev - uv * eu) / det
+        # Near-singular system (unit responses collinear): fit the level only
+        singular = np.abs(det) <= 1e-12 * np.abs(uu * vv)
+        l0 = np.where(singular, -eu / uu, l0)
+        b0 = np.where(singular, 0.0, b0)
+    sse = ee + l0 * eu + b0 * ev
+
+    return np.maximum(sse, 0.0), l0, b0
+
+
+def _clip_params(alpha, ratio, phi):
+    return np.clip(alpha, 0.0, 1.0), np.clip(ratio, 0.0, 1.0), np.clip(phi, *PHI_BOUNDS)
+
+
+def _search_block(Y: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Grid search + local refinement for one block of (normalized) series"""
+    n_series = Y.shape[0]
+    rows = np.arange(n_series)[:, None]
+
+    # Stage 1: global grid shared by every series
+    a, r, p = (g.ravel()[None, :] for g in np.meshgrid(ALPHA_GRID, RATIO_GRID, PHI_GRID, indexing='ij'))
+    sse, l0, b0 = _profile_sse(Y, a, a * r, p)
+    best = np.argmin(sse, axis=1)
+    alpha, ratio, phi = a[0, best], r[0, best], p[0, best]
+    best_sse, best_l0, best_b0 = sse[rows[:, 0], best], l0[rows[:, 0], best], b0[rows[:, 0], best]
+
+    # Stage 2: per-series 3x3x3 neighbourhood, halving the step every round
+    steps = np.array([ALPHA_GRID[1] - ALPHA_GRID[0], RATIO_GRID[1] - RATIO_GRID[0], PHI_GRID[1] - PHI_GRID[0]]) / 2
+    offsets = np.stack(np.meshgrid([-1, 0, 1], [-1, 0, 1], [-1, 0, 1], indexing='ij'), -1).reshape(-1, 3)
+    for _ in range(REFINE_ROUNDS):
+        ca, cr, cp = _clip_params(alpha[:, None] + offsets[:, 0] * steps[0],
+                                  ratio[:, None] + offsets[:, 1] * steps[1],
+                                  phi[:, None] + offsets[:, 2] * steps[2])
+        sse, l0, b0 = _profile_sse(Y, ca, ca * cr, cp)
+        k = np.argmin(sse, axis=1)
+        improved = sse[rows[:, 0], k] < best_sse
+        alpha = np.where(improved, ca[rows[:, 0], k], alpha)
+        ratio = np.where(improved, cr[rows[:, 0], k], ratio)
+        phi = np.where(improved, cp[rows[:, 0], k], phi)
+        best_l0 = np.where(improved, l0[rows[:, 0], k], best_l0)
+        best_b0 = np.where(improved, b0[rows[:, 0], k], best_b0)
+        best_sse = np.minimum(best_sse, sse[rows[:, 0], k])
+        steps = steps / 2
+
+    return alpha, alpha * ratio, phi, best_l0, best_b0
+
+
+class BatchHoltFit:
+    """Fitted damped additive Holt models for N series (all attributes are length-N arrays)"""
+
+    def __init__(self, alpha, beta, phi, initial_level, initial_trend, level, trend, residuals):
+        self.alpha = alpha
+        self.beta = beta
+        self.phi = phi
+        self.initial_level = initial_level
+        self.initial_trend = initial_trend
+        self.level = level          # Final level l_T
+        self.trend = trend          # Final trend b_T
+        self.residuals = residuals  # (N, T) one-step-ahead errors
+        self.sse = np.sum(residuals ** 2, axis=1)
+
+    def __len__(self):
+        return len(self.alpha)
+
+    def forecast(self, steps: int) -> np.ndarray:
+        """(N, steps) point forecasts; any horizon is available without refitting"""
+        powers = self.phi[:, None] ** np.arange(1, steps + 1)[None, :]
+        return self.level[:, None] + np.cumsum(powers, axis=1) * self.trend[:, None]
+
+
+def filter_damped_holt(Y, alpha, beta, phi, initial_level, initial_trend) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Runs the recursions for known parameters (one set per series)
+
+    Returns:
+        (residuals (N, T), final level (N,), final trend (N,))
+    """
+    level = np.asarray(initial_level, dtype=float).copy()
+    trend = np.asarray(initial_trend, dtype=float).copy()
+    residuals = np.empty_like(Y)
+    for t in range(Y.shape[1]):
+        residuals[:, t] = Y[:, t] - (level + phi * trend)
+        level, trend = level + phi * trend + alpha * residuals[:, t], phi * trend + alpha * beta * residuals[:, t]
+    return residuals, level, trend
+
+
+def fit_damped_holt(Y, block_size: int = BLOCK_SIZE) -> BatchHoltFit:
+    """
+    Fits damped additive Holt smoothing to every row of Y by least squares
+
+    Args:
+        Y: (N, T) array-like of series without missing values (T >= 3)
+        block_size: Series processed per vectorized block
+
+    Returns:
+        BatchHoltFit
+    """
+    Y = np.atleast_2d(np.asarray(Y, dtype=float))
+    if Y.shape[1] < 3:
+        raise ValueError("Not enough data points to fit (minimum 3 required).")
+    if not np.isfinite(Y).all():
+        raise ValueError("Series must not contain missing or infinite values.")
+
+    # Holt smoothing is affine-equivariant: normalize each series for conditioning
+    center = Y[:, :1]
+    scale = np.abs(Y - center).max(axis=1, keepdims=True)
+    scale[scale == 0] = 1.0
+    Z = (Y - center) / scale
+
+    params = [_search_block(Z[i:i + block_size]) for i in range(0, len(Z), block_size)]
+    alpha, beta, phi, l0, b0 = (np.concatenate(p) for p in zip(*params))
+
+    initial_level = l0 * scale[:, 0] + center[:, 0]
+    initial_trend = b0 * scale[:, 0]
+    residuals, level, trend = filter_damped_holt(Y, alpha, beta, phi, initial_level, initial_trend)
+
+    return BatchHoltFit(alpha, beta, phi, initial_level, initial_trend, level, trend, residuals)
+
+
+def batch_forecast(Y, steps: int = 4) -> Tuple[np.ndarray, BatchHoltFit]:
+    """
+    Fits and forecasts a matrix of series in one call
+
+    Returns:
+        tuple: ((N, steps) forecasts, BatchHoltFit)
+    """
+    fit = fit_damped_holt(Y)
+    return fit.forecast(steps), fit
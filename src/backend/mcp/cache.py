@@ -0,0 +1,211 @@
+"""
+Result Caching Module
+Bounded, thread-safe LRU caches with optional on-disk persistence, stable
+content fingerprints for cache keys, and a memoizing decorator for analyzers
+"""
+import os
+import pickle
+import hashlib
+import logging
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.backend.cloud_config.config import ModalConfig
+
+logger = logging.getLogger(__name__)
+
+
+def fingerprint(*parts: Any) -> str:
+    """
+    Stable SHA-256 hex digest of the given parts.
+    Arrays are hashed by dtype, shape and raw bytes; DataFrames/Series by their
+    columns, index and pd.util.hash_pandas_object values; everything else by repr().
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            if isinstance(part, pd.DataFrame):
+                digest.update(repr(list(part.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).values.tobytes())
+        elif isinstance(part, np.ndarray):
+            digest.update(f"{part.dtype}{part.shape}".encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """
+    Least-recently-used cache bounded by entry count.
+    With persist_dir set, entries are also pickled to disk and survive restarts;
+    a memory miss falls back to the disk copy. The disk copy has the same bound: the
+    least recently used files (by modification time, refreshed on every read) are
+    deleted, including those left by earlier processes.
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, persist_dir: Optional[str] = None):
+        """
+        Args:
+            name: Cache name (used in logs and as the on-disk subdirectory)
+            maxsize: Maximum number of entries kept in memory (and on disk)
+            persist_dir: Root directory for on-disk persistence (None = memory only)
+        """
+        self.name = name
+        self.maxsize = maxsize
+        self.persist_dir = os.path.join(persist_dir, name) if persist_dir else None
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._files: "OrderedDict[str, None]" = OrderedDict()  # Persisted keys, least recent first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.persist_dir:
+            os.makedirs(self.persist_dir, exist_ok=True)
+            entries = []
+            for entry in os.scandir(self.persist_dir):
+                if entry.name.endswith('.pkl'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.name[:-4]))
+                    except FileNotFoundError:
+                        continue
+            self._files.update((key, None) for _, key in sorted(entries))
+            self._evict_files()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.persist_dir, f"{key}.pkl")
+
+    def _evict_files(self) -> None:
+        """Deletes the least recently used files beyond maxsize"""
+        while True:
+            with self._lock:
+                if len(self._files) <= self.maxsize:
+                    return
+                key, _ = self._files.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Cache '{self.name}': could not evict {key[:12]}: {e}")
+
+    def _touch_file(self, key: str, refresh: bool = False) -> None:
+        """Marks a file most recently used (refresh: also its modification time, so recency survives restarts)"""
+        with self._lock:
+            self._files[key] = None
+            self._files.move_to_end(key)
+        if refresh:
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+        if self.persist_dir and os.path.exists(self._path(key)):
+            try:
+                with open(self._path(key), 'rb') as f:
+                    value = pickle.load(f)
+                self._store(key, value)
+                self._touch_file(key, refresh=True)
+                with self._lock:
+                    self.hits += 1
+                return value
+            except Exception as e:
+                logger.warning(f"Cache '{self.name}': unreadable entry {key[:12]}: {e}")
+
+        with self._lock:
+            self.misses += 1
+        return default
+
+    def _store(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def put(self, key: str, value: Any) -> None:
+        self._store(key, value)
+        if self.persist_dir:
+            try:
+                tmp_path = f"{self._path(key)}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(value, f)
+                os.replace(tmp_path, self._path(key))
+            except Exception as e:
+                logger.warning(f"Cache '{self.name}': could not persist {key[:12]}: {e}")
+                return
+            self._touch_file(key)
+            self._evict_files()
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> str:
+        disk = f", {len(self._files)} on disk" if self.persist_dir else ""
+        return f"{self.name}: {self.hits} hits / {self.misses} misses ({self.hit_rate:.0%}), {len(self)} entries{disk}"
+
+
+_MISSING = object()
+
+
+def memoize_analyzer(version: Any, maxsize: int = ModalConfig.ANALYZER_CACHE_SIZE,
+                     persist_dir: Optional[str] = ModalConfig.CACHE_DIR):
+    """
+    Decorator for analyzers that are pure functions of a DataFrame (plus arguments).
+    Results are cached by fingerprint of the function, `version`, the frame's content
+    and attrs (frequency, aliases) and the remaining arguments, so a repeat call on
+    unchanged data returns the stored result. Bump `version` when the output changes.
+    Cached results are shared between callers and must not be mutated.
+
+    The decorated function exposes its LRUCache as `.cache` and its hit rate through
+    `.stats()`; each hit or miss is logged at DEBUG level.
+    """
+    def decorate(func):
+        cache = LRUCache(f"analyzer_{func.__name__}", maxsize=maxsize, persist_dir=persist_dir)
+
+        @functools.wraps(func)
+        def wrapper(data, *args, **kwargs):
+            if not isinstance(data, pd.DataFrame):
+                return func(data, *args, **kwargs)
+            key = fingerprint(func.__module__, func.__qualname__, version, data,
+                              sorted(data.attrs.items()), args, sorted(kwargs.items()))
+            result = cache.get(key, _MISSING)
+            hit = result is not _MISSING
+            if not hit:
+                result = func(data, *args, **kwargs)
+                cache.put(key, result)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"{'Hit' if hit else 'Miss'} – {cache.stats()}")
+            return result
+
+        wrapper.cache = cache
+        wrapper.stats = cache.stats
+        return wrapper
+    return decorate
@@ -6,6 +6,11 @@ import pandas as pd
 import numpy as np
 from typing import Tuple, Optional
 
+from src.backend.mcp.cache import memoize_analyzer
+from src.backend.mcp.frames import LineItemIndex, compact_frame
+
+REPORT_VERSION = 1  # Bump when the report changes (invalidates memoized reports)
+
 class CashFlowAnalyzer:
     """Analyzes cash flow statements and cash position"""
     
@@ -15,15 +20,16 @@ class CashFlowAnalyzer:
         Args:
             df: DataFrame with cash flow or P&L data
         """
-        self.df = df
+        self.df = compact_frame(df)
+        self.line_items = LineItemIndex(self.df)
         self.analysis = {}
     
     def _get_series(self, keywords: list) -> Optional[pd.Series]:
         """Safely retrieve financial line item by keywords"""
         for key in keywords:
-            match = self.df[self.df['Line Item'].astype(str).str.lower().str.contains(key.lower(), na=False)]
-            if not match.empty:
-                numeric_data = match.iloc[0, 1:].apply(pd.to_numeric, errors='coerce')
+            pos = self.line_items.first(key)
+            if pos is not None:
+                numeric_data = self.df.iloc[pos, 1:]
                 if numeric_data.notna().sum() > 0:
                     return numeric_data
         return None
@@ -174,6 +180,7 @@ class CashFlowAnalyzer:
         return report
 
 
+@memoize_analyzer(REPORT_VERSION)
 def analyze_cash_flow(data: pd.DataFrame) -> Tuple[str, str]:
     """
     Main MCP Tool: Cash Flow Analysis
@@ -0,0 +1,204 @@
+"""
+Change-Point Detection Module
+Finds structural breaks in long financial histories with PELT (pruned exact linear
+time) on a change-in-mean cost. Flows (revenue, profit, assets) are tested on their
+YoY growth, so a break is a change in growth regime; ratios (margins, leverage,
+liquidity) are tested on their level.
+
+The segment cost sum((x - mean)^2) comes from cumulative sums, so each PELT step is
+one vectorized evaluation over the surviving candidates. Series are independent and
+are spread over a process pool in blocks when there are enough of them.
+"""
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from src.backend.mcp.advanced_ratios import AdvancedRatioAnalyzer, compute_ratios
+from src.backend.mcp.periods import periods_per_year
+from src.backend.cloud_config.config import ModalConfig
+
+MIN_SIZE = 2          # Shortest regime, in observations
+MIN_LENGTH = 4        # Shortest signal worth testing
+PENALTY_FACTOR = 4.0  # Penalty = factor * sigma^2 * log(n); above BIC, short noisy series over-split
+MIN_GROWTH_SIGMA = 2.0   # Noise floor for growth signals, percentage points
+MIN_LEVEL_SIGMA = 0.02   # Noise floor for level signals, share of the median absolute level
+BLOCK_SIZE = 256      # Series per pool task
+
+# Series tested by default: (name, item or ratio, signal)
+DEFAULT_SERIES = [
+    ('Revenue growth', 'revenue', 'growth'),
+    ('Net income growth', 'net_income', 'growth'),
+    ('Total assets growth', 'total_assets', 'growth'),
+    ('Gross Profit Margin (%)', 'Gross Profit Margin (%)', 'level'),
+    ('Operating Profit Margin (%)', 'Operating Profit Margin (%)', 'level'),
+    ('Net Profit Margin (%)', 'Net Profit Margin (%)', 'level'),
+    ('Debt-to-Equity Ratio', 'Debt-to-Equity Ratio', 'level'),
+    ('Current Ratio', 'Current Ratio', 'level'),
+]
+
+
+def noise_variance(x: np.ndarray) -> float:
+    """Robust noise variance from first differences (MAD / 0.6745 / sqrt(2)), unaffected by mean shifts"""
+    diffs = np.diff(x)
+    if len(diffs) == 0:
+        return 0.0
+    sigma = np.median(np.abs(diffs - np.median(diffs))) / 0.6745 / np.sqrt(2)
+    if sigma == 0:
+        sigma = np.std(diffs) / np.sqrt(2)
+    return float(sigma ** 2)
+
+
+def pelt(x: np.ndarray, penalty: Optional[float] = None, min_size: int = MIN_SIZE,
+         min_sigma: float = 0.0) -> List[int]:
+    """
+    Optimal change points of the mean of x under a linear penalty
+
+    Args:
+        x: 1-D signal without missing values
+        penalty: Cost per change point (default PENALTY_FACTOR * sigma^2 * log n)
+        min_size: Minimum segment length
+        min_sigma: Floor on the noise level used by the default penalty, so smooth
+                   series do not break on tiny wiggles
+
+    Returns:
+        list: Start index of every new segment (empty if no break)
+    """
+    x = np.asarray(x, dtype=float)
+    n = len(x)
+    if n < 2 * min_size:
+        return []
+    if penalty is None:
+        penalty = PENALTY_FACTOR * max(noise_variance(x), min_sigma ** 2, 1e-12 * np.var(x), 1e-300) * np.log(n)
+
+    s1 = np.concatenate([[0.0], np.cumsum(x)])
+    s2 = np.concatenate([[0.0], np.cumsum(x ** 2)])
+
+    def cost(starts, end):
+        length = end - starts
+        total = s1[end] - s1[starts]
+        return (s2[end] - s2[starts]) - total ** 2 / length
+
+    best = np.full(n + 1, np.inf)
+    best[0] = -penalty
+    last = np.zeros(n + 1, dtype=int)
+    candidates = np.array([0])
+    expiry = np.array([np.inf])  # Time from which a pruned candidate is dropped
+
+    for t in range(min_size, n + 1):
+        live = expiry > t
+        candidates, expiry = candidates[live], expiry[live]
+        admissible = t - candidates >= min_size
+        starts = candidates[admissible]
+        totals = best[starts] + cost(starts, t) + penalty
+        i = int(np.argmin(totals))
+        best[t], last[t] = totals[i], starts[i]
+
+        # A candidate beaten at t is never optimal once a split at t is feasible (t + min_size)
+        beaten = np.zeros(len(candidates), dtype=bool)
+        beaten[admissible] = totals - penalty > best[t]
+        expiry[beaten] = np.minimum(expiry[beaten], t + min_size)
+        if t - min_size + 1 >= min_size:
+            candidates = np.append(candidates, t - min_size + 1)
+            expiry = np.append(expiry, np.inf)
+
+    breaks, t = [], n
+    while last[t] > 0:
+        t = last[t]
+        breaks.append(t)
+    return sorted(breaks)
+
+
+def _pelt_block(task):
+    """Process-pool worker: change points for a block of signals"""
+    signals, min_sigmas, min_size = task
+    return [pelt(x, min_size=min_size, min_sigma=sigma) if len(x) >= MIN_LENGTH else []
+            for x, sigma in zip(signals, min_sigmas)]
+
+
+def detect_changepoints(signals: Sequence[np.ndarray], min_sigmas: Optional[Sequence[float]] = None,
+                        min_size: int = MIN_SIZE, max_workers: Optional[int] = None) -> List[List[int]]:
+    """
+    Change points of many independent signals (lists of segment starts, in input order).
+    Blocks of BLOCK_SIZE signals run in a process pool when there are ModalConfig.PARALLEL_MIN_ITEMS+ blocks.
+    """
+    if min_sigmas is None:
+        min_sigmas = [0.0] * len(signals)
+    tasks = [(list(signals[i:i + BLOCK_SIZE]), list(min_sigmas[i:i + BLOCK_SIZE]), min_size)
+             for i in range(0, len(signals), BLOCK_SIZE)]
+    if len(tasks) >= ModalConfig.PARALLEL_MIN_ITEMS and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_pelt_block, tasks))
+    else:
+        results = [_pelt_block(task) for task in tasks]
+    return [breaks for block in results for breaks in block]
+
+
+def _signals(data: pd.DataFrame, series=DEFAULT_SERIES) -> List[Tuple[str, str, pd.Series]]:
+    """(name, signal kind, signal indexed by period) for every default series found"""
+    items = AdvancedRatioAnalyzer(data).extract_items()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = compute_ratios(items)
+
+    out = []
+    for name, source, kind in series:
+        values = items.get(source) if kind == 'growth' else ratios.get(source)
+        if values is None:
+            continue
+        values = pd.Series(values, dtype=float).replace([np.inf, -np.inf], np.nan)
+        if kind == 'growth':
+            previous = values.shift(periods_per_year(values.index))  # Year on year for quarterly/monthly data
+            values = ((values - previous) / previous.abs() * 100).where(previous != 0)
+        values = values.dropna()
+        if len(values) >= MIN_LENGTH:
+            out.append((name, kind, values))
+    return out
+
+
+def structural_breaks(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]],
+                      max_workers: Optional[int] = None) -> pd.DataFrame:
+    """
+    Structural breaks in growth, margins and leverage for one company or a portfolio
+
+    Returns:
+        DataFrame: entity, series, signal ('growth' or 'level'), period (first period of the
+        new regime), before / after (regime means) and shift, largest shifts first
+    """
+    frames = data if isinstance(data, dict) else {'': data}
+    signals = [(entity, name, kind, values) for entity, df in frames.items()
+               for name, kind, values in _signals(df)]
+    floors = [MIN_GROWTH_SIGMA if kind == 'growth' else MIN_LEVEL_SIGMA * values.abs().median()
+              for _, _, kind, values in signals]
+    breaks = detect_changepoints([values.to_numpy() for _, _, _, values in signals], floors,
+                                 max_workers=max_workers)
+
+    rows = []
+    for (entity, name, kind, values), starts in zip(signals, breaks):
+        bounds = [0] + starts + [len(values)]
+        x = values.to_numpy()
+        for j, start in enumerate(starts):
+            before = x[bounds[j]:start].mean()
+            after = x[start:bounds[j + 2]].mean()
+            rows.append({'entity': entity, 'series': name, 'signal': kind, 'period': str(values.index[start]),
+                         'before': before, 'after': after, 'shift': after - before})
+
+    table = pd.DataFrame(rows, columns=['entity', 'series', 'signal', 'period', 'before', 'after', 'shift'])
+    scale = table['shift'].abs() / table[['before', 'after']].abs().max(axis=1).replace(0, np.nan)
+    return table.iloc[np.argsort(-scale.fillna(0).to_numpy(), kind='stable')].reset_index(drop=True)
+
+
+def format_breaks(table: pd.DataFrame, limit: int = 10) -> str:
+    """Markdown list of structural breaks"""
+    if table.empty:
+        return "✅ No structural breaks detected\n"
+
+    report = ""
+    for _, row in table.head(limit).iterrows():
+        who = f"{row['entity']} – " if row['entity'] else ""
+        unit = "%" if row['signal'] == 'growth' or '(%)' in row['series'] else ""
+        direction = "↗️" if row['shift'] > 0 else "↘️"
+        report += (f"🔀 {row['period']}: {who}{row['series']} regime {row['before']:.2f}{unit} → "
+                   f"{row['after']:.2f}{unit} {direction}\n")
+    if len(table) > limit:
+        report += f"… and {len(table) - limit} more\n"
+    return report
@@ -0,0 +1,100 @@
+"""
+Near-Duplicate Text Detection Module
+Collapses near-identical text chunks (boilerplate disclaimers, repeated KPI
+narratives) using word shingles, MinHash signatures and LSH banding
+"""
+import re
+import hashlib
+import numpy as np
+from typing import List, Tuple
+
+NUM_PERM = 64
+BANDS = 16  # 16 bands x 4 rows: pairs above ~0.6 Jaccard almost always collide
+SHINGLE_SIZE = 5
+SIMILARITY_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.RandomState(1)
+# Coefficients < 2^31 keep a * h (h < 2^32) inside uint64 without overflow
+_PERM_A = _rng.randint(1, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_PERM_B = _rng.randint(0, 1 << 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+
+def _shingles(text: str, k: int = SHINGLE_SIZE) -> set:
+    """Word k-grams of the normalized text (the whole text if shorter than k words)"""
+    words = re.sub(r'[^a-z0-9 ]', ' ', text.lower()).split()
+    if len(words) <= k:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def minhash_signatures(chunks: List[str]) -> np.ndarray:
+    """
+    MinHash signature matrix for a list of texts
+
+    Returns:
+        uint64 array of shape (len(chunks), NUM_PERM)
+    """
+    signatures = np.empty((len(chunks), NUM_PERM), dtype=np.uint64)
+    for i, chunk in enumerate(chunks):
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=4).digest(), 'little') for s in _shingles(chunk)),
+            dtype=np.uint64
+        )
+        # (a * h + b) mod p for every permutation at once, then min over shingles
+        permuted = (np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE_PRIME
+        signatures[i] = permuted.min(axis=0)
+    return signatures
+
+
+def cluster_near_duplicates(chunks: List[str], threshold: float = SIMILARITY_THRESHOLD) -> List[Tuple[int, List[int]]]:
+    """
+    Groups near-duplicate chunks
+
+    Args:
+        chunks: Texts to deduplicate
+        threshold: Minimum estimated Jaccard similarity to merge two chunks
+
+    Returns:
+        List of (representative_index, member_indices) in document order;
+        the representative is the first occurrence in each cluster
+    """
+    n = len(chunks)
+    if n == 0:
+        return []
+
+    signatures = minhash_signatures(chunks)
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # LSH banding: only chunks sharing a whole band become candidate pairs
+    rows = NUM_PERM // BANDS
+    checked = set()
+    for band in range(BANDS):
+        buckets = {}
+        band_keys = signatures[:, band * rows:(band + 1) * rows]
+        for i in range(n):
+            buckets.setdefault(band_keys[i].tobytes(), []).append(i)
+
+        for members in buckets.values():
+            for pos, a in enumerate(members):
+                for b in members[pos + 1:]:
+                    root_a, root_b = find(a), find(b)
+                    if root_a == root_b or (a, b) in checked:
+                        continue
+                    checked.add((a, b))
+                    # Fraction of agreeing MinHash slots estimates Jaccard similarity
+                    if np.mean(signatures[a] == signatures[b]) >= threshold:
+                        # Smaller index becomes the root, so roots are first occurrences
+                        parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    clusters = {}
+    for i in range(n):
+        clusters.setdefault(find(i), []).append(i)
+
+    return sorted(clusters.items())
@@ -1,6 +1,8 @@
 import pandas as pd
 import re
 
+from src.backend.mcp.frames import LineItemIndex, is_compact
+
 def extract_financial_data(data, keyword):
     """
     MCP Tool: Information Extraction
@@ -16,6 +18,13 @@ def extract_financial_data(data, keyword):
         # Clean column names for search
         data.columns = data.columns.astype(str)
         
+        # Typed consolidated frames: keyword lookup over line items and their aliases
+        if is_compact(data):
+            pos = LineItemIndex(data).first(clean_keyword)
+            if pos is not None and data.iloc[pos, 1:].notna().sum() > 1:
+                return data.iloc[pos, 1:].dropna(), f"Found '{keyword}' in structured data row."
+            return None, f"Could not find a numeric series for '{keyword}' in the spreadsheet."
+        
         # Strategy A: Look for keyword in the first column (common in financial statements)
         # Strategy B: Scan all string columns
         
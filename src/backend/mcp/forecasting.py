@@ -1,33 +1,264 @@
 import pandas as pd
 import numpy as np
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from concurrent.futures import ProcessPoolExecutor
 import warnings
 
+from src.backend.mcp.parsing import statement_of
+from src.backend.mcp.cache import LRUCache, fingerprint
+from src.backend.mcp.frames import compact_frame
+from src.backend.mcp.batch_forecasting import BatchHoltFit
+from src.backend.mcp.simulation import forecast_intervals, DEFAULT_LEVELS, DEFAULT_PATHS, MIN_TRAIN
+from src.backend.mcp.periods import next_labels, seasonal_adjustment
+from src.backend.cloud_config.config import ModalConfig
+
 # Suppress statsmodels warnings for clean output
 warnings.filterwarnings("ignore")
 
+# Calibrated interval bands measurably undercover below this many periods (see benchmark.py)
+SHORT_HISTORY = 10
+
+# Part of every fit cache key: change it whenever the model specification changes
+MODEL_SPEC = "ExponentialSmoothing(trend='add', damped_trend=True, seasonal=None)"
+
+# Fitted parameters and final states keyed by series fingerprint. The horizon is not
+# part of the key: any horizon is computed from the final level/trend without refitting.
+FIT_CACHE = LRUCache('forecast_fits', maxsize=ModalConfig.FORECAST_CACHE_SIZE, persist_dir=ModalConfig.CACHE_DIR)
+
+def _fit_holt_winters(series):
+    """Fits the damped-trend Holt-Winters model used by every forecast path."""
+    # Ensure data is float
+    series = series.astype(float)
+
+    # Reset index for clean processing
+    series = series.reset_index(drop=True)
+
+    # Statistical Model: Holt-Winters Exponential Smoothing
+    # 'trend=add' handles linear growth
+    # 'damped_trend=True' prevents unrealistic infinite growth
+    return ExponentialSmoothing(series, trend='add', damped_trend=True, seasonal=None).fit()
+
+def _fit_state(values):
+    """Fits one series and keeps what forecasting needs: parameters, final states, diagnostics."""
+    model = _fit_holt_winters(pd.Series(values))
+    return {
+        'alpha': float(model.params['smoothing_level']),
+        'beta': float(model.params['smoothing_trend']),
+        'phi': float(model.params['damping_trend']),
+        'level': float(np.asarray(model.level)[-1]),
+        'trend': float(np.asarray(model.trend)[-1]),
+        'sse': float(model.sse),
+        'aic': float(model.aic),
+        'n_obs': len(values),
+        'residuals': np.asarray(model.resid, dtype=float),
+    }
+
+def _forecast_from_state(state, steps):
+    """Damped-trend forecast l_T + (phi + ... + phi^h) * b_T for h = 1..steps."""
+    damping = np.cumsum(state['phi'] ** np.arange(1, steps + 1))
+    return state['level'] + damping * state['trend']
+
+def _cache_key(values):
+    return fingerprint(np.asarray(values, dtype=float), MODEL_SPEC)
+
+def _cached_state(values):
+    """Fitted state for a series from FIT_CACHE, fitting on a miss. Returns: (state, cached)"""
+    key = _cache_key(values)
+    state = FIT_CACHE.get(key)
+    # Entries persisted before residuals were stored cannot produce intervals: refit
+    if state is not None and 'residuals' in state:
+        return state, True
+    state = _fit_state(values)
+    FIT_CACHE.put(key, state)
+    return state, False
+
 def generate_forecast(series, steps=4):
     """
     MCP Tool: Time-Series Forecasting
     Takes a pandas Series of historical data and forecasts future periods.
+    Fits are cached by series fingerprint, so repeat requests on unchanged data
+    (including a different horizon) skip the refit. Quarterly or monthly series with
+    two or more years are seasonally adjusted first and the seasonal pattern re-added.
     """
     if series is None or len(series) < 3:
         return None, "Not enough data points to generate a forecast (minimum 3 required)."
 
     try:
-        # Ensure data is float
-        series = series.astype(float)
-        
-        # Reset index for clean processing
-        series = series.reset_index(drop=True)
-
-        # Statistical Model: Holt-Winters Exponential Smoothing
-        # 'trend=add' handles linear growth
-        # 'damped_trend=True' prevents unrealistic infinite growth
-        model = ExponentialSmoothing(series, trend='add', damped_trend=True, seasonal=None).fit()
-        forecast = model.forecast(steps)
-        
-        return forecast, "Forecast generated successfully using Holt-Winters Exponential Smoothing."
+        values, seasonal = seasonal_adjustment(series.astype(float).to_numpy(), list(series.index), steps)
+        state, cached = _cached_state(values)
+        forecast = pd.Series(_forecast_from_state(state, steps) + seasonal,
+                             index=pd.RangeIndex(len(values), len(values) + steps))
+
+        msg = "Forecast generated successfully using Holt-Winters Exponential Smoothing."
+        return forecast, msg + (" (cached fit)" if cached else "")
+
+    except Exception as e:
+        return None, f"Forecasting model failed: {str(e)}"
+
+def forecast_with_intervals(series, steps=4, levels=DEFAULT_LEVELS, n_paths=DEFAULT_PATHS, method='parametric'):
+    """
+    MCP Tool: Forecast with simulated prediction intervals
+    Same model, seasonal handling and fit cache as generate_forecast; intervals come
+    from simulated future paths (residual bootstrap or parametric normal errors), widened
+    to the series' own rolling-origin forecast errors so that they cover parameter
+    uncertainty. Series of 3 points cannot be backtested: their bands are conditional
+    on the fitted parameters (table.attrs['calibrated'] is False). Normal errors are the
+    default because resampling a handful of residuals cannot reach the 95% tails.
+
+    Returns:
+        tuple: (DataFrame indexed by horizon label with forecast, median and
+                lower_<pct>/upper_<pct> columns, status message)
+    """
+    if series is None or len(series) < 3:
+        return None, "Not enough data points to generate a forecast (minimum 3 required)."
+
+    try:
+        values, seasonal = seasonal_adjustment(series.astype(float).to_numpy(), list(series.index), steps)
+        state, cached = _cached_state(values)
+        fit = BatchHoltFit(*(np.array([state[k]]) for k in ('alpha', 'beta', 'phi')), None, None,
+                           np.array([state['level']]), np.array([state['trend']]), state['residuals'][None, :])
+        bands = forecast_intervals(fit, steps, levels=levels, n_paths=n_paths, method=method, history=values[None, :])
+        scale = float(bands.pop('width_scale')[0])
+
+        table = pd.DataFrame({'forecast': _forecast_from_state(state, steps) + seasonal,
+                              **{k: v[0] + seasonal for k, v in bands.items() if k != 'point'}},
+                             index=_horizon_labels(list(series.index), steps))
+        table.attrs['calibrated'] = len(values) > MIN_TRAIN
+        table.attrs['n_obs'] = len(values)
+        table.attrs['width_scale'] = scale
+
+        calibration = (f"bands widened x{scale:.2f} to match backtest errors" if table.attrs['calibrated']
+                       else "bands conditional on the fitted parameters (too short to backtest)")
+        msg = (f"Forecast generated using Holt-Winters Exponential Smoothing with {n_paths} simulated "
+               f"{method} paths, {calibration}{' (cached fit)' if cached else ''}.")
+        return table, msg
+
+    except Exception as e:
+        return None, f"Forecasting model failed: {str(e)}"
 
+def _fit_line_item(task):
+    """
+    Process-pool worker: fits one distinct line item history.
+    Returns: (cache key, fitted state or None, error message or None)
+    """
+    key, values = task
+    try:
+        return key, _fit_state(values), None
     except Exception as e:
-        return None, f"Forecasting model failed: {str(e)}"
\ No newline at end of file
+        return key, None, str(e)
+
+def _horizon_labels(columns, steps):
+    """Next period labels ('2025', '2025Q1', '2025-01', ...) after the last column, else 't+1', 't+2', ..."""
+    return next_labels(list(columns), steps)
+
+def forecast_all_line_items(data, steps=3, statement=None, max_workers=None):
+    """
+    MCP Tool: Forecast every numeric line item (optionally one statement only).
+    Independent fits run in a process pool; fits already in FIT_CACHE are reused.
+
+    Args:
+        data: Consolidated financial DataFrame ('Line Item' + period columns)
+        steps: Forecast horizon
+        statement: 'income_statement', 'balance_sheet', 'cash_flow' or None for all items
+        max_workers: Process pool size (default: one per CPU)
+
+    Returns:
+        tuple: (DataFrame indexed by line item with one column per horizon period
+                followed by fit diagnostics, status message)
+    """
+    if data is None or data.empty:
+        return None, "No data available for forecasting."
+
+    data = compact_frame(data)
+    periods = list(data.columns[1:])
+    values = data[periods]
+
+    keys, seasonals, histories = {}, {}, {}
+    skipped = 0
+    for item, row in zip(data['Line Item'], values.itertuples(index=False)):
+        if statement is not None and statement_of(item) != statement:
+            continue
+        observed = [(p, v) for p, v in zip(periods, row) if pd.notna(v)]
+        history, seasonal = seasonal_adjustment(np.array([v for _, v in observed], dtype=float),
+                                                [p for p, _ in observed], steps)
+        if len(history) < 3:
+            skipped += 1
+            continue
+        # Items with identical histories (all-zero rows, a subtotal equal to its total) share one fit
+        key = _cache_key(history)
+        keys[item] = key
+        seasonals[item] = seasonal
+        histories.setdefault(key, history)
+
+    if not keys:
+        return None, "No line items with at least 3 data points to forecast."
+
+    # Only series without a cached fit go to the pool
+    states = {key: FIT_CACHE.get(key) for key in histories}
+    tasks = [(key, history) for key, history in histories.items() if states[key] is None]
+
+    if len(tasks) >= ModalConfig.PARALLEL_MIN_ITEMS and max_workers != 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_fit_line_item, tasks, chunksize=max(1, len(tasks) // 32)))
+    else:
+        results = [_fit_line_item(task) for task in tasks]
+
+    failed = 0
+    for key, state, error in results:
+        if state is None:
+            continue
+        FIT_CACHE.put(key, state)
+        states[key] = state
+
+    horizon = _horizon_labels(periods, steps)
+    diagnostics = ('alpha', 'beta', 'phi', 'sse', 'aic', 'n_obs')
+    rows = {}
+    for item, key in keys.items():
+        state = states[key]
+        if state is None:
+            failed += 1
+            continue
+        rows[item] = {**dict(zip(horizon, _forecast_from_state(state, steps) + seasonals[item])),
+                      **{k: state[k] for k in diagnostics}}
+
+    table = pd.DataFrame.from_dict(rows, orient='index')
+    table.index.name = 'Line Item'
+
+    msg = (f"Forecast {len(rows)} line items ({skipped} skipped: < 3 data points, {failed} failed; "
+           f"{len(histories)} distinct series fitted, {len(histories) - len(tasks)} fits reused from cache).")
+    return table, msg
+
+def format_forecast_table(table, title="Forecast: All Line Items"):
+    """Markdown report for a forecast_all_line_items table."""
+    horizon = [c for c in table.columns if c not in ('alpha', 'beta', 'phi', 'sse', 'aic', 'n_obs')]
+
+    report = f"### 🔮 {title}\n\n"
+    report += "| Line Item | " + " | ".join(horizon) + " | α | β | φ | AIC |\n"
+    report += "|---|" + "---|" * (len(horizon) + 4) + "\n"
+    for item, row in table.iterrows():
+        values = " | ".join(f"{row[h]:,.0f}" for h in horizon)
+        report += f"| {item} | {values} | {row['alpha']:.2f} | {row['beta']:.2f} | {row['phi']:.3f} | {row['aic']:.1f} |\n"
+
+    return report
+
+def format_interval_forecast(table, name):
+    """Markdown report for a forecast_with_intervals table"""
+    levels = sorted(int(c.split('_')[1]) for c in table.columns if c.startswith('lower_'))
+
+    report = f"### 🔮 Forecast: {name}\n\n"
+    report += "| Period | Forecast | " + " | ".join(f"{pct}% interval" for pct in levels) + " |\n"
+    report += "|---|---|" + "---|" * len(levels) + "\n"
+    for period, row in table.iterrows():
+        bands = " | ".join(f"{row[f'lower_{pct}']:,.0f} – {row[f'upper_{pct}']:,.0f}" for pct in levels)
+        report += f"| {period} | {row['forecast']:,.0f} | {bands} |\n"
+
+    if table.attrs.get('calibrated'):
+        report += ("\n_Intervals are simulated and widened to this series' own rolling-origin forecast "
+                   "errors, which include parameter uncertainty._\n")
+        if table.attrs.get('n_obs', 0) < SHORT_HISTORY:
+            report += (f"_With fewer than {SHORT_HISTORY} periods the bands still undercover: on simulated "
+                       "5-period series the 80% and 95% bands held about 72% and 87% of outcomes._\n")
+    else:
+        report += ("\n_Intervals are conditional on the fitted parameters (history too short to backtest) "
+                   "and understate the true uncertainty._\n")
+    return report
@@ -0,0 +1,182 @@
+"""
+Consolidated Frame Module
+The typed layout every analyzer works on: a categorical 'Line Item' column followed by
+one float column per period label ('2024', '2024Q1', '2024-03'). Frames are validated
+and converted once (by the parser, or by an analyzer receiving a frame from JSON or
+another source), so analyzers read rows as floats without per-element coercion.
+
+Each item has one row. Other labels the same item was reported under are kept in
+df.attrs['aliases'] (label -> row label) and searched by LineItemIndex.
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+VALUE_DTYPES = ('float64', 'float32')  # float32 halves memory for large portfolios at ~7 significant digits
+
+
+class Aliases(dict):
+    """
+    Alias -> row label map for df.attrs['aliases']. pandas deep-copies attrs into the
+    result of every operation; this map is never modified after construction, so the
+    copy shares it instead.
+    """
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+def is_compact(df: pd.DataFrame, dtype: str = None) -> bool:
+    """True when df already has the typed layout (of `dtype`, or either value dtype)"""
+    if df.columns.empty or df.columns[0] != 'Line Item':
+        return False
+    if not isinstance(df['Line Item'].dtype, pd.CategoricalDtype):
+        return False
+    value_dtypes = {str(t) for t in df.dtypes.iloc[1:]}
+    allowed = {dtype} if dtype else set(VALUE_DTYPES)
+    return value_dtypes <= allowed and len(value_dtypes) <= 1 and all(isinstance(c, str) for c in df.columns)
+
+
+def compact_frame(df: pd.DataFrame, dtype: str = None) -> pd.DataFrame:
+    """
+    Typed copy of a consolidated DataFrame (returned as is when already compact)
+
+    Args:
+        df: DataFrame with 'Line Item' as first column, then one column per period
+        dtype: 'float64' or 'float32' for the values (default: keep a compact frame's
+               dtype, else float64)
+
+    Returns:
+        DataFrame: categorical 'Line Item', string period labels, float values (cells
+        that are not numbers become NaN); attrs are preserved
+
+    Raises:
+        ValueError: Missing 'Line Item' column, duplicate period labels or unknown dtype
+    """
+    if dtype is not None and dtype not in VALUE_DTYPES:
+        raise ValueError(f"Unknown value dtype '{dtype}' (use {VALUE_DTYPES}).")
+    if is_compact(df, dtype):
+        return df
+    if 'Line Item' not in df.columns:
+        raise ValueError("Consolidated data needs a 'Line Item' column.")
+
+    periods = [c for c in df.columns if c != 'Line Item']
+    labels = [str(c) for c in periods]
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"Duplicate period columns: {sorted(l for l in set(labels) if labels.count(l) > 1)}")
+
+    values = df[periods]
+    try:
+        values = values.to_numpy(dtype=dtype or 'float64')
+    except (TypeError, ValueError):
+        # Text cells (e.g. '1,200' or '-') – one column-wise conversion
+        values = values.apply(lambda col: pd.to_numeric(col.astype(str).str.replace(',', '').str.strip(),
+                                                        errors='coerce'))
+        values = values.to_numpy(dtype=dtype or 'float64')
+
+    result = pd.DataFrame(values, columns=labels, index=df.index)
+    result.insert(0, 'Line Item', pd.Categorical(df['Line Item'].astype(str)))
+    result.attrs = dict(df.attrs)
+    return result
+
+
+def value_matrix(df: pd.DataFrame) -> np.ndarray:
+    """(items, periods) float array of a consolidated DataFrame"""
+    return compact_frame(df).iloc[:, 1:].to_numpy()
+
+
+class LineItemIndex:
+    """
+    Keyword lookup over row labels and their aliases. Exact labels are a dict hit;
+    substring keywords only test the labels that share all of the keyword's trigrams.
+    Matches resolve to row positions in frame order, so first() returns the row a
+    str.contains scan of the labels followed by .iloc[0] would have found.
+    """
+
+    GRAM = 3
+
+    def __init__(self, df: pd.DataFrame):
+        self._names: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._aliases: Dict[str, str] = {}
+        self._alias_entries: Dict[str, int] = {}  # Alias -> its entry in _labels
+        self._labels: List[list] = []          # [lowercase label, position]; position None once dropped
+        self._exact: Dict[str, int] = {}
+        self._grams: Dict[str, set] = {}
+        self._found: Dict[str, List[int]] = {}
+        self.extend(df)
+
+    @classmethod
+    def _ngrams(cls, text: str) -> set:
+        return {text[i:i + cls.GRAM] for i in range(len(text) - cls.GRAM + 1)}
+
+    def _add(self, label: str, pos: int) -> int:
+        label = label.lower()
+        i = len(self._labels)
+        self._labels.append([label, pos])
+        self._exact[label] = min(pos, self._exact.get(label, pos))
+        for gram in self._ngrams(label):
+            self._grams.setdefault(gram, set()).add(i)
+        return i
+
+    def extend(self, df: pd.DataFrame) -> None:
+        """
+        Indexes the rows and aliases that df adds to the frame indexed so far (rows
+        already indexed must keep their positions, e.g. after parsing.append_period).
+        Cached keyword results gain the new matches; a dropped or retargeted alias
+        clears them.
+        """
+        names = [str(name) for name in df['Line Item']]
+        if names[:len(self._names)] != self._names:
+            raise ValueError("Indexed rows changed position; build a new LineItemIndex.")
+        added = []
+        for pos in range(len(self._names), len(names)):
+            self._names.append(names[pos])
+            self._rows.setdefault(names[pos], pos)
+            added.append(self._add(names[pos], pos))
+
+        aliases = {str(a): str(t) for a, t in df.attrs.get('aliases', {}).items() if str(t) in self._rows}
+        stale = [a for a, t in self._aliases.items() if aliases.get(a) != t]
+        for alias in stale:
+            self._labels[self._alias_entries.pop(alias)][1] = None
+        if stale:
+            self._exact = {}
+            for label, pos in self._labels:
+                if pos is not None:
+                    self._exact[label] = min(pos, self._exact.get(label, pos))
+            self._found.clear()
+        for alias, target in aliases.items():
+            if alias not in self._alias_entries:
+                self._alias_entries[alias] = self._add(alias, self._rows[target])
+                added.append(self._alias_entries[alias])
+        self._aliases = aliases
+
+        for keyword, found in self._found.items():
+            new = {self._labels[i][1] for i in added if keyword in self._labels[i][0]}
+            if new:
+                self._found[keyword] = sorted(new.union(found))
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def exact(self, label: str) -> Optional[int]:
+        """Row position of a label or alias (case-insensitive), None if unknown"""
+        return self._exact.get(str(label).lower())
+
+    def find(self, keyword: str) -> List[int]:
+        """Row positions whose label or an alias contains keyword (case-insensitive), in frame order"""
+        keyword = str(keyword).lower()
+        if keyword not in self._found:
+            grams = self._ngrams(keyword)
+            if grams:
+                candidates = set.intersection(*sorted((self._grams.get(g, set()) for g in grams), key=len))
+            else:
+                candidates = range(len(self._labels))  # Keywords shorter than a trigram
+            self._found[keyword] = sorted({pos for label, pos in (self._labels[i] for i in candidates)
+                                           if pos is not None and keyword in label})
+        return self._found[keyword]
+
+    def first(self, keyword: str) -> Optional[int]:
+        """First row position matching keyword, None if none"""
+        found = self.find(keyword)
+        return found[0] if found else None
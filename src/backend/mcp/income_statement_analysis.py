@@ -6,6 +6,11 @@ import pandas as pd
 import numpy as np
 from typing import Tuple, Optional
 
+from src.backend.mcp.cache import memoize_analyzer
+from src.backend.mcp.frames import LineItemIndex, compact_frame
+
+REPORT_VERSION = 1  # Bump when the report changes (invalidates memoized reports)
+
 class IncomeStatementAnalyzer:
     """Analyzes income statement and profitability trends"""
     
@@ -15,14 +20,15 @@ class IncomeStatementAnalyzer:
         Args:
             df: DataFrame with income statement data
         """
-        self.df = df
+        self.df = compact_frame(df)
+        self.line_items = LineItemIndex(self.df)
     
     def _get_series(self, keywords: list) -> Optional[pd.Series]:
         """Safely retrieve financial line item by keywords"""
         for key in keywords:
-            match = self.df[self.df['Line Item'].astype(str).str.lower().str.contains(key.lower(), na=False)]
-            if not match.empty:
-                numeric_data = match.iloc[0, 1:].apply(pd.to_numeric, errors='coerce')
+            pos = self.line_items.first(key)
+            if pos is not None:
+                numeric_data = self.df.iloc[pos, 1:]
                 if numeric_data.notna().sum() > 0:
                     return numeric_data
         return None
@@ -183,6 +189,7 @@ class IncomeStatementAnalyzer:
         return report, "✅ Income statement analysis complete."
 
 
+@memoize_analyzer(REPORT_VERSION)
 def analyze_income_statement(data: pd.DataFrame) -> Tuple[str, str]:
     """
     Main MCP Tool: Income Statement Analysis
@@ -0,0 +1,234 @@
+"""
+Incremental Analysis Module
+Keeps the parsed data and its analyses current as new periods arrive (one new set of
+statements per company per year) without re-running everything over the full history:
+    store     - parsing.append_period merges the new statements; earlier files are not re-parsed
+    index     - LineItemIndex.extend adds only the new labels and aliases
+    ratios    - one new column from the new period's items (all columns only if an item
+                now resolves to a different row)
+    trends    - online updates: Welford means and co-moments for the regression, mean and
+                variance; running min/max, growth sums and first/last values for CAGR
+    anomalies - robust scores are medians with no exact online update: rows are re-scored
+                from the stored history and the new period's flags are kept
+Every result equals a full recompute over all periods (see benchmark.py incremental).
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence
+
+from src.backend.mcp.advanced_ratios import AdvancedRatioAnalyzer, compute_ratios
+from src.backend.mcp.anomalies import DEFAULT_THRESHOLD, anomaly_table
+from src.backend.mcp.frames import LineItemIndex, compact_frame
+from src.backend.mcp.parsing import append_period
+from src.backend.mcp.periods import parse_period, periods_per_year
+
+
+class TrendState:
+    """
+    Running statistics behind trend_analysis.trend_statistics for every row, updated one
+    period at a time in O(rows)
+    """
+
+    def __init__(self, values: np.ndarray, per_year: int = 1):
+        """
+        Args:
+            values: (N, T) history, periods in order (NaN where missing)
+            per_year: Periods per year (YoY lag and CAGR annualization)
+        """
+        Y = np.asarray(values, dtype=float)
+        N, T = Y.shape
+        self.per_year = per_year
+        self.n_periods = 0
+        self.n = np.zeros(N)
+        self.mean_x, self.mean_y = np.zeros(N), np.zeros(N)
+        self.sxx, self.syy, self.sxy = np.zeros(N), np.zeros(N), np.zeros(N)
+        self.min, self.max = np.full(N, np.inf), np.full(N, -np.inf)
+        self.first, self.last = np.full(N, np.nan), np.full(N, np.nan)
+        self.first_pos, self.last_pos = np.zeros(N, dtype=int), np.zeros(N, dtype=int)
+        self.growth_sum, self.growth_count = np.zeros(N), np.zeros(N)
+        self.latest_growth = np.full(N, np.nan)
+        self.recent = np.full((N, per_year), np.nan)   # Last per_year values, oldest first
+        self.yoy: List[np.ndarray] = []
+        for t in range(T):
+            self.append(Y[:, t])
+
+    def append(self, y: np.ndarray) -> None:
+        """Adds the next period's (N,) values"""
+        y = np.asarray(y, dtype=float)
+        x = float(self.n_periods)
+        valid = ~np.isnan(y)
+        yv = np.where(valid, y, 0.0)
+
+        # Welford updates of the means and centred (co-)moments
+        n = self.n + valid
+        dx = np.where(valid, x - self.mean_x, 0.0)
+        dy = np.where(valid, yv - self.mean_y, 0.0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.mean_x = np.where(valid, self.mean_x + dx / n, self.mean_x)
+            self.mean_y = np.where(valid, self.mean_y + dy / n, self.mean_y)
+        self.sxx += dx * np.where(valid, x - self.mean_x, 0.0)
+        self.syy += dy * np.where(valid, yv - self.mean_y, 0.0)
+        self.sxy += dx * np.where(valid, yv - self.mean_y, 0.0)
+        self.n = n
+
+        self.min = np.where(valid, np.fmin(self.min, yv), self.min)
+        self.max = np.where(valid, np.fmax(self.max, yv), self.max)
+        starts = valid & np.isnan(self.first)
+        self.first = np.where(starts, y, self.first)
+        self.first_pos = np.where(starts, self.n_periods, self.first_pos)
+        self.last = np.where(valid, y, self.last)
+        self.last_pos = np.where(valid, self.n_periods, self.last_pos)
+
+        # Growth on the same period a year earlier (0 where that value is 0)
+        if self.n_periods >= self.per_year:
+            prev = self.recent[:, 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                growth = np.where(prev != 0, (y - prev) / np.abs(prev) * 100, 0.0)
+            growth[np.isnan(prev) | np.isnan(y)] = np.nan
+            has_growth = ~np.isnan(growth)
+            self.growth_sum += np.where(has_growth, growth, 0.0)
+            self.growth_count += has_growth
+            self.latest_growth = np.where(has_growth, growth, self.latest_growth)
+            self.yoy.append(growth)
+        self.recent = np.concatenate([self.recent[:, 1:], y[:, None]], axis=1)
+        self.n_periods += 1
+
+    def add_rows(self, values: np.ndarray) -> None:
+        """Appends rows (new line items) given their (M, T) history over the periods seen so far"""
+        other = TrendState(values, self.per_year)
+        for name in ('n', 'mean_x', 'mean_y', 'sxx', 'syy', 'sxy', 'min', 'max', 'first', 'last',
+                     'first_pos', 'last_pos', 'growth_sum', 'growth_count', 'latest_growth', 'recent'):
+            setattr(self, name, np.concatenate([getattr(self, name), getattr(other, name)]))
+        self.yoy = [np.concatenate([a, b]) for a, b in zip(self.yoy, other.yoy)]
+
+    def statistics(self) -> Dict[str, np.ndarray]:
+        """The trend_statistics dict for the history seen so far"""
+        n, observed = self.n, self.n > 0
+        T = self.n_periods
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean_x = np.where(observed, self.mean_x, np.nan)
+            mean_y = np.where(observed, self.mean_y, np.nan)
+            slope = self.sxy / self.sxx
+            intercept = mean_y - slope * mean_x
+            r_squared = np.where(self.syy > 0, self.sxy ** 2 / (self.sxx * self.syy), np.nan)
+            std = np.where(n > 1, np.sqrt(self.syy / np.maximum(n - 1, 1)), np.nan)
+            cv_pct = std / np.abs(mean_y) * 100
+            avg_growth_pct = np.where(self.growth_count > 0, self.growth_sum / self.growth_count, np.nan)
+            last_pos = np.where(observed, self.last_pos, T - 1)
+            span = (last_pos - self.first_pos).astype(float)
+            cagr_pct = np.where((self.first > 0) & (self.last > 0) & (span > 0),
+                                ((self.last / self.first) ** (self.per_year / span) - 1) * 100, np.nan)
+        yoy = np.stack(self.yoy, axis=1) if self.yoy else np.empty((len(n), 0))
+        return {
+            'slope': slope, 'intercept': intercept, 'r_squared': r_squared, 'cagr_pct': cagr_pct,
+            'avg_growth_pct': avg_growth_pct, 'latest_growth_pct': self.latest_growth, 'cv_pct': cv_pct,
+            'mean': mean_y, 'std': std, 'min': np.where(observed, self.min, np.nan),
+            'max': np.where(observed, self.max, np.nan), 'n_obs': n.astype(int),
+            'last_position': last_pos, 'yoy_pct': yoy,
+        }
+
+
+def ratio_table(items: Dict[str, Optional[pd.Series]]) -> pd.DataFrame:
+    """Ratios x periods table from extract_items() output"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = compute_ratios(items)
+    return pd.DataFrame(ratios).T
+
+
+class IncrementalAnalysis:
+    """
+    Consolidated data plus its line-item index, ratio table, trend statistics and
+    latest-period anomalies, updated in place by append()
+    """
+
+    def __init__(self, data: pd.DataFrame, anomaly_methods: Sequence[str] = ('level', 'yoy'),
+                 threshold: float = DEFAULT_THRESHOLD):
+        self.anomaly_methods = anomaly_methods
+        self.threshold = threshold
+        self._rebuild(compact_frame(data))
+
+    @property
+    def periods(self) -> List[str]:
+        return list(self.data.columns[1:])
+
+    def _rebuild(self, data: pd.DataFrame) -> None:
+        """Full computation over every period"""
+        self.data = data
+        self.line_items = LineItemIndex(data)
+        self.trends = TrendState(data.iloc[:, 1:].to_numpy(dtype=float), periods_per_year(self.periods))
+        self._items = AdvancedRatioAnalyzer(data, self.line_items).extract_items()
+        self.ratios = ratio_table(self._items)
+        self.anomalies = self._latest_anomalies()
+
+    def _latest_anomalies(self) -> pd.DataFrame:
+        table = anomaly_table(self.data, methods=self.anomaly_methods, threshold=self.threshold)
+        return table[table['period'] == self.periods[-1]].reset_index(drop=True) if self.periods else table
+
+    def _appends_cleanly(self, old: pd.DataFrame, merged: pd.DataFrame) -> bool:
+        """True when merged only adds later periods and new rows (earlier figures untouched)"""
+        old_periods, periods = list(old.columns[1:]), list(merged.columns[1:])
+        if periods[:len(old_periods)] != old_periods or len(periods) == len(old_periods):
+            return False
+        last = parse_period(old_periods[-1]) if old_periods else None
+        if last is not None and any(parse_period(p) is None or parse_period(p) <= last
+                                    for p in periods[len(old_periods):]):
+            return False
+        if list(merged['Line Item'][:len(old)]) != list(old['Line Item']):
+            return False
+        before = old.iloc[:, 1:].to_numpy(dtype=float)
+        after = merged.iloc[:len(old), 1:len(old_periods) + 1].to_numpy(dtype=float)
+        return np.array_equal(before, after, equal_nan=True)
+
+    def append(self, new_data: pd.DataFrame) -> List[str]:
+        """
+        Adds parse_file output for one or more new periods and updates every result.
+        New figures for periods already held (restatements) trigger a full recompute.
+
+        Returns:
+            list: Log lines
+        """
+        old = self.data
+        merged, logs = append_period(old, new_data)
+        if not self._appends_cleanly(old, merged):
+            self._rebuild(merged)
+            logs.append("♻️ New data revises earlier periods: recomputed in full.")
+            return logs
+
+        new_periods = list(merged.columns[len(old.columns):])
+        self.data = merged
+        self.line_items.extend(merged)
+
+        # New items: their (empty) history joins the trend state before the new periods
+        if len(merged) > len(old):
+            self.trends.add_rows(merged.iloc[len(old):, 1:len(old.columns)].to_numpy(dtype=float))
+        for period in new_periods:
+            self.trends.append(merged[period].to_numpy(dtype=float))
+
+        items = AdvancedRatioAnalyzer(merged, self.line_items).extract_items()
+        resolved = {k: None if v is None else v.name for k, v in items.items()}
+        if resolved == {k: None if v is None else v.name for k, v in self._items.items()}:
+            latest = ratio_table({k: None if v is None else v[new_periods] for k, v in items.items()})
+            self.ratios = pd.concat([self.ratios, latest], axis=1)
+        else:
+            self.ratios = ratio_table(items)
+        self._items = items
+        self.anomalies = self._latest_anomalies()
+
+        logs.append(f"➕ Appended {', '.join(new_periods)} incrementally "
+                    f"({len(merged) - len(old)} new line items).")
+        return logs
+
+    def trend_table(self) -> pd.DataFrame:
+        """Same layout as TrendAnalyzer.trend_table()"""
+        stats = self.trends.statistics()
+        stats.pop('yoy_pct')
+        table = pd.DataFrame(stats)
+        table.insert(0, 'Line Item', self.data['Line Item'].to_numpy())
+        return table
+
+    def yoy_growth(self) -> pd.DataFrame:
+        """Same layout as TrendAnalyzer.yoy_growth()"""
+        per_year = self.trends.per_year
+        table = pd.DataFrame(self.trends.statistics()['yoy_pct'], columns=self.periods[per_year:])
+        table.insert(0, 'Line Item', self.data['Line Item'].to_numpy())
+        return table
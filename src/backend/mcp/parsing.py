@@ -1,8 +1,12 @@
 import pandas as pd
 import pypdf
+import io
 import os
 import re
 
+from src.backend.mcp.frames import Aliases, compact_frame
+from src.backend.mcp.periods import parse_period, period_label, sort_labels, detect_frequency
+
 def normalize_row_name(row_name):
     """
     Maps various financial terms to a standard set using fuzzy keyword matching.
@@ -200,9 +204,62 @@ def normalize_row_name(row_name):
             
     return row_name  # Return original if no match found
 
-def parse_file(file_objs):
+# Canonical line items (as returned by normalize_row_name) grouped by statement
+STATEMENT_ITEMS = {
+    'income_statement': [
+        'Revenue', 'COGS', 'Gross Profit', 'Operating Expenses', 'Depreciation',
+        'Operating Profit', 'Interest Expense', 'Interest Income', 'Tax Expense',
+        'Net Income', 'EBITDA'
+    ],
+    'balance_sheet': [
+        'Current Assets', 'Cash', 'Receivables', 'Inventory', 'Non-Current Assets',
+        'PPE', 'Intangible Assets', 'Total Assets', 'Current Liabilities', 'Payables',
+        'Short-term Debt', 'Non-Current Liabilities', 'Long-term Debt',
+        'Total Liabilities', 'Total Equity'
+    ],
+    'cash_flow': [
+        'Operating Cash Flow', 'Investing Cash Flow', 'Financing Cash Flow', 'Net Cash Flow'
+    ],
+}
+
+def statement_of(line_item):
+    """
+    Returns the statement key ('income_statement', 'balance_sheet', 'cash_flow')
+    a line item belongs to, or None if it does not map to a canonical item.
+    """
+    canonical = normalize_row_name(line_item)
+    for statement, items in STATEMENT_ITEMS.items():
+        if canonical in items:
+            return statement
+    return None
+
+def fold_aliases(consolidated_data, raw_names):
+    """
+    Drops raw-label rows that duplicate their normalized row.
+
+    A raw label whose values equal the normalized row's values (every period) is the same
+    item and becomes an alias. A raw label whose values differ (two different items
+    normalized to one name, e.g. 'Distribution Costs' and 'Other Operating Expenses')
+    keeps its own row so no reported figure is lost.
+
+    Returns:
+        tuple: (row label -> {period: value}, alias -> row label)
+    """
+    rows, aliases = {}, {}
+    normalized = set(raw_names.values())
+    for label, values in consolidated_data.items():
+        clean_name = raw_names.get(label)
+        if clean_name is not None and label not in normalized and consolidated_data.get(clean_name) == values:
+            aliases[label] = clean_name
+        else:
+            rows[label] = values
+    return rows, aliases
+
+def parse_file(file_objs, dtype='float64'):
     """
     Robust Parser: Handles PDF text extraction and Fuzzy Excel Parsing.
+    The consolidated DataFrame is typed once here (frames.compact_frame): categorical
+    'Line Item' and `dtype` ('float64' or 'float32') values.
     """
     if file_objs is None:
         return None, None, "No files provided."
@@ -211,6 +268,7 @@ def parse_file(file_objs):
         file_objs = [file_objs]
 
     consolidated_data = {} 
+    raw_names = {}  # Raw label -> normalized name, for labels that differ from their normalized name
     consolidated_text = ""
     logs = []
     
@@ -228,24 +286,24 @@ def parse_file(file_objs):
                 else:
                     df_raw = pd.read_excel(file_path, header=None)
                 
-                # 1. Detect Year (Look in filename or first few rows)
+                # 1. Detect Period (Look in filename or first few rows): year, quarter or month
                 detected_year = None
-                year_match = re.search(r'20\d{2}', filename)
-                if year_match:
-                    detected_year = year_match.group(0)
+                period = parse_period(filename)
                 
-                # Scan first 10 rows for a year if not in filename
-                if not detected_year:
+                # Scan first 10 rows for a period if not in filename (month names there
+                # are usually a year-end date, so only years and quarters count)
+                if period is None:
                     for i in range(min(10, len(df_raw))):
                         row_vals = df_raw.iloc[i].astype(str).values
                         for val in row_vals:
-                            ym = re.search(r'20\d{2}', val)
-                            if ym:
-                                detected_year = ym.group(0)
+                            period = parse_period(val, allow_months=False)
+                            if period is not None:
                                 break
-                        if detected_year: break
+                        if period is not None: break
                 
-                if not detected_year:
+                if period is not None:
+                    detected_year = period_label(period)
+                else:
                     logs.append(f"⚠️ Warning: Could not detect year for {filename}. Data might be misaligned.")
                     detected_year = "Unknown_Year"
 
@@ -294,13 +352,15 @@ def parse_file(file_objs):
                     
                     # Store using the Standardized Name
                     consolidated_data[clean_name][detected_year] = val
-                    # Also store original name for specific queries
+                    # Also store original name for specific queries (folded into an alias below
+                    # when it carries the same values as the normalized row)
                     if raw_name != clean_name:
+                        raw_names[raw_name] = clean_name
                         if raw_name not in consolidated_data:
                             consolidated_data[raw_name] = {}
                         consolidated_data[raw_name][detected_year] = val
                 
-                logs.append(f"✅ Parsed Data from {filename} (Year: {detected_year})")
+                logs.append(f"✅ Parsed Data from {filename} (Period: {detected_year})")
 
             # --- PDF / TEXT ---
             elif ext == '.pdf':
@@ -323,9 +383,108 @@ def parse_file(file_objs):
     # Final Formatting
     df_final = None
     if consolidated_data:
-        df_final = pd.DataFrame.from_dict(consolidated_data, orient='index')
-        df_final = df_final.reindex(sorted(df_final.columns), axis=1)
-        df_final.reset_index(inplace=True)
-        df_final.rename(columns={'index': 'Line Item'}, inplace=True)
+        df_final, final_logs = consolidate(consolidated_data, raw_names, dtype)
+        logs.extend(final_logs)
+
+    return df_final, consolidated_text, "\n".join(logs)
+
+def consolidate(consolidated_data, raw_names, dtype='float64'):
+    """
+    Consolidated DataFrame from row label -> {period: value} (raw labels included):
+    duplicate raw rows folded into aliases, periods in order, typed with compact_frame.
+
+    Returns:
+        tuple: (DataFrame, list of log lines)
+    """
+    logs = []
+    consolidated_data, aliases = fold_aliases(consolidated_data, raw_names)
+    # Rows in order of first appearance (from_dict orders nested dicts by period first)
+    df_final = pd.DataFrame.from_dict(consolidated_data, orient='index').reindex(list(consolidated_data))
+    df_final = df_final.reindex(sort_labels(df_final.columns), axis=1)
+    df_final.reset_index(inplace=True)
+    df_final.rename(columns={'index': 'Line Item'}, inplace=True)
+    df_final = compact_frame(df_final, dtype)
+    df_final.attrs['aliases'] = Aliases(aliases)
+    if aliases:
+        logs.append(f"🔗 {len(aliases)} raw labels matched their normalized rows and are kept as aliases.")
+    
+    # Period frequency ('A', 'Q', 'M'); None when labels mix frequencies or do not parse
+    frequency = detect_frequency(df_final.columns[1:])
+    df_final.attrs['frequency'] = frequency
+    if frequency is None:
+        logs.append("⚠️ Warning: Periods mix frequencies or could not be recognised; treating columns as annual.")
+    elif frequency != 'A':
+        logs.append(f"🗓️ Detected {'quarterly' if frequency == 'Q' else 'monthly'} periods.")
+    return df_final, logs
+
+def append_period(data, new_data):
+    """
+    Adds newly parsed statements (parse_file output for the new period's files only) to
+    an existing consolidated DataFrame without re-parsing the earlier files. New values
+    overwrite existing ones for the same item and period, as a later file does in
+    parse_file, and aliases are re-folded over the merged rows, so the result matches
+    parsing all files together. Items first reported in new_data are added at the end;
+    a raw label whose values stop matching its normalized row becomes a row again.
+
+    Returns:
+        tuple: (DataFrame, list of log lines)
+    """
+    return merge_parsed([data, new_data])
+
+def merge_parsed(frames):
+    """
+    One consolidated DataFrame from parse_file outputs of separate files (in file order:
+    later values win, as in a single parse_file call); the value dtype of the first.
 
-    return df_final, consolidated_text, "\n".join(logs)
\ No newline at end of file
+    Returns:
+        tuple: (DataFrame, list of log lines)
+    """
+    frames = [compact_frame(df) for df in frames]
+    merged = {}
+    for df in frames:
+        periods = list(df.columns[1:])
+        rows = {}
+        for item, row in zip(df['Line Item'], df[periods].itertuples(index=False)):
+            rows.setdefault(item, {p: v for p, v in zip(periods, row) if pd.notna(v)})
+        aliases = {}
+        for alias, target in df.attrs.get('aliases', {}).items():
+            aliases.setdefault(target, []).append(alias)
+        # Each alias right after its row, where parse_file first met the raw label
+        for item, values in rows.items():
+            merged.setdefault(item, {}).update(values)
+            for alias in aliases.get(item, []):
+                merged.setdefault(alias, {}).update(values)
+
+    raw_names = {label: normalize_row_name(label) for label in merged}
+    raw_names = {label: clean for label, clean in raw_names.items() if clean != label}
+    first = frames[0]
+    return consolidate(merged, raw_names, str(first.dtypes.iloc[1]) if len(first.columns) > 1 else 'float64')
+
+def frame_to_json(data):
+    """
+    Records JSON of a consolidated DataFrame, the format the MCP tools exchange. attrs do
+    not survive JSON, so each alias is written back as a row (a copy of its target's
+    values, right after it) for frame_from_json to fold again.
+    """
+    data = compact_frame(data)
+    aliases = {}
+    for alias, target in data.attrs.get('aliases', {}).items():
+        aliases.setdefault(target, []).append(alias)
+    rows = data.astype({'Line Item': str})
+    if aliases:
+        order = []
+        for pos, item in enumerate(rows['Line Item']):
+            order.append((pos, item))
+            order.extend((pos, alias) for alias in aliases.pop(item, []))
+        rows = rows.iloc[[pos for pos, _ in order]].reset_index(drop=True)
+        rows['Line Item'] = [label for _, label in order]
+    return rows.to_json(orient='records')
+
+def frame_from_json(financial_data_json):
+    """
+    Consolidated DataFrame from frame_to_json output (or any records/columns JSON of a
+    consolidated frame): typed, with raw-label rows folded back into df.attrs['aliases']
+    """
+    data = pd.read_json(io.StringIO(financial_data_json))
+    df, _ = merge_parsed([data])
+    return df
@@ -0,0 +1,216 @@
+"""
+Period Axis Module
+Typed reporting periods for the consolidated DataFrame. Column labels stay plain
+strings ('2024', '2024Q1', '2024-03') so every analyzer keeps working on labels,
+but they are parsed into pandas Periods for ordering, frequency detection,
+next-period labels, annualization and seasonal adjustment.
+"""
+import re
+import numpy as np
+import pandas as pd
+from typing import Iterable, List, Optional, Tuple
+
+from src.backend.mcp.frames import compact_frame
+
+# Periods per year for each frequency code
+PERIODS_PER_YEAR = {'A': 1, 'Q': 4, 'M': 12}
+
+_MONTHS = {m: i + 1 for i, m in enumerate(['jan', 'feb', 'mar', 'apr', 'may', 'jun',
+                                            'jul', 'aug', 'sep', 'oct', 'nov', 'dec'])}
+_YEAR = r'(20\d{2})'
+_QUARTER_PATTERNS = [re.compile(_YEAR + r'\s*[-_ ]?\s*q([1-4])\b'), re.compile(r'\bq([1-4])\s*[-_ ]?\s*' + _YEAR)]
+_MONTH_NUMERIC = re.compile(_YEAR + r'[-_/](0[1-9]|1[0-2])(?![-_/]?\d)')
+_MONTH_NAMED = [re.compile(r'\b(' + '|'.join(_MONTHS) + r')[a-z]*[-_ ]*' + _YEAR),
+                re.compile(_YEAR + r'[-_ ]*(' + '|'.join(_MONTHS) + r')[a-z]*\b')]
+
+
+def parse_period(text, allow_months: bool = True) -> Optional[pd.Period]:
+    """
+    Reporting period named in a label, filename or cell, e.g.
+    '2024' -> 2024, 'Q1 2024' / '2024Q1' -> 2024Q1, '2024-03' / 'Mar_2024' -> 2024-03.
+    Month forms are only recognised with allow_months (a date like 'year ended 31 March
+    2024' in a statement heading names an annual period).
+    """
+    text = str(text).strip().lower()
+    for pattern in _QUARTER_PATTERNS:
+        m = pattern.search(text)
+        if m:
+            year, quarter = (m.group(1), m.group(2)) if pattern is _QUARTER_PATTERNS[0] else (m.group(2), m.group(1))
+            return pd.Period(year=int(year), quarter=int(quarter), freq='Q')
+    if allow_months:
+        m = _MONTH_NUMERIC.search(text)
+        if m:
+            return pd.Period(year=int(m.group(1)), month=int(m.group(2)), freq='M')
+        for i, pattern in enumerate(_MONTH_NAMED):
+            m = pattern.search(text)
+            if m:
+                month, year = (m.group(1), m.group(2)) if i == 0 else (m.group(2), m.group(1))
+                return pd.Period(year=int(year), month=_MONTHS[month[:3]], freq='M')
+    m = re.search(_YEAR, text)
+    if m:
+        return pd.Period(year=int(m.group(1)), freq='Y')
+    return None
+
+
+def frequency_of(period: pd.Period) -> str:
+    """'A', 'Q' or 'M'"""
+    return {'Y': 'A', 'Q': 'Q', 'M': 'M'}[period.freqstr[0]]
+
+
+def period_label(period: pd.Period) -> str:
+    """Column label for a period: '2024', '2024Q1' or '2024-03'"""
+    return str(period)
+
+
+def period_index(labels: Iterable) -> Optional[pd.PeriodIndex]:
+    """PeriodIndex for column labels of one frequency, or None if any label does not parse or frequencies mix"""
+    periods = [parse_period(label) for label in labels]
+    if not periods or any(p is None for p in periods):
+        return None
+    if len({frequency_of(p) for p in periods}) != 1:
+        return None
+    return pd.PeriodIndex(periods)
+
+
+def detect_frequency(labels: Iterable) -> Optional[str]:
+    """'A', 'Q' or 'M' when every label is a period of that frequency, else None"""
+    index = period_index(labels)
+    return None if index is None else frequency_of(index[0])
+
+
+def sort_labels(labels: Iterable) -> List:
+    """Chronological order when the labels parse as periods, else plain sort"""
+    labels = list(labels)
+    parsed = [parse_period(label) for label in labels]
+    if all(p is not None for p in parsed):
+        return [label for _, _, label in sorted(zip([p.start_time for p in parsed],
+                                                    [p.end_time for p in parsed], labels))]
+    return sorted(labels, key=str)
+
+
+def next_labels(labels: List, steps: int) -> List[str]:
+    """Labels of the `steps` periods after the last label ('2025', '2025Q1', ...), else 't+1', 't+2', ..."""
+    period = parse_period(labels[-1]) if len(labels) else None
+    if period is None:
+        return [f"t+{i}" for i in range(1, steps + 1)]
+    return [period_label(period + i) for i in range(1, steps + 1)]
+
+
+def periods_per_year(labels: Iterable) -> int:
+    """1, 4 or 12 for annual, quarterly or monthly labels (1 when unknown)"""
+    return PERIODS_PER_YEAR.get(detect_frequency(labels), 1)
+
+
+def season_positions(labels: Iterable) -> Optional[np.ndarray]:
+    """Position of each period in its year (quarter - 1 or month - 1), None if not sub-annual"""
+    index = period_index(labels)
+    if index is None or frequency_of(index[0]) == 'A':
+        return None
+    return np.asarray(index.quarter - 1 if frequency_of(index[0]) == 'Q' else index.month - 1)
+
+
+def seasonal_indices(Y: np.ndarray, positions: np.ndarray, m: int) -> np.ndarray:
+    """
+    Additive seasonal index per series and season (classical decomposition): a centred
+    moving average of one year removes trend, and the detrended values are averaged by
+    season position and centred to sum to zero.
+
+    Args:
+        Y: (N, T) values without gaps, T >= 2m
+        positions: (T,) season position of each column
+        m: Periods per year
+
+    Returns:
+        (N, m) seasonal indices
+    """
+    Y = np.asarray(Y, dtype=float)
+    cumulative = np.concatenate([np.zeros((len(Y), 1)), np.cumsum(Y, axis=1)], axis=1)
+    window = (cumulative[:, m:] - cumulative[:, :-m]) / m                     # mean of Y[t:t+m]
+    if m % 2 == 0:
+        trend = (window[:, :-1] + window[:, 1:]) / 2                          # centred 2 x m average
+        offset = m // 2
+    else:
+        trend, offset = window, m // 2
+    detrended = Y[:, offset:offset + trend.shape[1]] - trend
+
+    pos = positions[offset:offset + trend.shape[1]]
+    onehot = pos[:, None] == np.arange(m)[None, :]                          # (T', m)
+    counts = onehot.sum(axis=0)
+    indices = (detrended @ onehot) / np.maximum(counts, 1)
+    return indices - indices.mean(axis=1, keepdims=True)
+
+
+def seasonal_adjustment(Y: np.ndarray, labels: List, steps: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Seasonally adjusted history and the seasonal component of the next `steps` periods.
+    Annual data, unknown or non-consecutive labels and fewer than two full years return
+    Y unchanged and zeros.
+    """
+    Y = np.asarray(Y, dtype=float)
+    index = period_index(labels)
+    positions = season_positions(labels)
+    m = periods_per_year(labels)
+    if positions is None or Y.shape[-1] < 2 * m or (index[-1] - index[0]).n != len(index) - 1:
+        return Y, np.zeros(Y.shape[:-1] + (steps,))
+    squeeze = Y.ndim == 1
+    Y2 = np.atleast_2d(Y)
+    indices = seasonal_indices(Y2, positions, m)
+    future = (positions[-1] + np.arange(1, steps + 1)) % m
+    adjusted, seasonal = Y2 - indices[:, positions], indices[:, future]
+    return (adjusted[0], seasonal[0]) if squeeze else (adjusted, seasonal)
+
+
+def is_stock(line_item) -> bool:
+    """Balance sheet items are point-in-time stocks; everything else is a flow over the period"""
+    from src.backend.mcp.parsing import statement_of  # parsing imports this module
+    return statement_of(line_item) == 'balance_sheet'
+
+
+def to_annual(data: pd.DataFrame, partial: str = 'scale') -> pd.DataFrame:
+    """
+    Annual view of quarterly or monthly data: flows are summed within each year, stocks
+    take the year's last reported value. Annual (or unrecognised) data is returned as is.
+
+    Args:
+        data: Consolidated DataFrame with period columns
+        partial: Years with missing periods - 'scale' flows to a full year (run rate)
+                 or 'drop' the year
+
+    Returns:
+        DataFrame: 'Line Item' + one column per year ('2023', '2024', ...)
+    """
+    labels = [c for c in data.columns if c != 'Line Item']
+    index = period_index(labels)
+    if index is None or frequency_of(index[0]) == 'A':
+        return data
+
+    data = compact_frame(data)
+    m = PERIODS_PER_YEAR[frequency_of(index[0])]
+    values = data.iloc[:, 1:].to_numpy(dtype=float)
+    years = np.asarray(index.year)
+    unique_years, year_idx = np.unique(years, return_inverse=True)
+    onehot = (year_idx[:, None] == np.arange(len(unique_years))[None, :]).astype(float)   # (T, Y)
+
+    observed = ~np.isnan(values)
+    counts = observed.astype(float) @ onehot                                               # (N, Y)
+    flows = np.where(observed, values, 0.0) @ onehot
+    with np.errstate(divide='ignore', invalid='ignore'):
+        flows = np.where(counts > 0, flows * (m / counts if partial == 'scale' else 1.0), np.nan)
+        if partial == 'drop':
+            flows = np.where(counts == m, flows, np.nan)
+
+    # Last observed value in each year: the latest column with data among that year's columns
+    order = np.where(observed, np.arange(len(labels))[None, :], -1)
+    last_col = np.stack([np.where(year_idx == y, order, -1).max(axis=1) for y in range(len(unique_years))], axis=1)
+    stocks = np.where(last_col >= 0, np.take_along_axis(values, np.maximum(last_col, 0), axis=1), np.nan)
+    if partial == 'drop':
+        stocks = np.where(counts == m, stocks, np.nan)
+
+    items = data['Line Item'].cat
+    stock_rows = np.array([is_stock(item) for item in items.categories], dtype=bool)[items.codes]
+    annual = np.where(stock_rows[:, None], stocks, flows)
+
+    result = pd.DataFrame(annual, columns=[str(y) for y in unique_years])
+    result.insert(0, 'Line Item', data['Line Item'].to_numpy())
+    result.attrs = dict(data.attrs, frequency='A')
+    return compact_frame(result, str(data.dtypes.iloc[1]))
@@ -0,0 +1,346 @@
+"""
+Three-Statement Projection Module
+Estimates operating drivers (growth, cost ratios, working capital intensity, tax and
+interest rates, capex and depreciation, payout) from a parsed company's history and
+projects a linked P&L, balance sheet and cash flow statement N years ahead.
+
+Cash is the balancing item: every other balance is driven, the cash flow statement
+is derived from their changes, and closing cash = opening cash + net cash flow, so the
+balance sheet balances by construction. The core is pure array arithmetic over
+(companies x scenarios), looping only over projection years.
+"""
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional, Tuple
+
+from src.backend.mcp.frames import LineItemIndex, compact_frame
+
+# Historical years averaged when estimating ratio drivers
+LOOKBACK_YEARS = 3
+
+DRIVERS = (
+    'revenue_growth',   # Compound annual revenue growth
+    'cogs_pct',         # Cost of sales / revenue
+    'opex_pct',         # Operating costs (gross profit - operating profit) / revenue
+    'interest_rate',    # Finance costs / total borrowings
+    'tax_rate',         # Tax expense / profit before tax
+    'receivables_pct',  # Receivables / revenue
+    'inventory_pct',    # Inventory / cost of sales
+    'payables_pct',     # Payables / cost of sales
+    'tax_payable_pct',  # Current tax payable / tax expense
+    'capex_pct',        # Capital expenditure / revenue
+    'depreciation_rate',  # Depreciation / opening PPE
+    'payout_ratio',     # Share of net income distributed
+)
+
+OPENING_ITEMS = (
+    'revenue', 'cash', 'receivables', 'inventory', 'ppe', 'intangibles', 'payables',
+    'tax_payable', 'short_term_debt', 'long_term_debt', 'share_capital', 'retained_earnings',
+)
+
+# Line items reported per projected year, in statement order
+PROJECTED_ITEMS = {
+    'income_statement': ['revenue', 'cogs', 'gross_profit', 'opex', 'operating_profit', 'interest',
+                         'profit_before_tax', 'tax', 'net_income'],
+    'balance_sheet': ['cash', 'receivables', 'inventory', 'ppe', 'intangibles', 'total_assets',
+                      'payables', 'tax_payable', 'short_term_debt', 'long_term_debt', 'total_liabilities',
+                      'share_capital', 'retained_earnings', 'total_equity', 'balance_check'],
+    'cash_flow': ['operating_cash_flow', 'investing_cash_flow', 'financing_cash_flow', 'net_cash_flow'],
+}
+
+# Additive driver shocks applied on top of the estimated drivers
+DEFAULT_SCENARIOS = {
+    'Base': {},
+    'Downside': {'revenue_growth': -0.10, 'cogs_pct': 0.03, 'interest_rate': 0.02},
+    'Upside': {'revenue_growth': 0.05, 'cogs_pct': -0.02},
+}
+
+
+class ProjectionEngine:
+    """Extracts a company's history and estimates projection drivers and opening balances"""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Initialize with consolidated financial data
+        Args:
+            df: DataFrame with 'Line Item' as first column, then years as columns
+        """
+        self.df = compact_frame(df)
+        self.line_items = LineItemIndex(self.df)
+        self.warnings = []
+
+    def _get_series(self, keywords: list) -> Optional[pd.Series]:
+        """Safely retrieve financial line item by keywords"""
+        for key in keywords:
+            pos = self.line_items.first(key)
+            if pos is not None:
+                numeric_data = self.df.iloc[pos, 1:]
+                if numeric_data.notna().sum() > 0:
+                    return numeric_data
+        return None
+
+    def history(self) -> pd.DataFrame:
+        """
+        Driver inputs by year (rows) with costs as positive amounts.
+        Missing items are zero; revenue is required.
+        """
+        self.warnings = []
+
+        def get(keywords):
+            series = self._get_series(keywords)
+            return series.abs() if series is not None else None
+
+        items = {
+            'revenue': self._get_series(['Total Revenue', 'Revenue', 'Sales', 'Turnover']),
+            'cogs': get(['Cost of Sales', 'Cost of Goods Sold', 'COGS']),
+            'gross_profit': self._get_series(['Gross Profit']),
+            'operating_profit': self._get_series(['Operating Profit', 'Operating Income', 'EBIT']),
+            'interest': get(['Finance Costs', 'Interest Expense']),
+            'profit_before_tax': self._get_series(['Profit Before Tax', 'PBT', 'Earnings Before Tax']),
+            'tax': get(['Income Tax Expense', 'Tax Expense']),
+            'net_income': self._get_series(['Net Income', 'Profit for the Year', 'Net Profit', 'Profit After Tax']),
+            'cash': self._get_series(['Cash and Cash Equivalents', 'Cash']),
+            'receivables': self._get_series(['Trade and other receivables', 'Receivables']),
+            'inventory': self._get_series(['Inventories', 'Inventory', 'Stock']),
+            'ppe': self._get_series(['Property, plant and equipment', 'PPE', 'Fixed Assets']),
+            'intangibles': self._get_series(['Intangible']),
+            'payables': self._get_series(['Trade and other payables', 'Payables']),
+            'tax_payable': self._get_series(['Current tax payable', 'Tax payable']),
+            'short_term_debt': self._get_series(['Short-term borrowings', 'Short-term Debt', 'Overdraft']),
+            'long_term_debt': self._get_series(['Long-term Debt', 'Long-term Borrowings', 'Borrowings']),
+            'share_capital': self._get_series(['Share capital']),
+            'retained_earnings': self._get_series(['Retained earnings']),
+            'capex': get(['Purchase of assets', 'Purchase of property', 'Capital expenditure', 'Capex']),
+            'depreciation': get(['Depreciation']),
+        }
+
+        # Reported revenue rows are sometimes mis-mapped (e.g. 'Cost of Sales' matches 'sales'):
+        # fall back to the gross profit identity when the reported figure is not usable
+        revenue, cogs, gross_profit = items['revenue'], items['cogs'], items['gross_profit']
+        if gross_profit is None and revenue is not None and cogs is not None:
+            items['gross_profit'] = revenue - cogs
+        elif gross_profit is not None and cogs is not None:
+            derived = gross_profit + cogs
+            if revenue is None or (revenue <= 0).any() or not np.allclose(revenue, derived, rtol=0.01):
+                self.warnings.append("Revenue derived as Gross Profit + Cost of Sales.")
+                items['revenue'] = derived
+
+        if items['revenue'] is None:
+            raise ValueError("Revenue not found: cannot project statements.")
+
+        missing = [name for name, series in items.items() if series is None]
+        if missing:
+            self.warnings.append(f"Not found (assumed zero): {', '.join(missing)}")
+
+        years = items['revenue'].index
+        return pd.DataFrame({name: (series.reindex(years) if series is not None else 0.0)
+                             for name, series in items.items()}).astype(float).fillna(0.0)
+
+    def estimate_drivers(self, hist: Optional[pd.DataFrame] = None, lookback: int = LOOKBACK_YEARS) -> Dict[str, float]:
+        """Driver values: ratios averaged over the last `lookback` years, growth as CAGR"""
+        hist = self.history() if hist is None else hist
+        recent = hist.iloc[-lookback:]
+
+        def ratio(num, den):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = (recent[num] / recent[den]).replace([np.inf, -np.inf], np.nan)
+            return float(values.mean()) if values.notna().any() else 0.0
+
+        revenue = hist['revenue']
+        n_years = len(revenue) - 1
+        growth = (revenue.iloc[-1] / revenue.iloc[0]) ** (1 / n_years) - 1 if n_years > 0 and revenue.iloc[0] > 0 else 0.0
+
+        opex = hist['gross_profit'] - hist['operating_profit']
+        borrowings = hist['short_term_debt'] + hist['long_term_debt']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            opex_pct = float((opex / hist['revenue']).iloc[-lookback:].mean())
+            interest_rate = (hist['interest'] / borrowings).iloc[-lookback:].replace([np.inf, -np.inf], np.nan)
+            retained = hist['retained_earnings'].diff() / hist['net_income']
+            payout = (1 - retained).iloc[-lookback:].replace([np.inf, -np.inf], np.nan)
+            # Applied to opening PPE in the projection, so estimated against the prior year's PPE
+            depreciation_rate = ((hist['depreciation'] / hist['ppe'].shift(1)).iloc[-lookback:]
+                                 .replace([np.inf, -np.inf], np.nan))
+
+        return {
+            'revenue_growth': float(growth),
+            'cogs_pct': ratio('cogs', 'revenue'),
+            'opex_pct': opex_pct if np.isfinite(opex_pct) else 0.0,
+            'interest_rate': float(interest_rate.mean()) if interest_rate.notna().any() else 0.0,
+            'tax_rate': ratio('tax', 'profit_before_tax'),
+            'receivables_pct': ratio('receivables', 'revenue'),
+            'inventory_pct': ratio('inventory', 'cogs'),
+            'payables_pct': ratio('payables', 'cogs'),
+            'tax_payable_pct': ratio('tax_payable', 'tax'),
+            'capex_pct': ratio('capex', 'revenue'),
+            'depreciation_rate': (float(depreciation_rate.mean()) if depreciation_rate.notna().any()
+                                  else ratio('depreciation', 'ppe')),
+            'payout_ratio': float(np.clip(payout.mean(), 0.0, 1.0)) if payout.notna().any() else 0.0,
+        }
+
+    def opening_balances(self, hist: Optional[pd.DataFrame] = None) -> Dict[str, float]:
+        """Last reported year's balances (the projection's opening position)"""
+        hist = self.history() if hist is None else hist
+        return {item: float(hist[item].iloc[-1]) for item in OPENING_ITEMS}
+
+
+def _stack(values: List[Dict[str, float]], keys) -> Dict[str, np.ndarray]:
+    return {key: np.array([v[key] for v in values], dtype=float) for key in keys}
+
+
+def project_statements(drivers: Dict[str, np.ndarray], opening: Dict[str, np.ndarray], years: int) -> Dict[str, np.ndarray]:
+    """
+    Projects linked statements for every (company, scenario) at once
+
+    Args:
+        drivers: DRIVERS -> arrays broadcastable to a common shape, e.g. (C, S)
+        opening: OPENING_ITEMS -> arrays broadcastable to the same shape, e.g. (C, 1)
+        years: Projection horizon
+
+    Returns:
+        dict: PROJECTED_ITEMS -> arrays of shape (..., years)
+    """
+    shape = np.broadcast_shapes(*(np.shape(v) for v in list(drivers.values()) + list(opening.values())))
+    d = {k: np.broadcast_to(np.asarray(v, dtype=float), shape) for k, v in drivers.items()}
+    prev = {k: np.broadcast_to(np.asarray(v, dtype=float), shape) for k, v in opening.items()}
+
+    # Items outside the model (other assets less other liabilities) stay at their opening level
+    other_net = (prev['short_term_debt'] + prev['long_term_debt'] + prev['payables'] + prev['tax_payable']
+                 + prev['share_capital'] + prev['retained_earnings']
+                 - (prev['cash'] + prev['receivables'] + prev['inventory'] + prev['ppe'] + prev['intangibles']))
+
+    out = {item: np.empty(shape + (years,)) for items in PROJECTED_ITEMS.values() for item in items}
+    for t in range(years):
+        # Income statement
+        revenue = prev['revenue'] * (1 + d['revenue_growth'])
+        cogs = d['cogs_pct'] * revenue
+        gross_profit = revenue - cogs
+        opex = d['opex_pct'] * revenue
+        operating_profit = gross_profit - opex
+        interest = d['interest_rate'] * (prev['short_term_debt'] + prev['long_term_debt'])
+        profit_before_tax = operating_profit - interest
+        tax = d['tax_rate'] * np.maximum(profit_before_tax, 0.0)
+        net_income = profit_before_tax - tax
+
+        # Driven balances (borrowings and share capital held flat)
+        receivables = d['receivables_pct'] * revenue
+        inventory = d['inventory_pct'] * cogs
+        payables = d['payables_pct'] * cogs
+        tax_payable = d['tax_payable_pct'] * tax
+        capex = d['capex_pct'] * revenue
+        depreciation = d['depreciation_rate'] * prev['ppe']
+        ppe = prev['ppe'] + capex - depreciation
+        dividends = d['payout_ratio'] * np.maximum(net_income, 0.0)
+        retained_earnings = prev['retained_earnings'] + net_income - dividends
+
+        # Cash flow statement (indirect method) and the cash plug
+        working_capital = ((receivables - prev['receivables']) + (inventory - prev['inventory'])
+                           - (payables - prev['payables']) - (tax_payable - prev['tax_payable']))
+        operating_cash_flow = net_income + depreciation - working_capital
+        investing_cash_flow = -capex
+        financing_cash_flow = -dividends
+        net_cash_flow = operating_cash_flow + investing_cash_flow + financing_cash_flow
+        cash = prev['cash'] + net_cash_flow
+
+        total_assets = cash + receivables + inventory + ppe + prev['intangibles']
+        total_liabilities = payables + tax_payable + prev['short_term_debt'] + prev['long_term_debt']
+        total_equity = prev['share_capital'] + retained_earnings
+
+        current = dict(revenue=revenue, cogs=cogs, gross_profit=gross_profit, opex=opex,
+                       operating_profit=operating_profit, interest=interest, profit_before_tax=profit_before_tax,
+                       tax=tax, net_income=net_income, cash=cash, receivables=receivables, inventory=inventory,
+                       ppe=ppe, intangibles=prev['intangibles'], total_assets=total_assets, payables=payables,
+                       tax_payable=tax_payable, short_term_debt=prev['short_term_debt'],
+                       long_term_debt=prev['long_term_debt'], total_liabilities=total_liabilities,
+                       share_capital=prev['share_capital'], retained_earnings=retained_earnings,
+                       total_equity=total_equity,
+                       balance_check=total_assets - total_liabilities - total_equity + other_net,
+                       operating_cash_flow=operating_cash_flow, investing_cash_flow=investing_cash_flow,
+                       financing_cash_flow=financing_cash_flow, net_cash_flow=net_cash_flow)
+        for item, value in current.items():
+            out[item][..., t] = value
+        prev = {**prev, **{k: current[k] for k in OPENING_ITEMS}}
+
+    return out
+
+
+def project_companies(frames: List[pd.DataFrame], years: int = 3,
+                      scenarios: Optional[Dict[str, Dict[str, float]]] = None) -> Tuple[Dict[str, np.ndarray], List[ProjectionEngine]]:
+    """
+    Estimates drivers for each company and projects all companies x scenarios in one pass
+
+    Args:
+        frames: One consolidated DataFrame per company
+        years: Projection horizon
+        scenarios: Scenario name -> additive driver shocks (default DEFAULT_SCENARIOS)
+
+    Returns:
+        tuple: (PROJECTED_ITEMS -> (companies, scenarios, years) arrays, engines in company order)
+    """
+    scenarios = DEFAULT_SCENARIOS if scenarios is None else scenarios
+    engines = [ProjectionEngine(df) for df in frames]
+    histories = [engine.history() for engine in engines]
+
+    base = _stack([e.estimate_drivers(h) for e, h in zip(engines, histories)], DRIVERS)
+    shocks = {k: np.array([s.get(k, 0.0) for s in scenarios.values()]) for k in DRIVERS}
+    drivers = {k: base[k][:, None] + shocks[k][None, :] for k in DRIVERS}
+    opening = {k: v[:, None] for k, v in _stack([e.opening_balances(h) for e, h in zip(engines, histories)],
+                                                OPENING_ITEMS).items()}
+
+    return project_statements(drivers, opening, years), engines
+
+
+def format_projection(projected: Dict[str, np.ndarray], drivers: Dict[str, float], scenario_names: List[str],
+                      last_year, company: int = 0) -> str:
+    """Markdown report for one company: drivers, then key lines per scenario"""
+    years = projected['revenue'].shape[-1]
+    try:
+        labels = [str(int(last_year) + i) for i in range(1, years + 1)]
+    except (TypeError, ValueError):
+        labels = [f"t+{i}" for i in range(1, years + 1)]
+
+    report = "### 🧮 Three-Statement Projection (driver-based)\n\n**Estimated Drivers**\n"
+    report += " | ".join(f"{k.replace('_', ' ')}: {v:.1%}" for k, v in drivers.items()) + "\n\n"
+
+    key_lines = [('Revenue', 'revenue'), ('Operating Profit', 'operating_profit'), ('Net Income', 'net_income'),
+                 ('Operating Cash Flow', 'operating_cash_flow'), ('Cash', 'cash'),
+                 ('Total Assets', 'total_assets'), ('Total Equity', 'total_equity')]
+    for s, name in enumerate(scenario_names):
+        report += f"**Scenario: {name}**\n\n| Line Item | " + " | ".join(labels) + " |\n"
+        report += "|---|" + "---|" * years + "\n"
+        for label, item in key_lines:
+            report += f"| {label} | " + " | ".join(f"{v:,.0f}" for v in projected[item][company, s]) + " |\n"
+        report += "\n"
+
+    imbalance = np.abs(projected['balance_check'][company]).max()
+    report += f"Balance sheet check (assets - liabilities - equity): max |difference| {imbalance:,.2f}\n"
+    return report
+
+
+def project_financial_statements(data: pd.DataFrame, years: int = 3,
+                                 scenarios: Optional[Dict[str, Dict[str, float]]] = None) -> Tuple[str, str]:
+    """
+    Main MCP Tool: Driver-based Three-Statement Projection
+
+    Args:
+        data: Consolidated financial DataFrame
+        years: Projection horizon
+        scenarios: Scenario name -> additive driver shocks (default DEFAULT_SCENARIOS)
+
+    Returns:
+        tuple: (report_text, status_message)
+    """
+    if data is None or data.empty:
+        return "", "No data available for projection."
+
+    try:
+        scenarios = DEFAULT_SCENARIOS if scenarios is None else scenarios
+        projected, engines = project_companies([data], years, scenarios)
+        engine = engines[0]
+        hist = engine.history()
+        report = format_projection(projected, engine.estimate_drivers(hist), list(scenarios), hist.index[-1])
+        for warning in engine.warnings:
+            report += f"⚠️ {warning}\n"
+        return report, "✅ Three-statement projection complete."
+
+    except Exception as e:
+        return "", f"❌ Error in projection: {str(e)}"
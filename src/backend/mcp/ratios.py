@@ -1,5 +1,7 @@
 import pandas as pd
 
+from src.backend.mcp.frames import LineItemIndex
+
 def calculate_ratios(df):
     """
     Calculates key financial ratios from the consolidated DataFrame.
@@ -10,13 +12,15 @@ def calculate_ratios(df):
 
     # 1. Standardize Data Access
     # We create a helper to find values safely by keyword
+    line_items = LineItemIndex(df)
+
     def get_series(keywords):
         for key in keywords:
-            # Case-insensitive search in the 'Line Item' column
-            match = df[df['Line Item'].astype(str).str.lower().str.contains(key.lower(), na=False)]
-            if not match.empty:
+            # Case-insensitive search in the 'Line Item' column and its aliases
+            pos = line_items.first(key)
+            if pos is not None:
                 # Return the numeric columns (Years)
-                return match.iloc[0, 1:].astype(float)
+                return df.iloc[pos, 1:].astype(float)
         return None
 
     # 2. Define Ratio Components (Mapping to Samani/IAS Standards)
@@ -0,0 +1,217 @@
+"""
+Forecast Reconciliation Module
+Makes independently forecast line items add up. Statement identities over the
+canonical items produced by normalize_row_name (Gross Profit = Revenue - COGS,
+Total Assets = Current Assets + Non-Current Assets, ...) are written as a constraint
+matrix C with C y = 0 for coherent values, and base forecasts are projected onto that
+subspace in one batched linear-algebra step for every entity and horizon:
+
+    y_rec = y - W C' (C W C')^+ C y
+
+W (per entity, diagonal) decides which items absorb the adjustment:
+    ols       - identity: every item moves equally
+    mint_diag - one-step residual variances (MinT with a diagonal covariance):
+                items that forecast poorly move most
+    bottom_up - aggregates only: subtotals are recomputed from their components
+"""
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from src.backend.mcp.batch_forecasting import fit_damped_holt
+from src.backend.mcp.forecasting import _horizon_labels
+from src.backend.mcp.frames import compact_frame
+
+# (aggregate, [(component, coefficient), ...]); costs enter as positive magnitudes
+IDENTITIES = [
+    ('Gross Profit', [('Revenue', 1), ('COGS', -1)]),
+    ('Operating Profit', [('Gross Profit', 1), ('Operating Expenses', -1)]),
+    ('Current Assets', [('Cash', 1), ('Receivables', 1), ('Inventory', 1)]),
+    ('Non-Current Assets', [('PPE', 1), ('Intangible Assets', 1)]),
+    ('Total Assets', [('Current Assets', 1), ('Non-Current Assets', 1)]),
+    ('Current Liabilities', [('Payables', 1), ('Short-term Debt', 1)]),
+    ('Non-Current Liabilities', [('Long-term Debt', 1)]),
+    ('Total Liabilities', [('Current Liabilities', 1), ('Non-Current Liabilities', 1)]),
+    ('Total Assets', [('Total Liabilities', 1), ('Total Equity', 1)]),
+    ('Net Cash Flow', [('Operating Cash Flow', 1), ('Investing Cash Flow', 1), ('Financing Cash Flow', 1)]),
+]
+
+# Expense items that filings report as either positive or negative amounts
+COST_ITEMS = {'COGS', 'Operating Expenses', 'Depreciation', 'Interest Expense', 'Tax Expense'}
+
+METHODS = ('mint_diag', 'ols', 'bottom_up')
+HISTORY_TOLERANCE = 0.01  # Identity kept only if history satisfies it to within 1% of the aggregate
+
+
+def canonical_history(data: pd.DataFrame, items: Sequence[str]) -> pd.DataFrame:
+    """Canonical item rows (label exactly the normalize_row_name output) as items x periods"""
+    rows = compact_frame(data).drop_duplicates('Line Item').set_index('Line Item')
+    present = [item for item in items if item in rows.index]
+    return rows.loc[present]
+
+
+def constraint_matrix(items: List[str], history: np.ndarray,
+                      identities=IDENTITIES, tolerance: float = HISTORY_TOLERANCE) -> Tuple[np.ndarray, List[str]]:
+    """
+    Constraint rows for the identities whose items are all available and which every
+    entity's (sign-normalized) history satisfies; mis-mapped or partial line items fail
+    the check instead of distorting the forecasts
+
+    Args:
+        items: Item names (columns of C)
+        history: (E, K, T) sign-normalized history
+
+    Returns:
+        tuple: ((R, K) constraint matrix, descriptions of the identities used)
+    """
+    index = {item: k for k, item in enumerate(items)}
+    rows, used = [], []
+    for aggregate, components in identities:
+        if aggregate not in index or any(c not in index for c, _ in components):
+            continue
+        row = np.zeros(len(items))
+        row[index[aggregate]] = 1.0
+        for component, coefficient in components:
+            row[index[component]] -= coefficient
+        residual = np.abs(np.einsum('k,ekt->et', row, history))
+        scale = np.abs(history[:, index[aggregate]]).mean(axis=1, keepdims=True)
+        if np.all(residual.mean(axis=1, keepdims=True) <= tolerance * np.maximum(scale, 1e-12)):
+            rows.append(row)
+            used.append(f"{aggregate} = " + " ".join(
+                f"{'+' if coefficient > 0 else '-'} {component}" for component, coefficient in components).lstrip('+ '))
+    return (np.array(rows) if rows else np.zeros((0, len(items)))), used
+
+
+def reconcile(forecasts: np.ndarray, C: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """
+    Projects base forecasts onto the coherent subspace C y = 0
+
+    Args:
+        forecasts: (E, K, H) base forecasts
+        C: (R, K) constraint matrix
+        weights: (E, K) diagonal of W per entity
+
+    Returns:
+        (E, K, H) reconciled forecasts
+    """
+    if len(C) == 0:
+        return forecasts.copy()
+    gram = np.einsum('rk,ek,sk->ers', C, weights, C)           # C W C'
+    incoherence = np.einsum('rk,ekh->erh', C, forecasts)        # C y
+    multipliers = np.linalg.pinv(gram) @ incoherence            # (C W C')^+ C y
+    return forecasts - np.einsum('ek,rk,erh->ekh', weights, C, multipliers)
+
+
+def _weights(method: str, items: List[str], C: np.ndarray, variances: np.ndarray) -> np.ndarray:
+    if method == 'ols':
+        return np.ones_like(variances)
+    if method == 'mint_diag':
+        return np.maximum(variances, 1e-12 * variances.max(initial=1.0))
+    if method == 'bottom_up':
+        aggregates = (C == 1).any(axis=0) & np.array([any(a == item for a, _ in IDENTITIES) for item in items])
+        return np.broadcast_to(aggregates.astype(float), variances.shape).copy()
+    raise ValueError(f"Unknown reconciliation method '{method}' (use one of {METHODS}).")
+
+
+def coherent_forecasts(frames: List[pd.DataFrame], steps: int = 3, method: str = 'mint_diag',
+                       items: Optional[Sequence[str]] = None) -> Dict[str, object]:
+    """
+    Forecasts every canonical item of every entity (one batch damped Holt fit) and
+    reconciles them jointly
+
+    Args:
+        frames: One consolidated DataFrame per entity (same number of periods)
+        steps: Forecast horizon
+        method: 'mint_diag', 'ols' or 'bottom_up'
+        items: Canonical items to consider (default: every item in IDENTITIES)
+
+    Returns:
+        dict: items, identities, base and reconciled (E, K, H) arrays, incoherence
+              before/after (max |C y| per entity), period labels
+    """
+    if items is None:
+        items = list(dict.fromkeys([a for a, _ in IDENTITIES] + [c for _, cs in IDENTITIES for c, _ in cs]))
+    histories = [canonical_history(df, items) for df in frames]
+
+    # Items with a complete history in every entity, over the common trailing periods
+    n_periods = min(h.shape[1] for h in histories)
+    histories = [h.iloc[:, -n_periods:] for h in histories]
+    common = [item for item in items if all(item in h.index and h.loc[item].notna().all() for h in histories)]
+    if not common:
+        raise ValueError("No canonical line items with a complete history to reconcile.")
+    X = np.stack([h.loc[common].to_numpy(dtype=float) for h in histories])   # (E, K, T)
+
+    # Costs as positive magnitudes, whatever sign the filing used
+    signs = np.where(np.isin(common, list(COST_ITEMS))[None, :] & (np.median(X, axis=2) < 0), -1.0, 1.0)
+    X = X * signs[..., None]
+
+    C, identities = constraint_matrix(common, X)
+    fit = fit_damped_holt(X.reshape(-1, n_periods))
+    base = fit.forecast(steps).reshape(len(frames), len(common), steps)
+    variances = np.mean(fit.residuals ** 2, axis=1).reshape(len(frames), len(common))
+
+    reconciled = reconcile(base, C, _weights(method, common, C, variances))
+
+    def incoherence(Y):
+        return np.abs(np.einsum('rk,ekh->erh', C, Y)).max(axis=(1, 2)) if len(C) else np.zeros(len(frames))
+
+    return {
+        'items': common,
+        'identities': identities,
+        'base': base * signs[..., None],
+        'reconciled': reconciled * signs[..., None],
+        'incoherence_before': incoherence(base),
+        'incoherence_after': incoherence(reconciled),
+        'periods': _horizon_labels(list(histories[0].columns), steps),
+    }
+
+
+def reconciled_forecast(data: Union[pd.DataFrame, List[pd.DataFrame]], steps: int = 3,
+                        method: str = 'mint_diag') -> Tuple[Optional[pd.DataFrame], str]:
+    """
+    MCP Tool: Coherent forecasts of the canonical statement items
+
+    Returns:
+        tuple: (DataFrame indexed by item with base and reconciled columns per period
+                for the first entity, status message)
+    """
+    frames = data if isinstance(data, list) else [data]
+    if not frames or any(df is None or df.empty for df in frames):
+        return None, "No data available for reconciled forecasting."
+
+    try:
+        result = coherent_forecasts(frames, steps, method)
+    except ValueError as e:
+        return None, str(e)
+
+    columns = {}
+    for h, period in enumerate(result['periods']):
+        columns[f"{period} base"] = result['base'][0, :, h]
+        columns[f"{period} reconciled"] = result['reconciled'][0, :, h]
+    table = pd.DataFrame(columns, index=pd.Index(result['items'], name='Line Item'))
+    table.attrs['identities'] = result['identities']
+
+    msg = (f"Reconciled {len(result['items'])} items across {len(frames)} entit{'y' if len(frames) == 1 else 'ies'} "
+           f"with {len(result['identities'])} identities ({method}); max incoherence "
+           f"{result['incoherence_before'].max():,.0f} -> {result['incoherence_after'].max():,.2g}.")
+    return table, msg
+
+
+def format_reconciled_table(table: pd.DataFrame, title: str = "Reconciled Forecast") -> str:
+    """Markdown report for a reconciled_forecast table"""
+    periods = [c[:-len(' reconciled')] for c in table.columns if c.endswith(' reconciled')]
+
+    report = f"### 🧩 {title}\n\n"
+    identities = table.attrs.get('identities', [])
+    report += "**Identities enforced:** " + ("; ".join(identities) if identities else
+                                             "none (no identity holds in the reported history)") + "\n\n"
+    report += "| Line Item | " + " | ".join(periods) + " |\n"
+    report += "|---|" + "---|" * len(periods) + "\n"
+    for item, row in table.iterrows():
+        cells = []
+        for period in periods:
+            base, rec = row[f"{period} base"], row[f"{period} reconciled"]
+            cells.append(f"{rec:,.0f}" + (f" (base {base:,.0f})" if abs(rec - base) > 0.5 else ""))
+        report += f"| {item} | " + " | ".join(cells) + " |\n"
+
+    return report
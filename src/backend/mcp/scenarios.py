@@ -0,0 +1,246 @@
+"""
+Scenario & Sensitivity Analysis Module
+Applies relative shocks to the base-year line items behind the advanced ratio set,
+propagates them through the P&L, and recomputes every ratio for thousands of
+scenarios at once (items are arrays with one value per scenario).
+
+Propagation (one period, shocks as relative changes to magnitudes, so costs reported
+as negative numbers still move profit the right way):
+    Cost of sales is variable (moves with revenue, plus its own shock); operating
+    expenses, depreciation and finance costs are fixed unless shocked. The change in
+    profit before tax is taxed at the base effective rate, and the resulting change in
+    net income is retained as cash (cash, current assets, total assets, equity).
+"""
+import re
+import itertools
+import pandas as pd
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+from src.backend.mcp.advanced_ratios import AdvancedRatioAnalyzer, compute_ratios
+
+# Default 1-sigma relative shock per factor for Monte Carlo sampling
+DEFAULT_VOLATILITY = {
+    'revenue': 0.10,
+    'cogs': 0.05,
+    'operating_expenses': 0.08,
+    'interest_expense': 0.20,
+}
+DEFAULT_SCENARIOS = 5000
+TORNADO_Z = 1.645  # Tornado bars span the central 90% of each factor's shock
+KEY_RATIOS = ['Return on Equity (%)', 'Interest Coverage Ratio', 'Net Profit Margin (%)',
+              'Operating Profit Margin (%)', 'Return on Assets (%)', 'Current Ratio', 'Debt-to-Equity Ratio']
+
+# Query phrases naming a shockable factor
+SHOCK_TERMS = {
+    'revenue': ['revenue', 'sales', 'turnover'],
+    'cogs': ['cost of sales', 'cost of goods', 'cogs'],
+    'operating_expenses': ['operating expenses', 'operating costs', 'opex', 'overheads'],
+    'depreciation': ['depreciation'],
+    'interest_expense': ['finance costs', 'finance cost', 'interest', 'borrowing costs'],
+}
+_DOWN = ('fall', 'drop', 'decline', 'decrease', 'down', 'lower', 'cut', 'shrink')
+_UP = ('rise', 'increase', 'up', 'higher', 'grow', 'climb', 'jump')
+_CHANGE = re.compile(r'\b(' + '|'.join(_DOWN + _UP) + r')\w*\s+(?:by\s+)?(\d+(?:\.\d+)?)\s*%')
+
+
+def base_items(data: pd.DataFrame) -> Dict[str, float]:
+    """Latest reported value of every ratio input found in the data"""
+    items = AdvancedRatioAnalyzer(data).extract_items()
+    base = {}
+    for name, series in items.items():
+        if series is not None and series.notna().any():
+            base[name] = float(series.dropna().iloc[-1])
+    return base
+
+
+def parse_shocks(query: str) -> Dict[str, float]:
+    """
+    Relative shocks stated in a query, e.g.
+    "revenue falls 10% and finance costs rise 20%" -> {'revenue': -0.1, 'interest_expense': 0.2}
+    """
+    shocks = {}
+    for clause in re.split(r',|;|\band\b|\bwhile\b|\bwith\b', query.lower()):
+        change = _CHANGE.search(clause)
+        if not change:
+            continue
+        # The factor is the phrase closest before the verb ("cost of sales" beats "sales")
+        mentions = [(pos + len(term), len(term), factor)
+                    for factor, phrases in SHOCK_TERMS.items() for term in phrases
+                    for pos in [clause.rfind(term, 0, change.start())] if pos >= 0]
+        if not mentions:
+            continue
+        factor = max(mentions)[2]
+        sign = -1.0 if change.group(1).startswith(_DOWN) else 1.0
+        shocks[factor] = sign * float(change.group(2)) / 100
+    return shocks
+
+
+def apply_shocks(base: Dict[str, float], shocks: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Shocked line items for every scenario
+
+    Args:
+        base: Base line items (base_items)
+        shocks: Item -> relative shock per scenario (arrays of equal length S)
+
+    Returns:
+        dict: Item -> (S,) array
+    """
+    n_scenarios = len(next(iter(shocks.values()))) if shocks else 1
+    zero = np.zeros(n_scenarios)
+    shock = {k: np.asarray(v, dtype=float) for k, v in shocks.items()}
+    items = {k: np.full(n_scenarios, v) for k, v in base.items()}
+
+    def magnitude(name):
+        return abs(base.get(name, 0.0))
+
+    # Other shocked items (balance sheet etc.) scale directly
+    for name, s in shock.items():
+        if name in items:
+            items[name] = items[name] * (1 + s)
+
+    s_revenue = shock.get('revenue', zero)
+    d_revenue = magnitude('revenue') * s_revenue
+    d_cogs = magnitude('cogs') * ((1 + s_revenue) * (1 + shock.get('cogs', zero)) - 1)
+    d_opex = magnitude('operating_expenses') * shock.get('operating_expenses', zero)
+    d_depreciation = magnitude('depreciation') * shock.get('depreciation', zero)
+    d_interest = magnitude('interest_expense') * shock.get('interest_expense', zero)
+
+    if 'cogs' in items:
+        items['cogs'] = base['cogs'] + np.sign(base['cogs']) * d_cogs
+
+    d_gross = d_revenue - d_cogs
+    d_operating = d_gross - d_opex - d_depreciation
+    d_pre_tax = d_operating - d_interest
+
+    net_income = base.get('net_income')
+    tax = magnitude('tax_expense')
+    tax_rate = tax / (net_income + tax) if net_income is not None and net_income + tax > 0 else 0.0
+    d_net = d_pre_tax * (1 - tax_rate)
+
+    for name, delta in (('gross_profit', d_gross), ('operating_profit', d_operating),
+                        ('ebitda', d_gross - d_opex), ('net_income', d_net),
+                        ('cash', d_net), ('current_assets', d_net), ('total_assets', d_net),
+                        ('total_equity', d_net)):
+        if name in items:
+            items[name] = items[name] + delta
+    if 'tax_expense' in items:
+        items['tax_expense'] = items['tax_expense'] + np.sign(base['tax_expense'] or 1.0) * d_pre_tax * tax_rate
+
+    return items
+
+
+def scenario_ratios(base: Dict[str, float], shocks: Dict[str, np.ndarray]) -> pd.DataFrame:
+    """Ratio set for every scenario (rows) in one vectorized pass"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratios = compute_ratios(apply_shocks(base, shocks))
+    return pd.DataFrame(ratios)
+
+
+def scenario_grid(levels: Dict[str, Sequence[float]]) -> Dict[str, np.ndarray]:
+    """Every combination of the given shock levels, e.g. {'revenue': [-0.1, 0, 0.1], ...}"""
+    names = list(levels)
+    combos = np.array(list(itertools.product(*(levels[n] for n in names))), dtype=float)
+    return {name: combos[:, i] for i, name in enumerate(names)}
+
+
+def sample_scenarios(center: Dict[str, float], volatility: Dict[str, float], n: int = DEFAULT_SCENARIOS,
+                     seed: Optional[int] = 0) -> Dict[str, np.ndarray]:
+    """Normal relative shocks around `center`, floored at -95% so no item changes sign"""
+    rng = np.random.default_rng(seed)
+    factors = sorted(set(center) | set(volatility))
+    draws = rng.standard_normal((n, len(factors)))
+    return {f: np.maximum(center.get(f, 0.0) + volatility.get(f, 0.0) * draws[:, i], -0.95)
+            for i, f in enumerate(factors)}
+
+
+def summarize(ratios: pd.DataFrame, base_ratios: pd.Series, scenario: pd.Series) -> pd.DataFrame:
+    """Distribution summary per ratio: base, stated scenario, mean, std and 5/50/95th percentiles"""
+    values = ratios.replace([np.inf, -np.inf], np.nan)
+    summary = pd.DataFrame({
+        'base': base_ratios,
+        'scenario': scenario,
+        'mean': values.mean(),
+        'std': values.std(),
+        'p5': values.quantile(0.05),
+        'p50': values.quantile(0.50),
+        'p95': values.quantile(0.95),
+    })
+    return summary
+
+
+def tornado(base: Dict[str, float], center: Dict[str, float], volatility: Dict[str, float],
+            target: str, z: float = TORNADO_Z) -> pd.DataFrame:
+    """
+    One-at-a-time sensitivity of `target`: each factor moved to center -/+ z * sigma with the
+    others held at center, all 2F scenarios computed together. Sorted by swing.
+    """
+    factors = [f for f in volatility if volatility[f] > 0]
+    shocks = {f: np.full(2 * len(factors), center.get(f, 0.0)) for f in set(factors) | set(center)}
+    for i, f in enumerate(factors):
+        shocks[f][2 * i] -= z * volatility[f]
+        shocks[f][2 * i + 1] += z * volatility[f]
+
+    values = scenario_ratios(base, shocks)[target].to_numpy()
+    table = pd.DataFrame({'low_shock': [center.get(f, 0.0) - z * volatility[f] for f in factors],
+                          'high_shock': [center.get(f, 0.0) + z * volatility[f] for f in factors],
+                          'at_low': values[0::2], 'at_high': values[1::2]}, index=factors)
+    table['swing'] = (table['at_high'] - table['at_low']).abs()
+    return table.sort_values('swing', ascending=False)
+
+
+def analyze_scenarios(data: pd.DataFrame, shocks: Optional[Dict[str, float]] = None,
+                      volatility: Optional[Dict[str, float]] = None, n_scenarios: int = DEFAULT_SCENARIOS,
+                      targets: Sequence[str] = ('Return on Equity (%)', 'Interest Coverage Ratio')) -> Tuple[str, str]:
+    """
+    Main MCP Tool: Scenario, Monte Carlo and Sensitivity Analysis of the ratio set
+
+    Args:
+        data: Consolidated financial DataFrame
+        shocks: Stated scenario as relative shocks, e.g. {'revenue': -0.1, 'interest_expense': 0.2}
+        volatility: 1-sigma relative shock per factor for the Monte Carlo and tornado
+        n_scenarios: Number of Monte Carlo scenarios around the stated scenario
+        targets: Ratios to rank sensitivities for
+
+    Returns:
+        tuple: (report_text, status_message)
+    """
+    if data is None or data.empty:
+        return "", "No data available for scenario analysis."
+
+    try:
+        shocks = shocks or {}
+        volatility = DEFAULT_VOLATILITY if volatility is None else volatility
+        base = base_items(data)
+        if 'revenue' not in base or 'net_income' not in base:
+            return "", "Could not identify revenue and net income for scenario analysis."
+
+        base_ratios = scenario_ratios(base, {}).iloc[0]
+        stated = scenario_ratios(base, {k: np.array([v]) for k, v in shocks.items()}).iloc[0]
+        sampled = scenario_ratios(base, sample_scenarios(shocks, volatility, n_scenarios))
+        summary = summarize(sampled, base_ratios, stated)
+
+        report = "### 🎲 Scenario & Sensitivity Analysis\n\n"
+        stated_text = ", ".join(f"{k.replace('_', ' ')} {v:+.0%}" for k, v in shocks.items()) or "none (base case)"
+        report += f"**Stated scenario:** {stated_text}\n"
+        report += (f"**Monte Carlo:** {n_scenarios:,} scenarios, 1σ shocks "
+                   + ", ".join(f"{k.replace('_', ' ')} ±{v:.0%}" for k, v in volatility.items()) + "\n\n")
+
+        report += "| Ratio | Base | Scenario | Mean | P5 | P95 |\n|---|---|---|---|---|---|\n"
+        for ratio in [r for r in KEY_RATIOS if r in summary.index]:
+            row = summary.loc[ratio]
+            report += (f"| {ratio} | {row['base']:.2f} | {row['scenario']:.2f} | {row['mean']:.2f} "
+                       f"| {row['p5']:.2f} | {row['p95']:.2f} |\n")
+
+        for target in [t for t in targets if t in summary.index]:
+            bars = tornado(base, shocks, volatility, target)
+            report += f"\n**Sensitivity of {target}** (shock at 5th → 95th percentile)\n"
+            for factor, row in bars.iterrows():
+                report += (f"• {factor.replace('_', ' ')}: {row['at_low']:.2f} → {row['at_high']:.2f} "
+                           f"(swing {row['swing']:.2f})\n")
+
+        return report, "✅ Scenario analysis complete."
+
+    except Exception as e:
+        return "", f"❌ Error in scenario analysis: {str(e)}"
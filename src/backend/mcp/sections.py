@@ -0,0 +1,215 @@
+"""
+Report Section Indexing Module
+Splits annual-report text into sections (Chairman's Statement, MD&A, Risk Factors...)
+by heading detection and caches FinBERT sentiment per section, so a query about one
+section scores only that section and re-uploads only re-score sections that changed
+"""
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from src.backend.mcp import sentiment
+
+# Canonical section names and the heading phrases that introduce them
+KNOWN_SECTIONS = {
+    "Chairman's Statement": ["chairman's statement", "chairman statement", "chairperson's statement",
+                             "chairman's report", "chair's statement", "message from the chairman"],
+    "Chief Executive's Review": ["chief executive", "ceo's review", "ceo's statement", "managing director's"],
+    "Management Discussion & Analysis": ["management discussion", "management's discussion", "md&a",
+                                         "operating and financial review", "financial review"],
+    "Risk Factors": ["risk factors", "principal risks", "risk management", "key risks"],
+    "Outlook": ["outlook", "prospects", "looking ahead"],
+    "Directors' Report": ["directors' report", "directors report", "report of the directors"],
+    "Corporate Governance": ["corporate governance", "governance report", "governance statement"],
+    "Sustainability": ["sustainability", "esg report", "corporate social responsibility"],
+    "Auditor's Report": ["independent auditor", "auditor's report", "report of the auditor"],
+    "Notes to the Financial Statements": ["notes to the financial statements", "notes to the accounts"],
+}
+
+PREAMBLE = "Preamble"
+MAX_HEADING_WORDS = 10
+MAX_CACHED_SECTIONS = 256
+
+_FILE_MARKER = re.compile(r'^--- .+ ---$')
+_NUMBERING = re.compile(r'^(\d+(\.\d+)*|[ivxlc]+)[.)]?\s+', re.IGNORECASE)
+
+
+def _known_section(line: str) -> Optional[str]:
+    """Canonical name if the line starts with a known section heading phrase"""
+    lowered = line.lower().replace('’', "'")
+    for name, phrases in KNOWN_SECTIONS.items():
+        if any(lowered.startswith(p) for p in phrases):
+            return name
+    return None
+
+
+def detect_heading(line: str) -> Optional[str]:
+    """
+    Returns the section name if the line looks like a heading, else None.
+    A heading is a short line without sentence punctuation that either starts
+    with a known section phrase or is written entirely in capitals.
+    """
+    stripped = _NUMBERING.sub('', line.strip())
+    words = stripped.split()
+    if not words or len(words) > MAX_HEADING_WORDS or stripped[-1] in '.,;:':
+        return None
+    if not re.search(r'[A-Za-z]{3}', stripped):
+        return None
+
+    known = _known_section(stripped)
+    if known:
+        return known
+    if stripped.isupper() and len(words) >= 2:
+        return stripped.title()
+    return None
+
+
+def split_sections(text: str) -> "OrderedDict[str, str]":
+    """
+    Splits document text into named sections in order of first appearance.
+    Repeated headings (e.g. running page headers) are merged into one section.
+    """
+    sections = OrderedDict()
+    current = PREAMBLE
+
+    for line in text.splitlines():
+        if _FILE_MARKER.match(line.strip()):
+            continue
+        heading = detect_heading(line)
+        if heading:
+            current = heading
+            sections.setdefault(current, [])
+            continue
+        sections.setdefault(current, []).append(line)
+
+    return OrderedDict((name, "\n".join(lines).strip()) for name, lines in sections.items() if "".join(lines).strip())
+
+
+def match_section(query: str, section_names: List[str]) -> Optional[str]:
+    """Resolves a free-text query ("tone of the chairman's statement") to a section name"""
+    lowered = query.lower().replace('’', "'")
+    for name in section_names:
+        if name.lower() in lowered:
+            return name
+    for name, phrases in KNOWN_SECTIONS.items():
+        keywords = phrases + [name.lower().split("'")[0]]
+        if name in section_names and any(k in lowered for k in keywords):
+            return name
+    return None
+
+
+def _cache_key(body: str, model) -> str:
+    """Section text hash, namespaced by model so different models never share scores"""
+    model_name = getattr(model, 'name', None) or type(model).__name__
+    return f"{model_name}:{hashlib.sha256(body.encode('utf-8')).hexdigest()}"
+
+
+class SectionSentimentIndex:
+    """
+    Section-level sentiment store keyed by section text hash.
+    Holds no per-request state, so one index can be shared by concurrent requests.
+    """
+
+    def __init__(self, chunk_budget: Optional[int] = sentiment.DEFAULT_CHUNK_BUDGET, max_entries: int = MAX_CACHED_SECTIONS):
+        """
+        Args:
+            chunk_budget: Per-section chunk budget passed to estimate_sentiment
+            max_entries: Number of section scores kept (least recently used evicted)
+        """
+        self.chunk_budget = chunk_budget
+        self.max_entries = max_entries
+        self._scores: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def changed_sections(self, sections: Dict[str, str], model=None) -> List[str]:
+        """Names of sections whose text is new or changed since they were last scored"""
+        model = model if model is not None else sentiment.nlp
+        with self._lock:
+            return [name for name, body in sections.items() if _cache_key(body, model) not in self._scores]
+
+    def score(self, body: str, model=None) -> Tuple[Optional[dict], bool]:
+        """
+        Sentiment estimate for one section's text, computed only if the text changed.
+        Returns: (estimate or None, whether it was freshly scored)
+        """
+        model = model if model is not None else sentiment.nlp
+        key = _cache_key(body, model)
+        with self._lock:
+            if key in self._scores:
+                self._scores.move_to_end(key)
+                return self._scores[key], False
+
+        est = sentiment.estimate_sentiment(body, chunk_budget=self.chunk_budget, model=model)
+        if est is None:
+            return None, False
+
+        with self._lock:
+            self._scores[key] = est
+            if len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+        return est, True
+
+
+# Shared index so repeated uploads of the same report reuse unchanged section scores
+SECTION_INDEX = SectionSentimentIndex()
+
+
+def _format_row(name: str, est: dict) -> str:
+    score, low, high = est['score']
+    return f"• **{name}:** {est['dominant'].upper()} | Score {score:+.2f} (95% CI {low:+.2f} to {high:+.2f})\n"
+
+
+def analyze_section_sentiment(text: str, query: str = "", index: Optional[SectionSentimentIndex] = None,
+                              model=None) -> Tuple[str, str]:
+    """
+    Main MCP Tool: Section-level Sentiment Analysis
+    Scores only the section named in the query, or every section if none is named.
+
+    Args:
+        text: Document text (PDF/TXT extraction)
+        query: User query, e.g. "tone of the chairman's statement"
+        index: Section index to use (defaults to the shared SECTION_INDEX)
+        model: Sentiment pipeline for this request (defaults to the module-level FinBERT)
+
+    Returns:
+        tuple: (report_text, status_message)
+    """
+    model = model if model is not None else sentiment.nlp
+    if model is None:
+        return "Model Error: FinBERT failed to initialize. Check your PyTorch version/Internet connection.", "Error"
+
+    if not text or len(text.strip()) < 20:
+        return "Text provided is too short for meaningful financial analysis.", "Skipped"
+
+    index = index if index is not None else SECTION_INDEX
+
+    try:
+        sections = split_sections(text)
+        changed = index.changed_sections(sections, model)
+        target = match_section(query, list(sections))
+        targets = [target] if target else list(sections)
+
+        rows = ""
+        rescored = []
+        for name in targets:
+            est, fresh = index.score(sections[name], model)
+            if est is None:
+                continue
+            if fresh:
+                rescored.append(name)
+            rows += _format_row(name, est)
+            if target:
+                rows += f"  Coverage: {est['scored']} of {est['total']} distinct segments scored\n"
+
+        if not rows:
+            return "Could not extract valid text segments.", "Error"
+
+        report = "### 🧭 Section-level Sentiment (ProsusAI FinBERT)\n\n" + rows
+        report += f"\n📑 Sections detected: {len(sections)} ({len(changed)} new or changed)\n"
+        msg = f"Section sentiment complete. Re-scored: {', '.join(rescored) or 'none (cached)'}"
+        return report, msg
+
+    except Exception as e:
+        return f"Analysis Error: {str(e)}", "Error"
@@ -1,6 +1,9 @@
 from transformers import BertTokenizer, BertForSequenceClassification, pipeline
 import torch
+import numpy as np
+import time
 import warnings
+from src.backend.mcp.dedup import cluster_near_duplicates
 
 # STRICT REQUIREMENT: Use ProsusAI/finbert
 MODEL_NAME = "ProsusAI/finbert"
@@ -23,69 +26,294 @@ except Exception as e:
     else:
         warnings.warn(f"⚠️ FinBERT sentiment analysis unavailable: {error_msg}")
 
-def analyze_sentiment(text):
+# Inference batching: chunks are sorted by token length and grouped so that each
+# forward pass pads to a similar length instead of the longest chunk in the batch.
+BATCH_SIZE = 16
+BUCKET_WIDTH = 32  # Max token-length spread allowed inside one batch
+
+def split_into_chunks(text, max_chars=500):
     """
-    Analyzes text using ProsusAI FinBERT.
-    Returns: Report string.
+    Splits text into sentence-aligned chunks below FinBERT's 512 token limit.
+    Returns: list of chunk strings.
     """
-    if nlp is None:
-        return "Model Error: FinBERT failed to initialize. Check your PyTorch version/Internet connection.", "Error"
-
-    if not text or len(text.strip()) < 20:
-        return "Text provided is too short for meaningful financial analysis.", "Skipped"
-
-    # Chunking: FinBERT has a 512 token limit.
-    # We split by sentences to preserve context.
     sentences = text.split('.')
     chunks = []
     current_chunk = ""
 
     for sent in sentences:
-        if len(current_chunk) + len(sent) < 500:
+        if len(current_chunk) + len(sent) < max_chars:
             current_chunk += sent + "."
         else:
             chunks.append(current_chunk)
             current_chunk = sent + "."
     if current_chunk: chunks.append(current_chunk)
 
-    results = []
+    return chunks
+
+def token_lengths(chunks, model=None):
+    """
+    Token count of each chunk, using the pipeline tokenizer when available
+    (falls back to whitespace word counts).
+    """
+    tokenizer = getattr(model, 'tokenizer', None)
+    if tokenizer is None:
+        return [len(chunk.split()) + 2 for chunk in chunks]
+    encoded = tokenizer(list(chunks), truncation=True, max_length=512)['input_ids']
+    return [len(ids) for ids in encoded]
+
+def bucket_batches(lengths, batch_size=BATCH_SIZE, bucket_width=BUCKET_WIDTH):
+    """
+    Length-bucketed batch scheduler.
+    Sorts chunk indices by length and cuts a new batch when it is full or when
+    the next chunk would widen the batch's length spread beyond bucket_width.
+    Returns: list of index lists (indices refer to the original chunk order).
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+
+    for idx in order:
+        if current and (len(current) >= batch_size or lengths[idx] - lengths[current[0]] > bucket_width):
+            batches.append(current)
+            current = []
+        current.append(idx)
+    if current: batches.append(current)
+
+    return batches
+
+def padding_share(lengths, batches):
+    """Fraction of the tokens fed to the model that are padding."""
+    total = 0
+    real = 0
+    for batch in batches:
+        if not batch: continue
+        batch_lengths = [lengths[i] for i in batch]
+        total += max(batch_lengths) * len(batch)
+        real += sum(batch_lengths)
+    return (total - real) / total if total else 0.0
+
+def score_chunks(chunks, model=None, batch_size=BATCH_SIZE, bucket_width=BUCKET_WIDTH):
+    """
+    Runs FinBERT over chunks in length-bucketed batches.
+    Returns: list of pipeline results ({'label', 'score'}) in the original chunk order.
+    """
+    model = model if model is not None else nlp
+    lengths = token_lengths(chunks, model)
+    results = [None] * len(chunks)
+
+    for batch in bucket_batches(lengths, batch_size, bucket_width):
+        batch_texts = [chunks[i] for i in batch]
+        # Truncation ensures we don't crash on weird long strings
+        outputs = model(batch_texts, truncation=True, max_length=512, batch_size=len(batch_texts))
+        for idx, out in zip(batch, outputs):
+            results[idx] = out[0] if isinstance(out, list) else out
+
+    return results
+
+# Sampled scoring: chunks are drawn round-robin from contiguous strata of the
+# document so a limited budget covers the whole report, not just its opening pages.
+DEFAULT_CHUNK_BUDGET = 20
+MAX_STRATA = 10
+Z_95 = 1.96
+SENTIMENT_SCORES = {'positive': 1, 'neutral': 0, 'negative': -1}
+
+class StratifiedSentimentSampler:
+    """
+    Progressive stratified-sample estimator of document sentiment.
+    Call refine() repeatedly with more budget to tighten the confidence intervals;
+    once every chunk has been scored the estimate is exact.
+    """
+
+    def __init__(self, chunks, weights=None, n_strata=MAX_STRATA, model=None, seed=0):
+        """
+        Args:
+            chunks: Texts to score (e.g. near-duplicate cluster representatives)
+            weights: Number of document chunks each text stands for (default 1)
+            n_strata: Number of contiguous document sections to stratify over
+            model: Sentiment pipeline (defaults to the module-level FinBERT)
+            seed: RNG seed, so repeated runs over the same text agree
+        """
+        self.chunks = chunks
+        self.weights = np.ones(len(chunks)) if weights is None else np.asarray(weights, dtype=float)
+        self.model = model
+        self.strata = np.array_split(np.arange(len(chunks)), max(1, min(n_strata, len(chunks))))
+        rng = np.random.default_rng(seed)
+        self._queues = [list(rng.permutation(stratum)) for stratum in self.strata]
+        self.labels = {}
+
+    @property
+    def exhausted(self):
+        return len(self.labels) == len(self.chunks)
+
+    def _next_indices(self, n):
+        """Round-robin draw across strata"""
+        picked = []
+        while len(picked) < n and any(self._queues):
+            for queue in self._queues:
+                if queue and len(picked) < n:
+                    picked.append(queue.pop())
+        return picked
+
+    def refine(self, chunk_budget=None, time_budget=None):
+        """
+        Scores further chunks until a budget runs out (at least one batch is always scored).
+
+        Args:
+            chunk_budget: Maximum number of additional chunks to score
+            time_budget: Wall-clock seconds to spend
+
+        Returns:
+            dict: Current estimate (see estimate())
+        """
+        start = time.perf_counter()
+        scored = 0
+
+        while not self.exhausted:
+            if chunk_budget is not None and scored >= chunk_budget:
+                break
+            if time_budget is not None and scored and time.perf_counter() - start >= time_budget:
+                break
+
+            n = BATCH_SIZE if chunk_budget is None else min(BATCH_SIZE, chunk_budget - scored)
+            batch = self._next_indices(n)
+            results = score_chunks([self.chunks[i] for i in batch], self.model)
+            for idx, res in zip(batch, results):
+                self.labels[idx] = res['label'].lower()
+            scored += len(batch)
+
+        return self.estimate()
+
+    def _stratified_mean(self, values):
+        """Weighted stratified mean of per-chunk values and its 95% half-width"""
+        total_weight = self.weights.sum()
+        sampled_all = list(self.labels)
+        if not sampled_all:
+            return 0.0, np.inf
+
+        # Pooled sample statistics stand in for strata with fewer than two draws
+        pooled_mean = np.average(values[sampled_all], weights=self.weights[sampled_all])
+        pooled_var = np.cov(values[sampled_all], aweights=self.weights[sampled_all]) if len(sampled_all) > 1 else 0.0
+
+        mean = 0.0
+        variance = 0.0
+        for stratum in self.strata:
+            share = self.weights[stratum].sum() / total_weight
+            sampled = [i for i in stratum if i in self.labels]
+            if not sampled:
+                # Unvisited stratum: assume it behaves like one draw from the pooled sample
+                mean += share * pooled_mean
+                variance += share ** 2 * pooled_var
+                continue
+
+            w = self.weights[sampled]
+            stratum_var = np.cov(values[sampled], aweights=w) if len(sampled) > 1 else pooled_var
+            effective_n = w.sum() ** 2 / (w ** 2).sum()
+            fpc = 1 - len(sampled) / len(stratum)
+
+            mean += share * np.average(values[sampled], weights=w)
+            variance += share ** 2 * stratum_var / effective_n * fpc
+
+        return mean, Z_95 * np.sqrt(max(variance, 0.0))
+
+    def estimate(self):
+        """
+        Returns:
+            dict with 'score' and per-label 'shares' as (estimate, low, high) tuples,
+            the 'dominant' label, weighted 'counts' of scored statements and coverage.
+        """
+        labels = [self.labels.get(i) for i in range(len(self.chunks))]
+
+        scores = np.array([SENTIMENT_SCORES.get(label, 0) for label in labels], dtype=float)
+        score, half_width = self._stratified_mean(scores)
+
+        shares = {}
+        for label in SENTIMENT_SCORES:
+            share, share_hw = self._stratified_mean(np.array([label == l for l in labels], dtype=float))
+            shares[label] = (share, max(share - share_hw, 0.0), min(share + share_hw, 1.0))
+
+        counts = {label: int(sum(self.weights[i] for i, l in self.labels.items() if l == label)) for label in SENTIMENT_SCORES}
+
+        return {
+            'score': (score, max(score - half_width, -1.0), min(score + half_width, 1.0)),
+            'shares': shares,
+            'dominant': max(shares, key=lambda label: shares[label][0]),
+            'counts': counts,
+            'scored': len(self.labels),
+            'total': len(self.chunks),
+        }
+
+def estimate_sentiment(text, chunk_budget=DEFAULT_CHUNK_BUDGET, time_budget=None, model=None):
+    """
+    Chunks, deduplicates and sample-scores text within the given budget.
+    Returns: estimate dict from StratifiedSentimentSampler.estimate() plus the
+    number of near-duplicate chunks 'collapsed', or None if no usable chunks.
+    """
+    # Chunking: FinBERT has a 512 token limit.
+    # We split by sentences to preserve context.
+    chunks = split_into_chunks(text)
+
+    valid_chunks = [chunk for chunk in chunks if len(chunk.strip()) > 5]
+    if not valid_chunks:
+        return None
+
+    # Collapse near-duplicate chunks (disclaimers, repeated KPI narratives) so each
+    # cluster costs one forward pass; its label is weighted by the cluster size
+    clusters = cluster_near_duplicates(valid_chunks)
+    representatives = [valid_chunks[rep] for rep, _ in clusters]
+    cluster_sizes = [len(members) for _, members in clusters]
+
+    # Enough strata to cover the document, with ~2 draws each for variance estimates
+    n_strata = MAX_STRATA if chunk_budget is None else max(1, min(MAX_STRATA, chunk_budget // 2))
+
+    sampler = StratifiedSentimentSampler(representatives, cluster_sizes, n_strata=n_strata, model=model)
+    est = sampler.refine(chunk_budget=chunk_budget, time_budget=time_budget)
+    est['collapsed'] = len(valid_chunks) - len(clusters)
+    return est
+
+def analyze_sentiment(text, chunk_budget=DEFAULT_CHUNK_BUDGET, time_budget=None, model=None):
+    """
+    Analyzes text using ProsusAI FinBERT.
+    Chunks are sampled across the whole document within the given budget and the
+    tone is reported with 95% confidence intervals.
+
+    Args:
+        text: Document text
+        chunk_budget: Maximum number of distinct chunks to score (None = no limit)
+        time_budget: Seconds to spend scoring (None = no limit)
+        model: Sentiment pipeline for this request (defaults to the module-level FinBERT)
+
+    Returns: Report string.
+    """
+    model = model if model is not None else nlp
+    if model is None:
+        return "Model Error: FinBERT failed to initialize. Check your PyTorch version/Internet connection.", "Error"
+
+    if not text or len(text.strip()) < 20:
+        return "Text provided is too short for meaningful financial analysis.", "Skipped"
+
     try:
-        # Process first 20 chunks to balance speed/coverage
-        for chunk in chunks[:20]: 
-            if len(chunk.strip()) > 5:
-                # Truncation ensures we don't crash on weird long strings
-                res = nlp(chunk, truncation=True, max_length=512)[0]
-                results.append(res)
+        est = estimate_sentiment(text, chunk_budget=chunk_budget, time_budget=time_budget, model=model)
     except Exception as e:
         return f"Analysis Error: {str(e)}", "Error"
 
-    if not results:
+    if est is None:
         return "Could not extract valid text segments.", "Error"
 
-    # ProsusAI Output labels: 'positive', 'negative', 'neutral'
-    counts = {'positive': 0, 'neutral': 0, 'negative': 0}
-    scores = {'positive': 1, 'neutral': 0, 'negative': -1}
-    
-    total_score = 0
-    
-    for r in results:
-        label = r['label'].lower()
-        if label in counts:
-            counts[label] += 1
-            total_score += scores[label]
-
-    # Calculate weighted sentiment score
-    avg_score = total_score / len(results)
-    dominant_sentiment = max(counts, key=counts.get)
+    score, score_low, score_high = est['score']
+    counts = est['counts']
+    shares = est['shares']
 
     report = (
         f"### 🤖 ProsusAI FinBERT Analysis\n"
-        f"**Dominant Tone:** {dominant_sentiment.upper()}\n"
-        f"**Financial Sentiment Score:** {avg_score:.2f} (Range: -1.0 to +1.0)\n\n"
+        f"**Dominant Tone:** {est['dominant'].upper()}\n"
+        f"**Financial Sentiment Score:** {score:.2f} (Range: -1.0 to +1.0)\n"
+        f"**95% Confidence Interval:** {score_low:.2f} to {score_high:.2f}\n\n"
         f"**Detailed Breakdown:**\n"
-        f"📈 Positive Statements: {counts['positive']}\n"
-        f"📉 Negative Statements: {counts['negative']}\n"
-        f"⚖️ Neutral Statements: {counts['neutral']}\n"
+        f"📈 Positive Statements: {counts['positive']} (est. share {shares['positive'][0]:.0%}, CI {shares['positive'][1]:.0%}-{shares['positive'][2]:.0%})\n"
+        f"📉 Negative Statements: {counts['negative']} (est. share {shares['negative'][0]:.0%}, CI {shares['negative'][1]:.0%}-{shares['negative'][2]:.0%})\n"
+        f"⚖️ Neutral Statements: {counts['neutral']} (est. share {shares['neutral'][0]:.0%}, CI {shares['neutral'][1]:.0%}-{shares['neutral'][2]:.0%})\n"
+        f"♻️ Near-duplicate Statements Collapsed: {est['collapsed']}\n"
+        f"🔎 Coverage: {est['scored']} of {est['total']} distinct segments scored\n"
     )
 
     return report, "Sentiment Analysis Complete."
@@ -0,0 +1,164 @@
+"""
+Forecast Simulation Module
+Prediction intervals for damped Holt forecasts by simulating future paths for many
+series at once. Future errors enter the forecast linearly,
+
+    y_{T+h} = point_{T+h} + sum_{j=1..h} c_{h-j} * e_{T+j}
+    c_0 = 1,  c_k = alpha * (1 + beta * (phi + ... + phi^k))
+
+so a whole (series, paths, horizon) block of paths is one einsum over sampled errors,
+with no Python loop over paths or periods. Errors are drawn from each series' own
+one-step residuals (bootstrap) or from a normal with the residual variance (parametric).
+
+Paths from the fitted parameters leave out estimation error, which dominates on short
+series (least squares often drives alpha to 0, so the simulated spread barely grows with
+the horizon). When the history is passed in, each series' bands are widened to match its
+own rolling-origin forecast errors: the model is refitted at every origin, so those
+errors include parameter uncertainty.
+"""
+import numpy as np
+from typing import Dict, Optional, Sequence
+
+from src.backend.mcp.batch_forecasting import BatchHoltFit, fit_damped_holt
+
+METHODS = ('bootstrap', 'parametric')
+DEFAULT_PATHS = 2000
+DEFAULT_LEVELS = (0.8, 0.95)
+MAX_SAMPLES = 2_000_000  # Simulated values held at once (series x paths x horizon)
+N_PARAMS = 5  # alpha, beta, phi, initial level, initial trend
+MIN_TRAIN = 3  # Smallest backtest window damped Holt can be fitted on (as in backtesting)
+
+
+def error_weights(fit: BatchHoltFit, steps: int) -> np.ndarray:
+    """(N, steps, steps) lower-triangular weights: path[h] - point[h] = sum_j C[h, j] * e_j"""
+    powers = np.cumsum(fit.phi[:, None] ** np.arange(1, steps)[None, :], axis=1)
+    c = np.concatenate([np.ones((len(fit), 1)),
+                        fit.alpha[:, None] * (1 + fit.beta[:, None] * powers)], axis=1)  # (N, steps)
+    lag = np.arange(steps)[:, None] - np.arange(steps)[None, :]
+    return np.where(lag >= 0, c[:, np.clip(lag, 0, None)], 0.0)
+
+
+def _scaled_residuals(residuals: np.ndarray) -> np.ndarray:
+    """In-sample residuals inflated by sqrt(T / (T - k)): on short series the fitted
+    parameters absorb part of the noise, so raw residuals understate future errors"""
+    n_obs = residuals.shape[1]
+    return residuals * np.sqrt(n_obs / max(n_obs - N_PARAMS, 1))
+
+
+def _draw_errors(residuals: np.ndarray, n_paths: int, steps: int, method: str, rng) -> np.ndarray:
+    """(B, n_paths, steps) future errors for a block of series"""
+    residuals = _scaled_residuals(residuals)
+    if method == 'bootstrap':
+        picks = rng.integers(0, residuals.shape[1], size=(len(residuals), n_paths * steps))
+        return np.take_along_axis(residuals, picks, axis=1).reshape(len(residuals), n_paths, steps)
+    sigma = np.sqrt(np.mean(residuals ** 2, axis=1))
+    return sigma[:, None, None] * rng.standard_normal((len(residuals), n_paths, steps))
+
+
+def backtest_errors(history: np.ndarray, steps: int, min_train: int = MIN_TRAIN) -> np.ndarray:
+    """
+    Rolling-origin forecast errors: refit on history[:, :o] for every origin o >= min_train
+
+    Returns:
+        (N, origins, steps) array of actual - forecast (NaN past the end of the history)
+    """
+    history = np.atleast_2d(np.asarray(history, dtype=float))
+    origins = range(min_train, history.shape[1])
+    errors = np.full((len(history), len(origins), steps), np.nan)
+    for i, origin in enumerate(origins):
+        horizon = min(steps, history.shape[1] - origin)
+        errors[:, i, :horizon] = history[:, origin:origin + horizon] - fit_damped_holt(history[:, :origin]).forecast(horizon)
+    return errors
+
+
+def width_scale(errors: np.ndarray, spread: np.ndarray) -> np.ndarray:
+    """
+    Band widening per series: RMS of the backtest errors in units of the simulated spread
+    at the same horizon, pooled over origins and horizons (never below 1, and 1 when the
+    history is too short to backtest)
+
+    Args:
+        errors: (N, origins, steps) from backtest_errors
+        spread: (N, steps) standard deviation of the simulated paths
+    """
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = (errors / spread[:, None, :]).reshape(len(errors), -1) ** 2
+        z[~np.isfinite(z)] = np.nan
+        counts = np.sum(~np.isnan(z), axis=1)
+        rms = np.sqrt(np.nansum(z, axis=1) / np.maximum(counts, 1))
+    return np.where(counts > 0, np.maximum(rms, 1.0), 1.0)
+
+
+def simulate_paths(fit: BatchHoltFit, steps: int, n_paths: int = DEFAULT_PATHS, method: str = 'bootstrap',
+                   seed: Optional[int] = 0) -> np.ndarray:
+    """
+    Simulated future paths for every fitted series (all held in memory; see forecast_intervals
+    for the memory-bounded version)
+
+    Returns:
+        (N, n_paths, steps) array
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown simulation method '{method}' (use one of {METHODS}).")
+    rng = np.random.default_rng(seed)
+    errors = _draw_errors(fit.residuals, n_paths, steps, method, rng)
+    return fit.forecast(steps)[:, None, :] + np.einsum('nhj,npj->nph', error_weights(fit, steps), errors)
+
+
+def forecast_intervals(fit: BatchHoltFit, steps: int, levels: Sequence[float] = DEFAULT_LEVELS,
+                       n_paths: int = DEFAULT_PATHS, method: str = 'bootstrap', seed: Optional[int] = 0,
+                       max_samples: int = MAX_SAMPLES, history: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    Point forecast and simulated quantile bands for every fitted series.
+    Series are processed in blocks whose sample buffer holds about max_samples values,
+    and paths are drawn into it in chunks so the temporaries stay a fraction of that.
+    Without `history` the bands are conditional on the fitted parameters.
+
+    Args:
+        fit: Fitted models (BatchHoltFit)
+        steps: Forecast horizon
+        levels: Central interval coverages, e.g. (0.8, 0.95)
+        n_paths: Simulated paths per series
+        method: 'bootstrap' (resample residuals) or 'parametric' (normal errors)
+        seed: Random seed (None = nondeterministic)
+        max_samples: Memory bound in simulated values
+        history: (N, T) series the models were fitted on; calibrates the band widths
+                 against rolling-origin forecast errors
+
+    Returns:
+        dict: 'point' and 'median' plus 'lower_<pct>' / 'upper_<pct>' per level, each (N, steps),
+              and 'width_scale' (N,): the calibration factor applied (1 without history)
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown simulation method '{method}' (use one of {METHODS}).")
+
+    quantiles = [0.5] + [q for level in levels for q in ((1 - level) / 2, (1 + level) / 2)]
+    out = np.empty((len(quantiles), len(fit), steps))
+
+    rng = np.random.default_rng(seed)
+    point = fit.forecast(steps)
+    weights = error_weights(fit, steps)
+    block = max(1, max_samples // (n_paths * steps))
+    spread = np.empty((len(fit), steps))
+
+    for start in range(0, len(fit), block):
+        rows = slice(start, start + block)
+        samples = np.empty((len(point[rows]), n_paths, steps))
+        path_chunk = max(1, max_samples // (4 * samples.shape[0] * steps))
+        for p in range(0, n_paths, path_chunk):
+            count = min(path_chunk, n_paths - p)
+            errors = _draw_errors(fit.residuals[rows], count, steps, method, rng)
+            samples[:, p:p + count] = point[rows][:, None, :] + np.einsum('nhj,npj->nph', weights[rows], errors)
+        out[:, rows] = np.quantile(samples, quantiles, axis=1)
+        spread[rows] = samples.std(axis=1)
+
+    # Quantiles of median + k * (path - median) are median + k * (quantile - median)
+    scale = np.ones(len(fit)) if history is None else width_scale(backtest_errors(history, steps), spread)
+    out[1:] = out[0] + scale[:, None] * (out[1:] - out[0])
+
+    result = {'point': point, 'median': out[0], 'width_scale': scale}
+    for i, level in enumerate(levels):
+        pct = int(round(level * 100))
+        result[f"lower_{pct}"] = out[1 + 2 * i]
+        result[f"upper_{pct}"] = out[2 + 2 * i]
+    return result
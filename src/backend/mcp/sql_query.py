@@ -0,0 +1,245 @@
+"""
+SQL Query Module
+Ad hoc, read-only SQL over parsed financial data for the slices the fixed analyses do
+not cover: sums, filters and joins across line items, years and companies.
+
+Tables:
+    financials  entity, line_item, period, year, value - one row per reported value of
+                the DataFrame(s) passed in
+    line_items, aliases, ratios, trends, entities - the FinancialStore tables, when a
+                store is passed in (see store.py for their columns)
+
+Queries run on DuckDB when it is installed: the wide DataFrames are registered as they
+are (frames with the same periods are stacked into one) and unpivoted into `financials`
+by a view, and the store is attached read-only through DuckDB's sqlite extension.
+Without DuckDB, or when the extension or the store file is unavailable, they run on
+SQLite over a read-only connection to the store, with `financials` copied into a temp
+table. A query is one SELECT (or WITH ... SELECT), capped at max_rows and interrupted
+after a timeout.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.backend.cloud_config.config import ModalConfig
+from src.backend.mcp.frames import compact_frame
+from src.backend.mcp.periods import parse_period
+from src.backend.mcp.store import FinancialStore
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+FINANCIALS_COLUMNS = ['entity', 'line_item', 'period', 'year', 'value']
+
+
+def long_table(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]]) -> pd.DataFrame:
+    """
+    The `financials` table: one row per non-missing value
+
+    Args:
+        data: One consolidated DataFrame (entity ''), or entity name -> DataFrame
+    """
+    columns = {name: [] for name in FINANCIALS_COLUMNS}
+    for entity, df in (data if isinstance(data, dict) else {'': data}).items():
+        df = compact_frame(df)
+        periods = np.array(df.columns[1:], dtype=object)
+        years = np.array([p.year if p is not None else np.nan for p in map(parse_period, periods)], dtype=float)
+        values = df.iloc[:, 1:].to_numpy(dtype=float)
+        rows, cols = np.nonzero(~np.isnan(values))
+        columns['entity'].append(np.full(len(rows), entity, dtype=object))
+        columns['line_item'].append(df['Line Item'].astype(str).to_numpy(dtype=object)[rows])
+        columns['period'].append(periods[cols])
+        columns['year'].append(years[cols])
+        columns['value'].append(values[rows, cols])
+    if not columns['entity']:
+        return pd.DataFrame(columns=FINANCIALS_COLUMNS)
+    table = pd.DataFrame({name: np.concatenate(parts) for name, parts in columns.items()})
+    table['year'] = table['year'].astype('Int64')
+    return table
+
+
+def _select(sql: str, limit: int) -> str:
+    """The query wrapped as a subquery with a row limit, so only a single SELECT parses"""
+    sql = sql.strip().rstrip(';').strip()
+    if not sql:
+        raise ValueError("Empty query.")
+    return f"SELECT * FROM (\n{sql}\n) AS result LIMIT {int(limit)}"
+
+
+def _frames(data: Union[pd.DataFrame, Dict[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    return {entity: compact_frame(df) for entity, df in (data if isinstance(data, dict) else {'': data}).items()}
+
+
+def _sql_string(value: str) -> str:
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _register_financials(conn, frames: Dict[str, pd.DataFrame]) -> None:
+    """
+    Registers the wide frames and creates the `financials` view that unpivots them.
+    A lone frame is registered as is; frames sharing the same period columns are
+    stacked into one wide table with an entity column, so a portfolio stays a handful
+    of scans instead of one per company.
+    """
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    for entity, df in frames.items():
+        if len(df.columns) > 1:
+            groups.setdefault(tuple(df.columns), []).append(entity)
+
+    parts, periods = [], set()
+    for i, (columns, entities) in enumerate(groups.items()):
+        periods.update(columns[1:])
+        if len(entities) == 1:
+            wide, entity = frames[entities[0]], _sql_string(entities[0])
+        else:
+            wide = pd.DataFrame(np.concatenate([frames[e].iloc[:, 1:].to_numpy(dtype=float) for e in entities]),
+                                columns=list(columns[1:]))
+            wide.insert(0, 'Line Item', np.concatenate([frames[e]['Line Item'].to_numpy(dtype=object) for e in entities]))
+            wide.insert(0, 'entity', np.repeat(np.array(entities, dtype=object), [len(frames[e]) for e in entities]))
+            entity = 'entity'
+        conn.register(f"_financials_{i}", wide)
+        parts.append(f"SELECT {entity} AS entity, CAST(\"Line Item\" AS VARCHAR) AS line_item, period, "
+                     f"CAST(value AS DOUBLE) AS value FROM (UNPIVOT _financials_{i} "
+                     f"ON COLUMNS(* EXCLUDE ({'entity, ' if entity == 'entity' else ''}\"Line Item\")) "
+                     f"INTO NAME period VALUE value)")
+
+    labels = sorted(periods)
+    years = [p.year if p is not None else None for p in map(parse_period, labels)]
+    conn.register('_periods', pd.DataFrame({'period': pd.Series(labels, dtype=object),
+                                            'year': pd.array(years, dtype='Int64')}))
+    values = (" UNION ALL ".join(parts) if parts else
+              "SELECT NULL::VARCHAR AS entity, NULL::VARCHAR AS line_item, NULL::VARCHAR AS period, "
+              "NULL::DOUBLE AS value WHERE false")
+    conn.execute(f"CREATE TEMP VIEW financials AS SELECT v.entity, v.line_item, v.period, p.year, v.value "
+                 f"FROM ({values}) AS v LEFT JOIN _periods AS p USING (period)")
+
+
+def _duckdb_connection(frames: Optional[Dict[str, pd.DataFrame]], store: Optional[FinancialStore]):
+    """
+    DuckDB connection with `financials` and the store tables, external access disabled;
+    None when the store cannot be attached (an in-memory store or no sqlite extension)
+    """
+    if store is not None and store.path == ':memory:':
+        return None
+    # Only an already installed sqlite extension is loaded: never download one mid-query
+    conn = duckdb.connect(config={'autoinstall_known_extensions': False, 'autoload_known_extensions': False})
+    try:
+        if store is not None:
+            try:
+                conn.execute("LOAD sqlite")
+                conn.execute(f"ATTACH {_sql_string(os.path.abspath(store.path))} AS store (TYPE sqlite, READ_ONLY)")
+            except duckdb.Error:
+                conn.close()
+                return None
+            tables = conn.execute("SELECT table_name FROM duckdb_tables() WHERE database_name = 'store'").fetchall()
+            for (table,) in tables:
+                conn.execute(f'CREATE TEMP VIEW "{table}" AS SELECT * FROM store."{table}"')
+        conn.execute("SET enable_external_access = false")
+        if frames is not None:
+            _register_financials(conn, frames)
+        return conn
+    except Exception:
+        conn.close()
+        raise
+
+
+def _run_duckdb(sql: str, conn, timeout: float) -> pd.DataFrame:
+    try:
+        timer = threading.Timer(timeout, conn.interrupt)
+        timer.start()
+        try:
+            return conn.execute(sql).df()
+        except duckdb.InterruptException:
+            raise TimeoutError(f"Query exceeded {timeout:g}s.")
+        finally:
+            timer.cancel()
+    finally:
+        conn.close()
+
+
+def _run_sqlite(sql: str, financials: Optional[pd.DataFrame], store: Optional[FinancialStore],
+                timeout: float) -> pd.DataFrame:
+    conn = store.connect_read_only() if store is not None else sqlite3.connect(':memory:')
+    try:
+        if financials is not None:
+            conn.execute("CREATE TEMP TABLE financials "
+                         "(entity TEXT, line_item TEXT, period TEXT, year INTEGER, value REAL)")
+            conn.executemany("INSERT INTO financials VALUES (?, ?, ?, ?, ?)",
+                             financials.astype(object).where(financials.notna(), None).itertuples(index=False))
+        conn.execute("PRAGMA query_only = ON")
+        deadline = time.perf_counter() + timeout
+        conn.set_progress_handler(lambda: time.perf_counter() > deadline, 10000)
+        try:
+            return pd.read_sql_query(sql, conn)
+        except (sqlite3.OperationalError, pd.errors.DatabaseError) as e:
+            if 'interrupted' in str(e):
+                raise TimeoutError(f"Query exceeded {timeout:g}s.")
+            raise
+    finally:
+        conn.close()
+
+
+def run_query(sql: str, data: Union[pd.DataFrame, Dict[str, pd.DataFrame], None] = None,
+              store: Optional[FinancialStore] = None, max_rows: int = ModalConfig.SQL_MAX_ROWS,
+              timeout: float = ModalConfig.SQL_TIMEOUT_SECONDS) -> Tuple[Optional[pd.DataFrame], str]:
+    """
+    MCP Tool: Read-only SQL over parsed data and/or the financial store
+
+    Args:
+        sql: One SELECT statement, e.g.
+             "SELECT year, SUM(value) FROM financials WHERE lower(line_item) LIKE '%revenue%' GROUP BY year"
+             (LIKE ignores case on SQLite but not on DuckDB)
+        data: Consolidated DataFrame, or entity name -> DataFrame (the `financials` table)
+        store: FinancialStore whose tables are queried alongside
+        max_rows: Rows returned at most
+        timeout: Seconds before the query is interrupted
+
+    Returns:
+        tuple: (result DataFrame, status message with row count, engine and timings)
+    """
+    if data is None and store is None:
+        return None, "No data or store to query."
+    try:
+        start = time.perf_counter()
+        statement = _select(sql, max_rows + 1)
+        frames = _frames(data) if data is not None else None
+        conn = _duckdb_connection(frames, store) if duckdb is not None else None
+        if conn is not None:
+            loaded = time.perf_counter()
+            engine, result = 'DuckDB', _run_duckdb(statement, conn, timeout)
+        else:
+            financials = long_table(frames) if frames is not None else None
+            loaded = time.perf_counter()
+            engine, result = 'SQLite', _run_sqlite(statement, financials, store, timeout)
+        elapsed = time.perf_counter() - loaded
+
+        truncated = len(result) > max_rows
+        result = result.head(max_rows)
+        msg = (f"{len(result)} row{'' if len(result) == 1 else 's'}"
+               f"{f' (truncated at {max_rows})' if truncated else ''} in {elapsed * 1000:.1f} ms on {engine}"
+               f"{f' + {(loaded - start) * 1000:.1f} ms loading data' if frames is not None else ''}.")
+        return result, msg
+    except Exception as e:
+        return None, f"❌ Query failed: {str(e)}"
+
+
+def format_query_result(table: pd.DataFrame) -> str:
+    """Markdown table of a query result"""
+    def cell(value):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return ""
+        if isinstance(value, float):
+            return f"{value:,.2f}"
+        return str(value).replace('|', '\\|')
+
+    header = "| " + " | ".join(cell(c) for c in table.columns) + " |"
+    rule = "|" + "---|" * len(table.columns)
+    rows = ["| " + " | ".join(cell(v) for v in row) + " |" for row in table.astype(object).itertuples(index=False)]
+    return "\n".join([header, rule] + rows)
@@ -0,0 +1,233 @@
+"""
+Financial Store Module
+Embedded SQLite database for parsed statements, so cross-company and cross-period
+questions ("all companies with a current ratio below 1 in 2023") are answered with an
+indexed query instead of re-parsing Excel files.
+
+Tables (one row per entity / item / period):
+    entities    entity, frequency, fingerprint of the stored data, updated_at
+    line_items  parsed values in native periods          index (item, period)
+    aliases     raw label -> line item per entity
+    ratios      advanced ratio set on annual periods     index (ratio, period, value)
+    trends      trend statistics per line item           index (item)
+Ratio and trend tables are materialized when an entity is written.
+"""
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import quote
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from src.backend.cloud_config.config import ModalConfig
+from src.backend.mcp.advanced_ratios import AdvancedRatioAnalyzer, compute_ratios
+from src.backend.mcp.cache import fingerprint
+from src.backend.mcp.frames import Aliases, compact_frame
+from src.backend.mcp.periods import sort_labels, to_annual
+from src.backend.mcp.trend_analysis import TrendAnalyzer
+
+TREND_COLUMNS = ['slope', 'intercept', 'r_squared', 'cagr_pct', 'avg_growth_pct', 'latest_growth_pct',
+                 'cv_pct', 'mean', 'std', 'min', 'max', 'n_obs']
+OPERATORS = ('<', '<=', '>', '>=', '=', '!=')
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS entities (
+    entity TEXT PRIMARY KEY, frequency TEXT, fingerprint TEXT, updated_at REAL
+);
+CREATE TABLE IF NOT EXISTS line_items (
+    entity TEXT NOT NULL, item TEXT NOT NULL, position INTEGER NOT NULL, period TEXT NOT NULL, value REAL,
+    PRIMARY KEY (entity, item, period)
+);
+CREATE INDEX IF NOT EXISTS line_items_item_period ON line_items (item COLLATE NOCASE, period);
+CREATE TABLE IF NOT EXISTS aliases (
+    entity TEXT NOT NULL, alias TEXT NOT NULL, item TEXT NOT NULL, PRIMARY KEY (entity, alias)
+);
+CREATE INDEX IF NOT EXISTS aliases_alias ON aliases (alias COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS ratios (
+    entity TEXT NOT NULL, ratio TEXT NOT NULL, period TEXT NOT NULL, value REAL,
+    PRIMARY KEY (entity, ratio, period)
+);
+CREATE INDEX IF NOT EXISTS ratios_ratio_period_value ON ratios (ratio COLLATE NOCASE, period, value);
+CREATE TABLE IF NOT EXISTS trends (
+    entity TEXT NOT NULL, item TEXT NOT NULL, {', '.join(f'{c} REAL' for c in TREND_COLUMNS)},
+    PRIMARY KEY (entity, item)
+);
+CREATE INDEX IF NOT EXISTS trends_item ON trends (item COLLATE NOCASE);
+"""
+
+
+def _long(table: pd.DataFrame, id_name: str, entity: str) -> List[Tuple]:
+    """(entity, id, period, value) rows of a wide id x period table, missing values dropped"""
+    periods = np.array([str(c) for c in table.columns if c != id_name], dtype=object)
+    values = table.drop(columns=id_name).to_numpy(dtype=float)
+    rows, cols = np.nonzero(~np.isnan(values))
+    ids = table[id_name].astype(str).to_numpy(dtype=object)
+    return list(zip([entity] * len(rows), ids[rows].tolist(), periods[cols].tolist(), values[rows, cols].tolist()))
+
+
+class FinancialStore:
+    """SQLite-backed store of parsed statements and their materialized ratios and trends"""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: Database file (default ModalConfig.STORE_PATH; ':memory:' for a scratch store)
+        """
+        self.path = path or ModalConfig.STORE_PATH
+        if self.path != ':memory:' and os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if self.path != ':memory:':
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def connect_read_only(self) -> sqlite3.Connection:
+        """A separate connection that cannot change the store (a ':memory:' store is copied)"""
+        if self.path == ':memory:':
+            conn = sqlite3.connect(':memory:', check_same_thread=False)
+            with self._lock:
+                self._conn.backup(conn)
+            return conn
+        return sqlite3.connect(f"file:{quote(os.path.abspath(self.path))}?mode=ro", uri=True,
+                               check_same_thread=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------ writes
+
+    def write(self, entity: str, data: pd.DataFrame, ratios: Optional[pd.DataFrame] = None,
+              trends: Optional[pd.DataFrame] = None) -> bool:
+        """
+        Stores an entity's consolidated DataFrame, replacing what was stored before, and
+        materializes its ratios (annual periods) and trend statistics.
+
+        Args:
+            ratios: Ratio x annual period table already computed for data (e.g.
+                    IncrementalAnalysis.ratios of annual data), instead of recomputing it
+            trends: TrendAnalyzer.trend_table() layout already computed for data
+
+        Returns:
+            bool: False when the same data was already stored (nothing written)
+        """
+        data = compact_frame(data)
+        key = fingerprint(data, sorted(data.attrs.get('aliases', {}).items()), data.attrs.get('frequency'))
+        stored = self._fetch("SELECT fingerprint FROM entities WHERE entity = ?", (entity,))
+        if stored and stored[0][0] == key:
+            return False
+
+        items = data.reset_index(drop=True)
+        positions = {str(item): pos for pos, item in reversed(list(enumerate(items['Line Item'])))}
+        values = [(e, item, positions[item], period, value)
+                  for e, item, period, value in _long(items.drop_duplicates('Line Item'), 'Line Item', entity)]
+
+        if ratios is None:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                ratios = pd.DataFrame(compute_ratios(AdvancedRatioAnalyzer(to_annual(data)).extract_items())).T
+        ratios = ratios.replace([np.inf, -np.inf], np.nan).rename_axis('ratio').reset_index()
+        ratios.columns = [str(c) for c in ratios.columns]
+
+        if trends is None:
+            trends = TrendAnalyzer(data).trend_table()
+        trends = trends.drop_duplicates('Line Item')
+        trend_rows = [(entity, str(row[0]), *[None if pd.isna(v) else float(v) for v in row[1:]])
+                      for row in trends[['Line Item'] + TREND_COLUMNS].itertuples(index=False)]
+
+        with self._lock, self._conn:
+            for table in ('line_items', 'aliases', 'ratios', 'trends'):
+                self._conn.execute(f"DELETE FROM {table} WHERE entity = ?", (entity,))
+            self._conn.executemany("INSERT INTO line_items VALUES (?, ?, ?, ?, ?)", values)
+            self._conn.executemany("INSERT INTO aliases VALUES (?, ?, ?)",
+                                   [(entity, alias, item) for alias, item in data.attrs.get('aliases', {}).items()])
+            self._conn.executemany("INSERT INTO ratios VALUES (?, ?, ?, ?)", _long(ratios, 'ratio', entity))
+            self._conn.executemany(f"INSERT INTO trends VALUES ({', '.join('?' * (2 + len(TREND_COLUMNS)))})",
+                                   trend_rows)
+            self._conn.execute("INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?)",
+                               (entity, data.attrs.get('frequency'), key, time.time()))
+        return True
+
+    def write_portfolio(self, frames: Dict[str, pd.DataFrame]) -> int:
+        """Stores several entities; returns how many changed"""
+        return sum(self.write(entity, df) for entity, df in frames.items())
+
+    def delete(self, entity: str) -> None:
+        with self._lock, self._conn:
+            for table in ('line_items', 'aliases', 'ratios', 'trends', 'entities'):
+                self._conn.execute(f"DELETE FROM {table} WHERE entity = ?", (entity,))
+
+    # ------------------------------------------------------------------ reads
+
+    def _fetch(self, sql: str, params: Sequence = ()) -> List[Tuple]:
+        with self._lock:
+            return self._conn.execute(sql, list(params)).fetchall()
+
+    def query(self, sql: str, params: Sequence = ()) -> pd.DataFrame:
+        """Runs a SQL query against the store"""
+        with self._lock:
+            return pd.read_sql_query(sql, self._conn, params=list(params))
+
+    def entities(self) -> List[str]:
+        return [row[0] for row in self._fetch("SELECT entity FROM entities ORDER BY entity")]
+
+    def frame(self, entity: str) -> Optional[pd.DataFrame]:
+        """The stored consolidated DataFrame of an entity (rows and aliases as written), None if unknown"""
+        meta = self._fetch("SELECT frequency FROM entities WHERE entity = ?", (entity,))
+        if not meta:
+            return None
+        values = self.query("SELECT item, position, period, value FROM line_items WHERE entity = ?", (entity,))
+        wide = values.pivot(index=['position', 'item'], columns='period', values='value').sort_index()
+        wide = wide.reindex(columns=sort_labels(wide.columns)).reset_index(level='position', drop=True)
+        wide = wide.rename_axis('Line Item').reset_index()
+        wide.columns.name = None
+        data = compact_frame(wide)
+        data.attrs['aliases'] = Aliases(self._fetch("SELECT alias, item FROM aliases WHERE entity = ? ORDER BY rowid",
+                                                 (entity,)))
+        data.attrs['frequency'] = meta[0][0]
+        return data
+
+    def screen(self, ratio: str, op: str, threshold: float, period: Optional[str] = None) -> pd.DataFrame:
+        """
+        Entities whose ratio satisfies `ratio op threshold`, e.g. ('Current Ratio', '<', 1, '2023')
+
+        Returns:
+            DataFrame: entity, period, value (by period, then value)
+        """
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator '{op}' (use {OPERATORS}).")
+        sql = f"SELECT entity, period, value FROM ratios WHERE ratio = ? COLLATE NOCASE AND value {op} ?"
+        params: List[Union[str, float]] = [ratio, threshold]
+        if period is not None:
+            sql += " AND period = ?"
+            params.append(str(period))
+        return self.query(sql + " ORDER BY period, value", params)
+
+    def item_history(self, item: str, entities: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        One line item (by row label or alias, case-insensitive) across entities
+
+        Returns:
+            DataFrame: entity x period values
+        """
+        sql = """
+            SELECT entity, period, value FROM line_items WHERE item = ?1 COLLATE NOCASE
+            UNION
+            SELECT l.entity, l.period, l.value FROM aliases a
+            JOIN line_items l ON l.entity = a.entity AND l.item = a.item
+            WHERE a.alias = ?1 COLLATE NOCASE
+        """
+        values = self.query(sql, [item])
+        if entities is not None:
+            values = values[values['entity'].isin(list(entities))]
+        table = values.pivot_table(index='entity', columns='period', values='value', aggfunc='first')
+        return table.reindex(columns=sort_labels(table.columns))
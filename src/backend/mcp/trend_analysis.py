@@ -5,7 +5,80 @@ Identifies trends, anomalies, and unusual patterns in financial data
 import pandas as pd
 import numpy as np
 from typing import Tuple, Dict, List, Optional
-from scipy import stats
+
+from src.backend.mcp.anomalies import DEFAULT_THRESHOLD, anomaly_table, format_anomaly_table, score_anomalies
+from src.backend.mcp.cache import memoize_analyzer
+from src.backend.mcp.changepoints import structural_breaks, format_breaks
+from src.backend.mcp.frames import LineItemIndex, compact_frame
+from src.backend.mcp.periods import next_labels, periods_per_year, season_positions
+
+REPORT_VERSION = 1  # Bump when the report changes (invalidates memoized reports)
+
+
+def trend_statistics(values: np.ndarray, per_year: int = 1) -> Dict[str, np.ndarray]:
+    """
+    Trend statistics for every row of a (N, T) value matrix in one pass. Missing values
+    (NaN) are skipped; the regression uses each value's period position, so gaps keep
+    their place in time.
+
+    Args:
+        values: (N, T) values, periods in order
+        per_year: Periods per year (4 quarterly, 12 monthly): YoY growth compares with
+                  the same period a year earlier and CAGR is annualized
+
+    Returns:
+        dict: (N,) arrays 'slope' (per period), 'intercept', 'r_squared', 'cagr_pct',
+              'avg_growth_pct', 'latest_growth_pct', 'cv_pct', 'mean', 'std', 'min', 'max',
+              'n_obs', 'last_position', plus 'yoy_pct' (N, T - per_year) YoY growth
+    """
+    Y = np.asarray(values, dtype=float)
+    valid = ~np.isnan(Y)
+    n = valid.sum(axis=1).astype(float)
+    x = np.broadcast_to(np.arange(Y.shape[1], dtype=float), Y.shape)
+    y0 = np.where(valid, Y, 0.0)
+    x0 = np.where(valid, x, 0.0)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Closed-form OLS y = intercept + slope * x on centred sums
+        mean_x, mean_y = x0.sum(axis=1) / n, y0.sum(axis=1) / n
+        dx = np.where(valid, x - mean_x[:, None], 0.0)
+        dy = np.where(valid, Y - mean_y[:, None], 0.0)
+        sxx, syy, sxy = (dx * dx).sum(axis=1), (dy * dy).sum(axis=1), (dx * dy).sum(axis=1)
+        slope = sxy / sxx
+        intercept = mean_y - slope * mean_x
+        r_squared = np.where(syy > 0, sxy ** 2 / (sxx * syy), np.nan)
+
+        std = np.where(n > 1, np.sqrt(syy / np.maximum(n - 1, 1)), np.nan)
+        cv_pct = std / np.abs(mean_y) * 100
+
+        # Growth on the same period a year earlier (0 where that value is 0)
+        prev, curr = Y[:, :-per_year], Y[:, per_year:]
+        yoy_pct = np.where(prev != 0, (curr - prev) / np.abs(prev) * 100, 0.0)
+        yoy_pct[np.isnan(prev) | np.isnan(curr)] = np.nan
+        has_growth = ~np.isnan(yoy_pct)
+        avg_growth_pct = np.where(has_growth.any(axis=1),
+                                  np.where(has_growth, yoy_pct, 0.0).sum(axis=1) / has_growth.sum(axis=1), np.nan)
+        latest_idx = yoy_pct.shape[1] - 1 - np.argmax(has_growth[:, ::-1], axis=1)
+        latest_growth_pct = np.where(has_growth.any(axis=1),
+                                     np.take_along_axis(yoy_pct, latest_idx[:, None], axis=1)[:, 0], np.nan)
+
+        # Compound growth between the first and last observed values (both positive)
+        first_pos = np.argmax(valid, axis=1)
+        last_pos = Y.shape[1] - 1 - np.argmax(valid[:, ::-1], axis=1)
+        first = np.take_along_axis(Y, first_pos[:, None], axis=1)[:, 0]
+        last = np.take_along_axis(Y, last_pos[:, None], axis=1)[:, 0]
+        span = (last_pos - first_pos).astype(float)
+        cagr_pct = np.where((first > 0) & (last > 0) & (span > 0),
+                            ((last / first) ** (per_year / span) - 1) * 100, np.nan)
+
+    return {
+        'slope': slope, 'intercept': intercept, 'r_squared': r_squared, 'cagr_pct': cagr_pct,
+        'avg_growth_pct': avg_growth_pct, 'latest_growth_pct': latest_growth_pct, 'cv_pct': cv_pct,
+        'mean': mean_y, 'std': std, 'min': np.where(n > 0, np.where(valid, Y, np.inf).min(axis=1), np.nan),
+        'max': np.where(n > 0, np.where(valid, Y, -np.inf).max(axis=1), np.nan), 'n_obs': n.astype(int),
+        'last_position': last_pos, 'yoy_pct': yoy_pct,
+    }
+
 
 class TrendAnalyzer:
     """Analyzes trends and detects anomalies in financial data"""
@@ -16,52 +89,74 @@ class TrendAnalyzer:
         Args:
             df: DataFrame with financial data across multiple years
         """
-        self.df = df
+        self.df = compact_frame(df)
+        self.line_items = LineItemIndex(self.df)
         self.anomalies = []
+        self.breaks = None
+        self._trends = None
+        self._yoy = None
     
-    def _get_series(self, keywords: list) -> Optional[pd.Series]:
-        """Safely retrieve financial line item by keywords"""
+    def _find_row(self, keywords: list) -> Optional[int]:
+        """Position of the first line item matching the keywords with numeric data"""
         for key in keywords:
-            match = self.df[self.df['Line Item'].astype(str).str.lower().str.contains(key.lower(), na=False)]
-            if not match.empty:
-                numeric_data = match.iloc[0, 1:].apply(pd.to_numeric, errors='coerce')
-                if numeric_data.notna().sum() > 0:
-                    return numeric_data
+            pos = self.line_items.first(key)
+            if pos is not None and self.df.iloc[pos, 1:].notna().sum() > 0:
+                return pos
         return None
     
-    def detect_anomalies(self, series: pd.Series, name: str, threshold_zscore: float = 2.0) -> List[Tuple[str, str]]:
+    def _get_series(self, keywords: list) -> Optional[pd.Series]:
+        """Safely retrieve financial line item by keywords"""
+        pos = self._find_row(keywords)
+        return None if pos is None else self.df.iloc[pos, 1:]
+    
+    def _compute_trends(self):
+        """Trend statistics for every line item (one vectorized pass, computed once)"""
+        if self._trends is None:
+            periods = self.df.columns[1:]
+            per_year = periods_per_year(periods)
+            values = self.df.iloc[:, 1:].to_numpy(dtype=float)
+            stats = trend_statistics(values, per_year=per_year)
+            yoy = stats.pop('yoy_pct')
+            self._trends = pd.DataFrame(stats)
+            self._trends.insert(0, 'Line Item', self.df['Line Item'].to_numpy())
+            self._yoy = pd.DataFrame(yoy, columns=periods[per_year:])
+            self._yoy.insert(0, 'Line Item', self.df['Line Item'].to_numpy())
+    
+    def trend_table(self) -> pd.DataFrame:
+        """Slope, intercept, R², CAGR, growth and volatility per line item (rows as in the data)"""
+        self._compute_trends()
+        return self._trends
+    
+    def yoy_growth(self) -> pd.DataFrame:
+        """Year-over-year growth (%) per line item and period"""
+        self._compute_trends()
+        return self._yoy
+    
+    def detect_anomalies(self, series: pd.Series, name: str,
+                         threshold_zscore: float = DEFAULT_THRESHOLD) -> List[Tuple[str, str]]:
         """
-        Detect statistical anomalies using Z-score method
-        
+        Anomalies of one series by the robust level and yoy scores of anomalies.score_anomalies
+        (the definition anomaly_table uses)
+
         Args:
-            series: Data series
+            series: Values indexed by period label
             name: Name of the metric
-            threshold_zscore: Z-score threshold (2.0 = 95% confidence)
-        
+            threshold_zscore: Minimum |robust z| to report
+
         Returns:
-            List of (year, description) anomaly tuples
+            List of (period, description) anomaly tuples
         """
-        anomalies_found = []
-        
         valid_series = series.dropna()
-        if len(valid_series) < 2:
-            return anomalies_found
-        
-        # Calculate Z-scores
-        mean = valid_series.mean()
-        std = valid_series.std()
-        
-        if std == 0:  # Constant value
-            return anomalies_found
-        
-        z_scores = np.abs((valid_series - mean) / std)
-        
-        for year, z_score in z_scores.items():
-            if z_score > threshold_zscore:
-                value = valid_series[year]
-                pct_from_mean = ((value - mean) / abs(mean)) * 100 if mean != 0 else 0
-                anomalies_found.append((year, f"{name}: {pct_from_mean:+.1f}% from mean (Z={z_score:.2f})"))
-        
+        labels = list(valid_series.index)
+        values = valid_series.to_numpy(dtype=float)[None, None, :]
+        scores = score_anomalies(values, ('level', 'yoy'), season_positions(labels), periods_per_year(labels))
+
+        anomalies_found = []
+        for t, period in enumerate(labels):
+            method, z = max(((m, s[0, 0, t]) for m, s in scores.items()),
+                            key=lambda ms: np.nan_to_num(abs(ms[1]), nan=0.0))
+            if np.isfinite(z) and abs(z) > threshold_zscore:
+                anomalies_found.append((period, f"{name}: unusual {method} (robust z={z:+.2f})"))
         return anomalies_found
     
     def analyze_all_trends(self) -> Tuple[str, str]:
@@ -82,29 +177,22 @@ class TrendAnalyzer:
         # ============ TREND ANALYSIS ============
         report += "**Overall Trend Analysis**\n\n"
         
+        trends, yoy = self.trend_table(), self.yoy_growth()
         for keywords, metric_name in key_metrics:
-            series = self._get_series(keywords)
-            if series is not None and len(series.dropna()) > 1:
+            pos = self._find_row(keywords)
+            if pos is not None and trends['n_obs'].iloc[pos] > 1:
                 report += f"**{metric_name}:**\n"
                 
-                # Calculate growth rates
-                valid_series = series.dropna()
-                values = valid_series.values
-                years = valid_series.index.tolist()
-                
                 # Year-over-year growth
-                yoy_growth = []
-                for i in range(1, len(values)):
-                    growth = ((values[i] - values[i-1]) / abs(values[i-1])) * 100 if values[i-1] != 0 else 0
-                    yoy_growth.append(growth)
-                    year = years[i]
+                growth_row = yoy.iloc[pos, 1:].dropna()
+                for year, growth in growth_row.items():
                     direction = "↗️" if growth > 0 else "↘️"
                     report += f"• {year}: {growth:+.1f}% {direction}\n"
                 
                 # Trend direction
-                if len(yoy_growth) > 0:
-                    avg_growth = np.mean(yoy_growth)
-                    latest_growth = yoy_growth[-1] if len(yoy_growth) > 0 else 0
+                if len(growth_row) > 0:
+                    avg_growth = trends['avg_growth_pct'].iloc[pos]
+                    latest_growth = trends['latest_growth_pct'].iloc[pos]
                     
                     trend_text = ""
                     if avg_growth > 5:
@@ -127,20 +215,18 @@ class TrendAnalyzer:
                 report += "\n"
         
         # ============ ANOMALY DETECTION ============
-        report += "**Anomalies Detected**\n\n"
+        report += "**Anomalies Detected** (all line items and ratios, robust z-scores)\n\n"
         
-        all_anomalies = []
-        for keywords, metric_name in key_metrics:
-            series = self._get_series(keywords)
-            if series is not None:
-                anomalies = self.detect_anomalies(series, metric_name, threshold_zscore=2.0)
-                all_anomalies.extend(anomalies)
+        self.anomalies = anomaly_table(self.df, methods=('level', 'yoy'))
+        report += format_anomaly_table(self.anomalies, limit=10)
         
-        if all_anomalies:
-            for year, description in sorted(all_anomalies):
-                report += f"⚠️ {year}: {description}\n"
-        else:
-            report += "✅ No significant anomalies detected\n"
+        report += "\n"
+        
+        # ============ STRUCTURAL BREAKS ============
+        report += "**Structural Breaks** (growth, margin and leverage regimes)\n\n"
+        
+        self.breaks = structural_breaks(self.df)
+        report += format_breaks(self.breaks)
         
         report += "\n"
         
@@ -159,13 +245,14 @@ class TrendAnalyzer:
         
         report += "**Volatility Metrics (CV = Coefficient of Variation)**\n\n"
         
+        trends = self.trend_table()
         for keywords, name in metrics_to_check:
-            series = self._get_series(keywords)
-            if series is not None and len(series.dropna()) > 1:
-                valid_series = series.dropna()
+            pos = self._find_row(keywords)
+            if pos is not None and trends['n_obs'].iloc[pos] > 1:
+                row = trends.iloc[pos]
                 
                 # Coefficient of Variation
-                cv = (valid_series.std() / abs(valid_series.mean())) * 100
+                cv = row['cv_pct']
                 
                 # Categorize volatility
                 if cv < 10:
@@ -179,9 +266,9 @@ class TrendAnalyzer:
                 
                 report += f"**{name}:**\n"
                 report += f"• Coefficient of Variation: {cv:.1f}% ({volatility})\n"
-                report += f"• Mean: KES {valid_series.mean():,.0f}\n"
-                report += f"• Std Dev: KES {valid_series.std():,.0f}\n"
-                report += f"• Range: KES {valid_series.min():,.0f} to KES {valid_series.max():,.0f}\n\n"
+                report += f"• Mean: KES {row['mean']:,.0f}\n"
+                report += f"• Std Dev: KES {row['std']:,.0f}\n"
+                report += f"• Range: KES {row['min']:,.0f} to KES {row['max']:,.0f}\n\n"
         
         return report
     
@@ -190,28 +277,22 @@ class TrendAnalyzer:
         
         report = "### 🔮 Simple Trend Forecast\n\n"
         
-        revenue = self._get_series(['Revenue', 'Total Revenue', 'Sales'])
+        pos = self._find_row(['Revenue', 'Total Revenue', 'Sales'])
+        trends = self.trend_table()
         
-        if revenue is not None and len(revenue.dropna()) > 2:
-            valid_data = revenue.dropna()
-            
-            # Prepare data for linear regression
-            x = np.arange(len(valid_data))
-            y = valid_data.values
-            
-            # Linear regression
-            slope, intercept, r_value, p_value, std_err = stats.linregress(x, y)
+        if pos is not None and trends['n_obs'].iloc[pos] > 2:
+            row = trends.iloc[pos]
             
-            # Forecast next 3 periods
-            forecast_x = np.arange(len(valid_data), len(valid_data) + 3)
-            forecast_y = slope * forecast_x + intercept
+            # Linear trend from the batched regression, extended 3 periods
+            forecast_x = row['last_position'] + np.arange(1, 4)
+            forecast_y = row['slope'] * forecast_x + row['intercept']
             
             report += f"**Revenue Forecast (Linear Extrapolation)**\n"
-            report += f"• Model R²: {r_value**2:.3f}\n"
-            report += f"• Annual Trend: KES {slope:,.0f}\n\n"
+            report += f"• Model R²: {row['r_squared']:.3f}\n"
+            unit = {1: "Annual", 4: "Quarterly", 12: "Monthly"}[periods_per_year(self.df.columns[1:])]
+            report += f"• {unit} Trend: KES {row['slope']:,.0f}\n\n"
             
-            last_year = valid_data.index[-1]
-            forecast_years = [str(int(last_year) + i) for i in range(1, 4)]
+            forecast_years = next_labels(list(self.df.columns[1:2 + int(row['last_position'])]), 3)
             
             report += "Projected Revenue:\n"
             for i, (year, value) in enumerate(zip(forecast_years, forecast_y)):
@@ -220,6 +301,7 @@ class TrendAnalyzer:
         return report
 
 
+@memoize_analyzer(REPORT_VERSION)
 def analyze_trends_and_anomalies(data: pd.DataFrame) -> Tuple[str, str]:
     """
     Main MCP Tool: Trend and Anomaly Analysis
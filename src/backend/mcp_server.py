@@ -9,8 +9,10 @@ from typing import Optional
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 # Import existing backend modules
-from src.backend.mcp.parsing import parse_file
+from src.backend.mcp.parsing import parse_file, frame_to_json, frame_from_json
+from src.backend.mcp.periods import to_annual
 from src.backend.mcp.sentiment import analyze_sentiment
+from src.backend.mcp.sections import analyze_section_sentiment
 from src.backend.mcp.ratios import calculate_ratios
 from src.backend.mcp.advanced_ratios import analyze_financial_ratios
 from src.backend.mcp.cashflow_analysis import analyze_cash_flow
@@ -18,11 +20,28 @@ from src.backend.mcp.balance_sheet_analysis import analyze_balance_sheet
 from src.backend.mcp.income_statement_analysis import analyze_income_statement
 from src.backend.mcp.trend_analysis import analyze_trends_and_anomalies
 from src.backend.mcp.extraction import extract_financial_data
-from src.backend.mcp.forecasting import generate_forecast
+from src.backend.mcp.forecasting import forecast_with_intervals, forecast_all_line_items, format_forecast_table, format_interval_forecast
+from src.backend.mcp.projection import project_financial_statements
+from src.backend.mcp.scenarios import analyze_scenarios, parse_shocks
+from src.backend.mcp.backtesting import backtest_line_items, format_backtest_table
+from src.backend.mcp.reconciliation import reconciled_forecast, format_reconciled_table
+from src.backend.mcp.anomalies import screen_anomalies, format_anomaly_table
+from src.backend.mcp.store import FinancialStore
+from src.backend.mcp.sql_query import run_query, format_query_result
+from src.backend.cloud_config.config import ModalConfig
 
 # Initialize MCP Server
 mcp = FastMCP("Samani Financial Agent")
 
+# Embedded database of stored companies (ModalConfig.STORE_PATH), opened on first use
+_store = None
+
+def get_store():
+    global _store
+    if _store is None:
+        _store = FinancialStore()
+    return _store
+
 class MockFile:
     """Helper class to mimic the file object expected by the parser"""
     def __init__(self, path):
@@ -51,23 +70,38 @@ def parse_financial_file(file_path: str) -> str:
             "status": "success",
             "logs": logs,
             "text_content": text_content,
-            # Convert DataFrame to JSON records for portability
-            "financial_data": data_df.to_json(orient='records') if data_df is not None else None
+            # Convert DataFrame to JSON records for portability (aliases as rows)
+            "financial_data": frame_to_json(data_df) if data_df is not None else None
         }
         return json.dumps(result)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 @mcp.tool()
-def analyze_financial_text_sentiment(text: str) -> str:
+def analyze_financial_text_sentiment(text: str, chunk_budget: int = 20, time_budget: Optional[float] = None) -> str:
     """
     Analyzes the sentiment/tone of financial text (e.g., management commentary from an Annual Report).
+    Text segments are sampled across the whole document within `chunk_budget` segments
+    and/or `time_budget` seconds; the score is reported with a 95% confidence interval.
     Returns a formatted markdown report.
     """
     if not text:
         return "Error: No text provided."
         
-    report, msg = analyze_sentiment(text)
+    report, msg = analyze_sentiment(text, chunk_budget=chunk_budget, time_budget=time_budget)
+    return f"{report}\n\n(Status: {msg})"
+
+@mcp.tool()
+def analyze_report_section_sentiment(text: str, section: str = "") -> str:
+    """
+    Splits annual-report text into sections (Chairman's Statement, MD&A, Risk Factors, ...)
+    and reports FinBERT sentiment for the named section, or for every section if none is given.
+    Section scores are cached, so re-submitting a revised report only re-scores changed sections.
+    """
+    if not text:
+        return "Error: No text provided."
+
+    report, msg = analyze_section_sentiment(text, section)
     return f"{report}\n\n(Status: {msg})"
 
 @mcp.tool()
@@ -78,7 +112,7 @@ def calculate_standard_ratios(financial_data_json: str) -> str:
     """
     try:
         if not financial_data_json: return "Error: No data provided."
-        df = pd.read_json(financial_data_json)
+        df = to_annual(frame_from_json(financial_data_json))
         report, msg = calculate_ratios(df)
         return report
     except ValueError:
@@ -94,7 +128,7 @@ def analyze_advanced_ratios(financial_data_json: str) -> str:
     """
     try:
         if not financial_data_json: return "Error: No data provided."
-        df = pd.read_json(financial_data_json)
+        df = to_annual(frame_from_json(financial_data_json))
         report, msg = analyze_financial_ratios(df)
         return report
     except Exception as e:
@@ -108,7 +142,7 @@ def analyze_cash_flows(financial_data_json: str) -> str:
     """
     try:
         if not financial_data_json: return "Error: No data provided."
-        df = pd.read_json(financial_data_json)
+        df = to_annual(frame_from_json(financial_data_json))
         report, msg = analyze_cash_flow(df)
         return report
     except Exception as e:
@@ -122,7 +156,7 @@ def analyze_balance_sheet(financial_data_json: str) -> str:
     """
     try:
         if not financial_data_json: return "Error: No data provided."
-        df = pd.read_json(financial_data_json)
+        df = to_annual(frame_from_json(financial_data_json))
         report, msg = analyze_balance_sheet(df)
         return report
     except Exception as e:
@@ -136,7 +170,7 @@ def analyze_income_statement(financial_data_json: str) -> str:
     """
     try:
         if not financial_data_json: return "Error: No data provided."
-        df = pd.read_json(financial_data_json)
+        df = to_annual(frame_from_json(financial_data_json))
         report, msg = analyze_income_statement(df)
         return report
     except Exception as e:
@@ -150,30 +184,56 @@ def detect_trends_and_anomalies(financial_data_json: str) -> str:
     """
     try:
         if not financial_data_json: return "Error: No data provided."
-        df = pd.read_json(financial_data_json)
+        df = frame_from_json(financial_data_json)
         report, msg = analyze_trends_and_anomalies(df)
         return report
     except Exception as e:
         return f"Error: {str(e)}"
 
+@mcp.tool()
+def screen_portfolio_anomalies(portfolio_json: str, threshold: float = 3.5, limit: int = 25) -> str:
+    """
+    Screens one company or a whole portfolio for anomalies across every line item and
+    ratio (robust z-scores: deviation from trend, unusual growth, and - with 4+ companies -
+    growth out of line with peers). Returns the top anomalies ranked by strength.
+    'portfolio_json': a 'financial_data' JSON string, or a JSON object mapping company
+    name -> its 'financial_data' JSON string.
+    """
+    try:
+        if not portfolio_json: return "Error: No data provided."
+        parsed = json.loads(portfolio_json)
+        if isinstance(parsed, dict):
+            data = {name: frame_from_json(v if isinstance(v, str) else json.dumps(v))
+                    for name, v in parsed.items()}
+        else:
+            data = frame_from_json(portfolio_json)
+
+        table, msg = screen_anomalies(data, threshold=threshold)
+        if table is None:
+            return msg
+        return f"### 🚨 Anomaly Screen\n\n{format_anomaly_table(table, limit=limit)}\nAnalysis: {msg}"
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
 @mcp.tool()
 def forecast_metric(financial_data_json: str, metric_name: str, years: int = 3) -> str:
     """
-    Forecasts a specific financial metric (e.g., 'Revenue', 'Net Income') for N years.
+    Forecasts a specific financial metric (e.g., 'Revenue', 'Net Income') for N years,
+    with simulated 80% and 95% prediction intervals.
     Requires the 'financial_data' JSON string.
     """
     try:
         if not financial_data_json: return "Error: No data provided."
-        df = pd.read_json(financial_data_json)
+        df = frame_from_json(financial_data_json)
         
         # Extract the specific series
         series, msg = extract_financial_data(df, metric_name)
         
         if series is not None:
-            forecast, f_msg = generate_forecast(series, steps=years)
+            forecast, f_msg = forecast_with_intervals(series, steps=years)
             if forecast is not None:
-                formatted_forecast = [round(x, 2) for x in forecast.values]
-                return f"### 🔮 Forecast for {metric_name}\nNext {years} Years: {formatted_forecast}\n\nAnalysis: {f_msg}"
+                return f"{format_interval_forecast(forecast, metric_name)}\n\nAnalysis: {f_msg}"
             return f_msg
         else:
             return f"Could not find data for '{metric_name}' to forecast."
@@ -181,6 +241,167 @@ def forecast_metric(financial_data_json: str, metric_name: str, years: int = 3)
     except Exception as e:
         return f"Error: {str(e)}"
 
+@mcp.tool()
+def forecast_all_metrics(financial_data_json: str, years: int = 3, statement: str = "") -> str:
+    """
+    Forecasts every numeric line item for N years in one call (Holt-Winters, fitted in parallel).
+    Optionally restrict to one statement: 'income_statement', 'balance_sheet' or 'cash_flow'.
+    Returns a markdown table (item x year) with fit diagnostics.
+    Requires the 'financial_data' JSON string.
+    """
+    try:
+        if not financial_data_json: return "Error: No data provided."
+        df = frame_from_json(financial_data_json)
+
+        table, msg = forecast_all_line_items(df, steps=years, statement=statement or None)
+        if table is None:
+            return msg
+        return f"{format_forecast_table(table)}\n\nAnalysis: {msg}"
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@mcp.tool()
+def backtest_forecast_models(financial_data_json: str, horizon: int = 3, statement: str = "") -> str:
+    """
+    Measures forecast accuracy of damped Holt, linear trend, naive and drift models on
+    every line item by rolling-origin backtesting, and picks the best model per item.
+    Optionally restrict to one statement: 'income_statement', 'balance_sheet' or 'cash_flow'.
+    Returns a markdown MASE table with MAPE/MASE summaries.
+    Requires the 'financial_data' JSON string.
+    """
+    try:
+        if not financial_data_json: return "Error: No data provided."
+        df = to_annual(frame_from_json(financial_data_json))
+
+        table, msg = backtest_line_items(df, horizon=horizon, statement=statement or None)
+        if table is None:
+            return msg
+        return f"{format_backtest_table(table)}\n\nAnalysis: {msg}"
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@mcp.tool()
+def forecast_reconciled_statements(financial_data_json: str, steps: int = 3, method: str = "mint_diag") -> str:
+    """
+    Forecasts the canonical statement items and reconciles them so subtotals equal the
+    sum of their components (e.g. Current Assets = Cash + Receivables + Inventory) for
+    every identity the reported history satisfies.
+    'method': 'mint_diag' (adjust the least predictable items most), 'ols' or 'bottom_up'.
+    Requires the 'financial_data' JSON string.
+    """
+    try:
+        if not financial_data_json: return "Error: No data provided."
+        df = to_annual(frame_from_json(financial_data_json))
+
+        table, msg = reconciled_forecast(df, steps=steps, method=method)
+        if table is None:
+            return msg
+        return f"{format_reconciled_table(table)}\n\nAnalysis: {msg}"
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@mcp.tool()
+def project_three_statements(financial_data_json: str, years: int = 3) -> str:
+    """
+    Projects a balanced income statement, balance sheet and cash flow statement N years
+    ahead from drivers estimated on the company's history (growth, cost ratios, working
+    capital, capex, tax, interest, payout), under Base, Downside and Upside scenarios.
+    Cash is the balancing item. Requires the 'financial_data' JSON string.
+    """
+    try:
+        if not financial_data_json: return "Error: No data provided."
+        df = to_annual(frame_from_json(financial_data_json))
+
+        report, msg = project_financial_statements(df, years=years)
+        return f"{report}\n\nAnalysis: {msg}" if report else msg
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@mcp.tool()
+def run_ratio_scenarios(financial_data_json: str, scenario: str = "", n_scenarios: int = 5000) -> str:
+    """
+    Stress-tests the ratio set (ROE, interest coverage, margins, liquidity, leverage).
+    'scenario' states shocks in plain words, e.g. "revenue falls 10% and finance costs rise 20%".
+    Returns the stated scenario's ratios, a Monte Carlo distribution around it and a
+    tornado ranking of which factor moves ROE and interest coverage most.
+    Requires the 'financial_data' JSON string.
+    """
+    try:
+        if not financial_data_json: return "Error: No data provided."
+        df = to_annual(frame_from_json(financial_data_json))
+
+        report, msg = analyze_scenarios(df, parse_shocks(scenario), n_scenarios=n_scenarios)
+        return f"{report}\n\nAnalysis: {msg}" if report else msg
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@mcp.tool()
+def store_company_financials(company: str, financial_data_json: str) -> str:
+    """
+    Saves a company's parsed statements to the local financial database, with its ratios
+    and trend statistics, so later cross-company questions need no re-parsing.
+    Requires the 'financial_data' JSON string obtained from `parse_financial_file`.
+    """
+    try:
+        if not financial_data_json: return "Error: No data provided."
+        df = frame_from_json(financial_data_json)
+        changed = get_store().write(company, df)
+        return (f"Stored {company}: {len(df)} line items." if changed
+                else f"{company} is already stored with the same data.")
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@mcp.tool()
+def screen_stored_companies(ratio: str, operator: str, threshold: float, period: str = "") -> str:
+    """
+    Lists stored companies whose ratio meets a condition, e.g. ratio='Current Ratio',
+    operator='<', threshold=1, period='2023' (all periods if empty).
+    Operators: <, <=, >, >=, =, !=.
+    """
+    try:
+        table = get_store().screen(ratio, operator, threshold, period or None)
+        if table.empty:
+            return f"No stored company has {ratio} {operator} {threshold}" + (f" in {period}." if period else ".")
+        rows = "\n".join(f"| {r.entity} | {r.period} | {r.value:,.2f} |" for r in table.itertuples())
+        return f"| Company | Period | {ratio} |\n|---|---|---|\n{rows}"
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+@mcp.tool()
+def query_financial_data(sql: str, financial_data_json: str = "", company: str = "",
+                         include_stored: Optional[bool] = None, max_rows: int = 100) -> str:
+    """
+    Runs one read-only SQL SELECT for custom slices: sums, filters and joins across line
+    items, years and companies. Tables:
+      financials(entity, line_item, period, year, value) - the 'financial_data' JSON string
+        from `parse_financial_file`, if given (entity = company)
+      line_items(entity, item, position, period, value), aliases(entity, alias, item),
+      ratios(entity, ratio, period, value), trends(entity, item, slope, cagr_pct, ...) -
+        the stored companies, if include_stored (default: only when no financial_data_json is given)
+    Example: SELECT year, SUM(value) FROM financials WHERE lower(line_item) LIKE '%revenue%' GROUP BY year
+    Returns at most max_rows rows (up to 1000) with the query time.
+    """
+    try:
+        df = frame_from_json(financial_data_json) if financial_data_json else None
+        if include_stored is None:
+            include_stored = df is None
+        table, msg = run_query(sql, {company: df} if df is not None else None,
+                               get_store() if include_stored else None,
+                               max_rows=max(1, min(max_rows, ModalConfig.SQL_MAX_ROWS)))
+        if table is None:
+            return msg
+        return f"{format_query_result(table)}\n\n{msg}"
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
 if __name__ == "__main__":
     # Run the MCP server
     print("Starting Samani Financial Agent MCP Server...", file=sys.stderr)
@@ -46,6 +46,7 @@ def gradio_app():
     # Import after setting path
     import gradio as gr
     from backend.agent_logic import process_request
+    from backend.model_registry import ModelRegistry
     from transformers import pipeline
     import torch
     
@@ -57,6 +58,7 @@ def gradio_app():
         device=device
     )
     print("✅ FinBERT loaded on GPU")
+    models = ModelRegistry({"sentiment": nlp})
     
     def analyze(files, query):
         """Analyze function"""
@@ -66,7 +68,7 @@ def gradio_app():
             return "❌ Please enter an analysis query", ""
         
         try:
-            result, logs = process_request(files, query)
+            result, logs = process_request(files, query, models=models)
             return result, logs
         except Exception as e:
             return "", f"❌ Error: {str(e)}"
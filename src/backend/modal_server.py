@@ -53,6 +53,7 @@ class QueryRequest(BaseModel):
     gpu="A10G",  # NVIDIA A10G GPU (24GB VRAM)
     timeout=600,  # 10 minutes
     memory=30000,  # 30GB memory
+    allow_concurrent_inputs=8,  # Requests share the loaded model via ModelRegistry
 )
 class FinancialAnalyzer:
     """Financial analysis engine running on A10G GPU"""
@@ -72,6 +73,9 @@ class FinancialAnalyzer:
         )
         print("✅ FinBERT loaded on GPU")
         sys.path.insert(0, "/root")
+
+        from src.backend.model_registry import ModelRegistry
+        self.models = ModelRegistry({"sentiment": self.nlp})
         return self
 
     @modal.method()
@@ -93,7 +97,6 @@ class FinancialAnalyzer:
             # Import analysis modules
             from src.backend.mcp.parsing import parse_file
             from src.backend.agent_logic import process_request
-            import src.backend.mcp.sentiment as sentiment_module
             
             # Reconstruct files from base64
             file_objects = []
@@ -104,12 +107,9 @@ class FinancialAnalyzer:
                 file_objects.append(file_obj)
                 logging.debug(f"   ✓ Loaded file: {f.name}")
             
-            # Use GPU-loaded sentiment model
-            sentiment_module.nlp = self.nlp
-            
-            # Run analysis
+            # Run analysis with the GPU-loaded models passed explicitly (no shared globals)
             logging.info(f"[{timestamp}] ⚙️  Processing analysis...")
-            result, logs = process_request(file_objects, query)
+            result, logs = process_request(file_objects, query, models=self.models)
             
             logging.info(f"[{timestamp}] ✅ Analysis complete - returning results")
             return result, logs
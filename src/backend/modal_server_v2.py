@@ -40,7 +40,7 @@ class QueryRequest(BaseModel):
     query: str
 
 # 3. GPU-powered Analysis Class
-@app.cls(image=image, gpu="A10G", timeout=600)
+@app.cls(image=image, gpu="A10G", timeout=600, allow_concurrent_inputs=8)
 class FinancialAgent:
     def __enter__(self):
         """Initialize FinBERT on GPU"""
@@ -54,6 +54,9 @@ class FinancialAgent:
         self.nlp = pipeline("sentiment-analysis", model=self.model, tokenizer=self.tokenizer, device=device)
         print("✅ FinBERT Loaded on GPU")
         sys.path.append("/root")
+
+        from src.backend.model_registry import ModelRegistry
+        self.models = ModelRegistry({"sentiment": self.nlp})
         return self
 
     @modal.method()
@@ -71,12 +74,8 @@ class FinancialAgent:
             file_obj.name = f.name
             reconstructed_files.append(file_obj)
         
-        # Inject GPU-loaded model
-        import src.backend.mcp.sentiment as sentiment_module
-        sentiment_module.nlp = self.nlp 
-        
-        # Run analysis
-        return process_request(reconstructed_files, query)
+        # Run analysis with the GPU-loaded model passed per request
+        return process_request(reconstructed_files, query, models=self.models)
 
 # 4. Direct Python API (can be called from anywhere)
 @app.local_entrypoint()
@@ -0,0 +1,57 @@
+"""
+Model Registry
+Holds models loaded once per process/container and hands them to each request
+explicitly, instead of requests overwriting module globals such as
+src.backend.mcp.sentiment.nlp. Safe to share across concurrent requests.
+"""
+import threading
+from typing import Dict, Optional
+
+
+class SentimentModel:
+    """
+    Wraps a HuggingFace sentiment pipeline so concurrent requests can share it.
+    Forward passes and tokenizer calls are serialized with a lock (neither the
+    pipeline nor fast tokenizers are thread-safe); everything else in a request
+    (parsing, analysis) runs concurrently.
+    """
+
+    def __init__(self, pipeline, name: Optional[str] = None):
+        self.pipeline = pipeline
+        model = getattr(pipeline, 'model', None)
+        self.name = name or getattr(model, 'name_or_path', None) or 'sentiment'
+        self._lock = threading.Lock()
+
+        tokenizer = getattr(pipeline, 'tokenizer', None)
+        self.tokenizer = self._locked(tokenizer) if tokenizer is not None else None
+
+    def _locked(self, fn):
+        def call(*args, **kwargs):
+            with self._lock:
+                return fn(*args, **kwargs)
+        return call
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            return self.pipeline(*args, **kwargs)
+
+
+class ModelRegistry:
+    """Named models available to a request (e.g. registry.get('sentiment'))"""
+
+    def __init__(self, models: Optional[Dict[str, object]] = None):
+        self._models: Dict[str, object] = {}
+        for name, model in (models or {}).items():
+            self.register(name, model)
+
+    def register(self, name: str, model) -> None:
+        """Registers a loaded model; sentiment pipelines are wrapped in SentimentModel"""
+        if name == 'sentiment' and model is not None and not isinstance(model, SentimentModel):
+            model = SentimentModel(model)
+        self._models[name] = model
+
+    def get(self, name: str, default=None):
+        return self._models.get(name, default)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._models